@@ -1,7 +1,9 @@
 import azure.functions as func
 
 from src.main import app
+from src.routers.health import controller as health_controller
 
 
 def main(req: func.HttpRequest, context: func.Context) -> func.HttpResponse:
+    health_controller.start_warmup()
     return func.AsgiMiddleware(app).handle(req, context)
@@ -0,0 +1,90 @@
+"""Benchmarks JSON serialization of the surfaces and features endpoints.
+
+Compares FastAPI's default path (response model validation, jsonable_encoder,
+JSONResponse) with the NumpyJSONResponse that the endpoints now return.
+
+Usage, from the api directory:
+    python -m scripts.benchmark_serialization [--repeats 5]
+"""
+import argparse
+import time
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+import pydantic
+from fastapi import encoders
+from fastapi import responses as fastapi_responses
+
+from scripts import synthetic
+from src.core import responses
+from src.routers.surfaces import schemas
+
+
+def time_call(function: Callable[[], bytes], repeats: int) -> float:
+    """Times a function.
+
+    Args:
+        function: The function to time.
+        repeats: The number of repeats.
+
+    Returns:
+        The mean time per call in milliseconds.
+    """
+    start = time.perf_counter()
+    for _ in range(repeats):
+        function()
+    return 1000 * (time.perf_counter() - start) / repeats
+
+
+def default_surface(surface: Dict[str, Any]) -> bytes:
+    """Serializes a surface the way FastAPI did before NumpyJSONResponse."""
+    model = schemas.Surface(
+        name=surface["name"],
+        vertices=surface["vertices"].tolist(),
+        faces=surface["faces"].tolist(),
+    )
+    return fastapi_responses.JSONResponse(encoders.jsonable_encoder(model)).body
+
+
+def default_similarity(similarities: Dict[str, np.ndarray]) -> bytes:
+    """Serializes similarities the way FastAPI did before NumpyJSONResponse."""
+    content = {name: values.tolist() for name, values in similarities.items()}
+    validated = pydantic.parse_obj_as(Dict[str, List[float]], content)
+    return fastapi_responses.JSONResponse(encoders.jsonable_encoder(validated)).body
+
+
+def main() -> None:
+    """Runs the benchmark and prints the results."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    surface = synthetic.create_surface("human_left")
+    payloads: Dict[str, Any] = {
+        "/surfaces/hemispheres": {
+            "name": surface.name,
+            "vertices": surface.vertices,
+            "faces": rng.integers(0, 10242, (20480, 3)),
+        },
+        "/features/cross_species": {
+            name: rng.uniform(-1, 2, 10242)
+            for name in ["human_left", "human_right", "macaque_left", "macaque_right"]
+        },
+    }
+    defaults = {
+        "/surfaces/hemispheres": default_surface,
+        "/features/cross_species": default_similarity,
+    }
+
+    print(f"{'endpoint':>24} {'before':>10} {'after':>10} {'speedup':>8}")
+    for endpoint, payload in payloads.items():
+        before = time_call(lambda: defaults[endpoint](payload), args.repeats)
+        after = time_call(
+            lambda: responses.NumpyJSONResponse(payload).body, args.repeats
+        )
+        print(f"{endpoint:>24} {before:8.1f}ms {after:8.1f}ms {before / after:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
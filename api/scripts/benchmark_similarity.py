@@ -0,0 +1,108 @@
+"""Benchmarks the approximate similarity method against the exact method.
+
+Besides the timings, it reports the errors of the approximate method and where
+the largest error occurs. The errors are concentrated at target vertices whose
+cosine similarity to the seed ROI approaches 1 in magnitude, where the exact
+method clips the per-vertex cosines at 0.9999 before the Fisher-Z transform, so
+errors are reported separately for targets near that bound.
+
+Usage, from the api directory:
+    python -m scripts.benchmark_similarity [--data synthetic|real]
+"""
+import argparse
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from scripts import datasets
+from src.routers.features import utils as features_utils
+
+NEAR_CLIP_Z = float(np.arctanh(0.99))
+
+
+def main() -> None:
+    """Runs the benchmark and prints the results."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--data", choices=["synthetic", "real"], default="synthetic")
+    parser.add_argument("--n-seeds", type=int, default=50)
+    parser.add_argument("--n-features", type=int, default=100)
+    parser.add_argument("--roi-size", type=int, default=5)
+    parser.add_argument("--weighting", default="gaussian")
+    args = parser.parse_args()
+
+    surfaces, stack = datasets.load_dataset(args.data, args.n_features)
+    rng = np.random.default_rng(0)
+
+    timings: Dict[str, float] = {"exact": 0.0, "approximate": 0.0}
+    errors = []
+    near_clip = []
+    correlations = []
+    worst: Tuple[float, str, int, str, int, float, float] = (-1.0, "", 0, "", 0, 0, 0)
+    target_names: List[str] = [
+        name for name in stack.names for _ in range(stack.get(name).shape[0])
+    ]
+    for _ in range(args.n_seeds):
+        name = str(rng.choice(stack.names))
+        seed_vertex = int(rng.integers(surfaces[name].vertices.shape[0]))
+        results = {}
+        for method in timings:
+            start = time.perf_counter()
+            similarity = features_utils.compute_similarity_batched(
+                seed_vertex,
+                surfaces[name],
+                stack.get(name),
+                stack,
+                roi_size=args.roi_size,
+                weighting=args.weighting,
+                method=method,
+            )
+            timings[method] += time.perf_counter() - start
+            results[method] = np.concatenate(list(similarity.values()))
+        error = np.abs(results["approximate"] - results["exact"])
+        errors.append(error)
+        near_clip.append(
+            np.maximum(np.abs(results["approximate"]), np.abs(results["exact"]))
+            >= NEAR_CLIP_Z
+        )
+        target = int(np.argmax(error))
+        if error[target] > worst[0]:
+            worst = (
+                float(error[target]),
+                name,
+                seed_vertex,
+                target_names[target],
+                target - int(stack.offsets[stack.names.index(target_names[target])]),
+                float(results["exact"][target]),
+                float(results["approximate"][target]),
+            )
+        correlations.append(np.corrcoef(results["approximate"], results["exact"])[0, 1])
+
+    all_errors = np.concatenate(errors)
+    all_near_clip = np.concatenate(near_clip)
+    print(f"Seeds: {args.n_seeds}, data: {args.data}")
+    for method, total in timings.items():
+        print(f"{method:>12}: {1000 * total / args.n_seeds:8.3f} ms/seed")
+    print(f"{'speedup':>12}: {timings['exact'] / timings['approximate']:8.2f}x")
+    print(f"{'max error':>12}: {all_errors.max():8.4f}")
+    print(f"{'mean error':>12}: {all_errors.mean():8.4f}")
+    print(f"{'p99.9 error':>12}: {np.quantile(all_errors, 0.999):8.4f}")
+    print(
+        f"{'max error':>12} at seed {worst[1]}:{worst[2]}, target "
+        f"{worst[3]}:{worst[4]} (exact {worst[5]:.4f}, approximate {worst[6]:.4f})"
+    )
+    for label, mask in (
+        ("|cos| >= .99", all_near_clip),
+        ("|cos| < .99", ~all_near_clip),
+    ):
+        if mask.any():
+            print(
+                f"{label:>12}: max error {all_errors[mask].max():8.4f}, "
+                f"mean error {all_errors[mask].mean():8.4f} "
+                f"({mask.sum()} targets)"
+            )
+    print(f"{'min corr':>12}: {np.min(correlations):8.4f}")
+
+
+if __name__ == "__main__":
+    main()
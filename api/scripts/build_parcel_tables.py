@@ -0,0 +1,31 @@
+"""Converts the vertex to parcel mappings to binary parcel tables.
+
+The tables are written with the blob filenames of the parcel tables, relative to
+the output directory, for upload next to the JSON mappings. The graphs router
+reads them instead of parsing the JSON mappings.
+
+Usage, from the api directory:
+    python -m scripts.build_parcel_tables [--output-dir DIR]
+"""
+import argparse
+import pathlib
+
+from src.core import data_fetcher
+
+
+def main() -> None:
+    """Builds and writes the parcel tables."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--output-dir", type=pathlib.Path, default=pathlib.Path("."))
+    args = parser.parse_args()
+
+    for species in data_fetcher.PARCEL_MAPPING_STEMS:
+        table = data_fetcher.get_parcel_table_data(species)
+        filepath = args.output_dir / data_fetcher.get_parcel_table_filename(species)
+        filepath.parent.mkdir(parents=True, exist_ok=True)
+        data_fetcher.write_parcel_table(table, filepath)
+        print(f"Wrote {filepath} ({len(table)} vertices).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""Precomputes the ROI tables of all surfaces.
+
+The tables are written next to the surface files and picked up by the features
+router instead of computing the ROI on every request.
+
+Usage, from the api directory:
+    python -m scripts.build_roi_tables [--output-dir DIR]
+"""
+import argparse
+import pathlib
+
+from src.core import data_fetcher, settings
+from src.routers.features import controller
+from src.routers.features import utils as features_utils
+
+
+def main() -> None:
+    """Builds and writes the ROI tables."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--output-dir", type=pathlib.Path, default=settings.get_settings().DATA_DIR
+    )
+    parser.add_argument("--roi-size", type=int, default=controller.ROI_SIZE)
+    parser.add_argument("--weighting", default=controller.WEIGHTING)
+    args = parser.parse_args()
+
+    for species, side in features_utils.TARGET_HEMISPHERES:
+        surface = data_fetcher.get_surface(species=species, side=side)
+        roi_table = features_utils.build_roi_table(
+            surface, args.roi_size, args.weighting
+        )
+        filepath = args.output_dir / data_fetcher.get_roi_table_filename(
+            species, side, args.roi_size, args.weighting
+        )
+        data_fetcher.write_roi_table(roi_table, filepath)
+        print(f"Wrote {filepath} ({len(roi_table.indices)} entries).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""Precomputes the similarity cubes of all seed hemispheres.
+
+Set SIMILARITY_CUBE_DIR to the output directory to serve exact similarities
+from the cubes.
+
+Usage, from the api directory:
+    python -m scripts.build_similarity_cubes --output-dir DIR [--precision uint8]
+"""
+import argparse
+import pathlib
+
+from src.core import data_fetcher, quantization
+from src.routers.features import controller, cube
+from src.routers.features import utils as features_utils
+
+
+def main() -> None:
+    """Builds and writes the similarity cubes."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--output-dir", type=pathlib.Path, required=True)
+    parser.add_argument(
+        "--precision", choices=quantization.PRECISIONS, default="float32"
+    )
+    args = parser.parse_args()
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+
+    target_stack = features_utils.load_feature_stack()
+    for species, side in features_utils.TARGET_HEMISPHERES:
+        filepath = args.output_dir / cube.get_cube_filename(species, side)
+        print(f"Building {filepath}.")
+        cube.build_cube(
+            filepath,
+            data_fetcher.get_surface(species=species, side=side),
+            target_stack.get(f"{species}_{side}"),
+            target_stack,
+            features_utils.load_roi_table(
+                species, side, controller.ROI_SIZE, controller.WEIGHTING
+            ),
+            precision=args.precision,
+        )
+
+
+if __name__ == "__main__":
+    main()
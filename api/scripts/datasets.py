@@ -0,0 +1,27 @@
+"""Dataset loading shared by the benchmark and reporting scripts."""
+from typing import Dict, Tuple
+
+from scripts import synthetic
+from src.core import data_fetcher, types
+from src.routers.features import utils as features_utils
+
+
+def load_dataset(
+    data: str, n_features: int = 100
+) -> Tuple[Dict[str, types.Surface], types.FeatureStack]:
+    """Loads the surfaces and feature stack of all target hemispheres.
+
+    Args:
+        data: Either 'synthetic' or 'real'.
+        n_features: The number of features for synthetic data.
+
+    Returns:
+        The surfaces keyed by hemisphere name, and the stacked features.
+    """
+    if data == "synthetic":
+        return synthetic.create_dataset(n_features=n_features)
+    surfaces = {
+        f"{species}_{side}": data_fetcher.get_surface(species, side)
+        for species, side in features_utils.TARGET_HEMISPHERES
+    }
+    return surfaces, features_utils.load_feature_stack()
@@ -0,0 +1,60 @@
+"""Packs the per-vertex neuroquery files into indexed shards.
+
+Upload the shards to the blob container to serve neuroquery records from them.
+Vertices without a neuroquery file are stored as empty records.
+
+Usage, from the api directory:
+    python -m scripts.pack_neuroquery --output-dir DIR [--workers 16]
+"""
+import argparse
+import concurrent.futures
+import json
+import pathlib
+
+from src.core import data_fetcher, packed_records
+from src.routers.features import controller
+
+
+def fetch_record(vertex: int) -> bytes:
+    """Fetches the neuroquery data of a vertex as compact JSON.
+
+    Args:
+        vertex: The vertex index across all hemispheres.
+
+    Returns:
+        The encoded record, empty if the vertex has no neuroquery file.
+    """
+    try:
+        data = data_fetcher.get_neuroquery_vertex_data(vertex)
+    except FileNotFoundError:
+        return b""
+    return json.dumps(data, separators=(",", ":")).encode()
+
+
+def main() -> None:
+    """Fetches, packs and writes the neuroquery shards."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--output-dir", type=pathlib.Path, required=True)
+    parser.add_argument("--workers", type=int, default=16)
+    args = parser.parse_args()
+    args.output_dir.mkdir(parents=True, exist_ok=True)
+
+    shard_size = data_fetcher.NEUROQUERY_SHARD_SIZE
+    n_shards = -(-controller.NEUROQUERY_VERTICES // shard_size)
+    with concurrent.futures.ThreadPoolExecutor(args.workers) as executor:
+        for shard in range(n_shards):
+            vertices = range(
+                shard * shard_size,
+                min((shard + 1) * shard_size, controller.NEUROQUERY_VERTICES),
+            )
+            filepath = args.output_dir / data_fetcher.get_neuroquery_shard_filename(
+                shard
+            )
+            packed_records.write_packed_records(
+                filepath, executor.map(fetch_record, vertices)
+            )
+            print(f"Wrote {filepath} ({filepath.stat().st_size} bytes).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Reports the error of quantized similarity storage per target hemisphere.
+
+For a sample of seeds, the exact output of `compute_similarity` is quantized at
+every supported precision and compared to the unquantized values.
+
+Usage, from the api directory:
+    python -m scripts.report_quantization_error [--data synthetic|real]
+"""
+import argparse
+from typing import Dict, List
+
+import numpy as np
+
+from scripts import datasets
+from src.core import quantization
+from src.routers.features import controller
+from src.routers.features import utils as features_utils
+
+
+def main() -> None:
+    """Computes and prints the quantization errors."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--data", choices=["synthetic", "real"], default="synthetic")
+    parser.add_argument("--n-seeds", type=int, default=20)
+    args = parser.parse_args()
+
+    surfaces, stack = datasets.load_dataset(args.data)
+    rng = np.random.default_rng(0)
+
+    errors: Dict[str, Dict[str, List[np.ndarray]]] = {
+        precision: {name: [] for name in stack.names}
+        for precision in quantization.PRECISIONS
+    }
+    for _ in range(args.n_seeds):
+        seed_name = str(rng.choice(stack.names))
+        seed_vertex = int(rng.integers(surfaces[seed_name].vertices.shape[0]))
+        for target_name in stack.names:
+            exact = features_utils.compute_similarity(
+                seed_vertex,
+                surfaces[seed_name],
+                stack.get(seed_name),
+                stack.get(target_name),
+                roi_size=controller.ROI_SIZE,
+                weighting=controller.WEIGHTING,
+            )
+            for precision in quantization.PRECISIONS:
+                restored = quantization.quantize(exact, precision).dequantize()
+                errors[precision][target_name].append(np.abs(restored - exact))
+
+    print(f"Seeds: {args.n_seeds}, data: {args.data}")
+    print(f"{'precision':>10} {'hemisphere':>14} {'max error':>10} {'mean error':>11}")
+    for precision, per_target in errors.items():
+        for target_name, target_errors in per_target.items():
+            all_errors = np.concatenate(target_errors)
+            print(
+                f"{precision:>10} {target_name:>14} "
+                f"{all_errors.max():10.2e} {all_errors.mean():11.2e}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Synthetic surfaces and features for benchmarks that run without the data."""
+from typing import Dict, Tuple
+
+import numpy as np
+
+from src.core import types
+from src.routers.features import utils as features_utils
+
+
+def create_surface(
+    name: str, n_vertices: int = 10242, radius: float = 70.0
+) -> types.Surface:
+    """Creates a spherical surface with evenly spread vertices.
+
+    Args:
+        name: The name of the surface, e.g. 'human_left'.
+        n_vertices: The number of vertices.
+        radius: The radius of the sphere.
+
+    Returns:
+        The surface. Faces are not generated.
+    """
+    index = np.arange(n_vertices) + 0.5
+    polar = np.arccos(1 - 2 * index / n_vertices)
+    azimuth = np.pi * (1 + 5**0.5) * index
+    vertices = radius * np.stack(
+        [
+            np.cos(azimuth) * np.sin(polar),
+            np.sin(azimuth) * np.sin(polar),
+            np.cos(polar),
+        ],
+        axis=1,
+    )
+    return types.Surface(
+        name=name, vertices=vertices, faces=np.zeros((0, 3), dtype=np.int64)
+    )
+
+
+def create_features(
+    surface: types.Surface, n_features: int = 100, seed: int = 0
+) -> np.ndarray:
+    """Creates spatially smooth features on a surface.
+
+    Args:
+        surface: The surface.
+        n_features: The number of features per vertex.
+        seed: The random seed.
+
+    Returns:
+        The (n_vertices, n_features) feature array.
+    """
+    rng = np.random.default_rng(seed)
+    projection = rng.normal(scale=0.05, size=(3, n_features))
+    phase = rng.uniform(0, 2 * np.pi, size=n_features)
+    return np.sin(surface.vertices @ projection + phase)
+
+
+def create_dataset(
+    n_vertices: int = 10242, n_features: int = 100
+) -> Tuple[Dict[str, types.Surface], types.FeatureStack]:
+    """Creates surfaces for all target hemispheres and their feature stack.
+
+    Args:
+        n_vertices: The number of vertices per hemisphere.
+        n_features: The number of features per vertex.
+
+    Returns:
+        The surfaces keyed by hemisphere name, and the stacked features.
+    """
+    surfaces = {
+        f"{species}_{side}": create_surface(f"{species}_{side}", n_vertices)
+        for species, side in features_utils.TARGET_HEMISPHERES
+    }
+    matrices = {
+        name: types.FeatureMatrix.from_array(
+            create_features(surface, n_features, seed=index)
+        )
+        for index, (name, surface) in enumerate(surfaces.items())
+    }
+    return surfaces, types.FeatureStack.from_matrices(matrices)
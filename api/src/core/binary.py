@@ -0,0 +1,91 @@
+"""Binary encoding of numpy arrays for API responses.
+
+A binary payload consists of:
+    - 4 bytes: the magic bytes b"CSMB".
+    - 4 bytes: the length of the header as a little-endian uint32.
+    - The header: UTF-8 encoded JSON, padded with spaces to a multiple of 8 bytes.
+    - The array buffers, in little-endian byte order, each starting at a multiple
+      of 8 bytes from the end of the header.
+
+The header has the form:
+    {
+        "metadata": {...},
+        "arrays": [
+            {"name": str, "dtype": str, "shape": [int], "offset": int},
+            ...
+        ]
+    }
+where "dtype" is a numpy dtype string (e.g. '<f4') and "offset" is relative to
+the end of the header. Clients can view the buffers directly as typed arrays.
+"""
+import json
+import struct
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+MEDIA_TYPE = "application/octet-stream"
+MAGIC = b"CSMB"
+ALIGNMENT = 8
+
+
+def encode_arrays(
+    arrays: Dict[str, np.ndarray], metadata: Optional[Dict[str, Any]] = None
+) -> bytes:
+    """Encodes arrays into a binary payload.
+
+    Args:
+        arrays: The arrays to encode, keyed by name.
+        metadata: JSON-serializable metadata to include in the header.
+
+    Returns:
+        The binary payload.
+    """
+    buffers = []
+    descriptions = []
+    offset = 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array, dtype=array.dtype.newbyteorder("<"))
+        descriptions.append(
+            {
+                "name": name,
+                "dtype": array.dtype.str,
+                "shape": list(array.shape),
+                "offset": offset,
+            }
+        )
+        padding = -array.nbytes % ALIGNMENT
+        buffers.append(array.tobytes() + b"\0" * padding)
+        offset += array.nbytes + padding
+
+    header = json.dumps({"metadata": metadata or {}, "arrays": descriptions}).encode()
+    header += b" " * (-(len(MAGIC) + 4 + len(header)) % ALIGNMENT)
+    return b"".join([MAGIC, struct.pack("<I", len(header)), header, *buffers])
+
+
+def decode_arrays(payload: bytes) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+    """Decodes a binary payload.
+
+    Args:
+        payload: The binary payload.
+
+    Returns:
+        The arrays keyed by name, and the metadata.
+    """
+    if payload[: len(MAGIC)] != MAGIC:
+        raise ValueError("Not a binary array payload.")
+    (header_length,) = struct.unpack_from("<I", payload, len(MAGIC))
+    data_start = len(MAGIC) + 4 + header_length
+    header = json.loads(payload[len(MAGIC) + 4 : data_start])
+
+    arrays = {}
+    for description in header["arrays"]:
+        dtype = np.dtype(description["dtype"])
+        count = int(np.prod(description["shape"]))
+        arrays[description["name"]] = np.frombuffer(
+            payload,
+            dtype=dtype,
+            count=count,
+            offset=data_start + description["offset"],
+        ).reshape(description["shape"])
+    return arrays, header["metadata"]
@@ -0,0 +1,520 @@
+"""In-process caches of loaded data with shared memory accounting.
+
+Every cache is registered under a name with the cache manager, which tracks the
+hits, misses and size in bytes of each cache and evicts the least recently used
+entries across all caches when their total size exceeds the memory budget.
+Concurrent calls for a key that is being loaded wait for that load instead of
+starting their own; `cached_async` does the same for coroutine functions
+without blocking a thread per waiting call. Failed loads are not cached; their
+exception is raised to every caller that waited on them.
+
+Usage:
+    @cache.cached("surfaces")
+    def get_surface(species: str, side: str) -> types.Surface:
+        ...
+"""
+import asyncio
+import collections
+import concurrent.futures
+import dataclasses
+import functools
+import inspect
+import itertools
+import logging
+import mmap
+import sys
+import threading
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    Optional,
+    Set,
+    Tuple,
+    TypeVar,
+    cast,
+)
+
+import numpy as np
+
+from src.core import settings
+
+config = settings.get_settings()
+LOGGER_NAME = config.LOGGER_NAME
+CACHE_MEMORY_BYTES = config.CACHE_MEMORY_BYTES
+
+logger = logging.getLogger(LOGGER_NAME)
+
+T = TypeVar("T", bound=Callable[..., Any])
+
+
+@dataclasses.dataclass
+class _Entry:
+    """A cached value with its size and the time of its last access."""
+
+    value: Any
+    nbytes: int
+    last_access: int
+
+
+@dataclasses.dataclass
+class CacheStats:
+    """Counters of a named cache."""
+
+    name: str
+    entries: int = 0
+    nbytes: int = 0
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    errors: int = 0
+    max_entries: Optional[int] = None
+
+
+class CacheManager:
+    """Registry of named caches that share a memory budget."""
+
+    def __init__(self, max_bytes: int) -> None:
+        """Initializes the manager.
+
+        Args:
+            max_bytes: The memory budget across all caches.
+        """
+        self.max_bytes = max_bytes
+        self._lock = threading.RLock()
+        self._clock = itertools.count()
+        self._entries: Dict[str, "collections.OrderedDict[Hashable, _Entry]"] = {}
+        self._in_flight: Dict[Tuple[str, Hashable], concurrent.futures.Future] = {}
+        self._load_tasks: Set[asyncio.Future] = set()
+        self._stats: Dict[str, CacheStats] = {}
+
+    def register(self, name: str, max_entries: Optional[int] = None) -> None:
+        """Registers a named cache.
+
+        Args:
+            name: The name of the cache.
+            max_entries: The maximum number of entries of the cache, in addition
+                to the shared memory budget.
+        """
+        with self._lock:
+            if name in self._stats:
+                raise ValueError(f"Cache already registered: {name}")
+            self._entries[name] = collections.OrderedDict()
+            self._stats[name] = CacheStats(name=name, max_entries=max_entries)
+
+    def get(self, name: str, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """Gets a value from a cache, loading it on a miss.
+
+        Args:
+            name: The name of the cache.
+            key: The key of the value.
+            loader: Loads the value on a miss.
+
+        Returns:
+            The cached value.
+        """
+        with self._lock:
+            entry = self._entries[name].get(key)
+            if entry is not None:
+                entry.last_access = next(self._clock)
+                self._entries[name].move_to_end(key)
+                self._stats[name].hits += 1
+                return entry.value
+            future = self._in_flight.get((name, key))
+            is_loader = future is None
+            if future is None:
+                future = concurrent.futures.Future()
+                self._in_flight[(name, key)] = future
+                self._stats[name].misses += 1
+            else:
+                self._stats[name].hits += 1
+
+        if not is_loader:
+            return future.result()
+
+        try:
+            value = loader()
+        except BaseException as exc_info:
+            with self._lock:
+                self._stats[name].errors += 1
+                del self._in_flight[(name, key)]
+            future.set_exception(exc_info)
+            raise
+
+        with self._lock:
+            del self._in_flight[(name, key)]
+            self._put(name, key, value)
+        future.set_result(value)
+        return value
+
+    async def get_async(
+        self, name: str, key: Hashable, loader: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Gets a value from a cache, awaiting a load on a miss.
+
+        Concurrent calls for a key that is being loaded await that load. The load
+        runs as a task of its own, so it completes even if the call that started
+        it is cancelled. Its result is published through the same thread-safe
+        future as in `get`, so calls from other event loops, e.g. in other
+        threads, can await it too.
+
+        Args:
+            name: The name of the cache.
+            key: The key of the value.
+            loader: Loads the value on a miss.
+
+        Returns:
+            The cached value.
+        """
+        with self._lock:
+            entry = self._entries[name].get(key)
+            if entry is not None:
+                entry.last_access = next(self._clock)
+                self._entries[name].move_to_end(key)
+                self._stats[name].hits += 1
+                return entry.value
+            future = self._in_flight.get((name, key))
+            if future is None:
+                future = concurrent.futures.Future()
+                self._in_flight[(name, key)] = future
+                self._stats[name].misses += 1
+                task = asyncio.ensure_future(
+                    self._load_async(name, key, loader, future)
+                )
+                self._load_tasks.add(task)
+                task.add_done_callback(self._load_tasks.discard)
+            else:
+                self._stats[name].hits += 1
+
+        return await asyncio.shield(asyncio.wrap_future(future))
+
+    async def _load_async(
+        self,
+        name: str,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Any]],
+        future: concurrent.futures.Future,
+    ) -> None:
+        """Loads a value, stores it in a cache and publishes it to the waiters.
+
+        Args:
+            name: The name of the cache.
+            key: The key of the value.
+            loader: Loads the value.
+            future: The future that the callers of `get_async` await.
+        """
+        try:
+            value = await loader()
+        except BaseException as exc_info:  # pylint: disable=broad-except
+            with self._lock:
+                self._stats[name].errors += 1
+                del self._in_flight[(name, key)]
+            future.set_exception(exc_info)
+            return
+
+        with self._lock:
+            del self._in_flight[(name, key)]
+            self._put(name, key, value)
+        future.set_result(value)
+
+    def put(self, name: str, key: Hashable, value: Any) -> None:
+        """Stores a value in a cache, replacing any value cached for the key.
+
+        Args:
+            name: The name of the cache.
+            key: The key of the value.
+            value: The value.
+        """
+        with self._lock:
+            self._put(name, key, value)
+
+    def invalidate(self, name: Optional[str] = None, key: Any = None) -> None:
+        """Removes entries from the caches.
+
+        Args:
+            name: The name of the cache, or None for all caches.
+            key: The key of the entry, or None for all entries of the cache.
+        """
+        with self._lock:
+            names = list(self._entries) if name is None else [name]
+            for cache_name in names:
+                entries = self._entries[cache_name]
+                keys = list(entries) if key is None else [key]
+                for cache_key in keys:
+                    if cache_key in entries:
+                        logger.info("Invalidating %s entry %s.", cache_name, cache_key)
+                        self._remove(cache_name, cache_key)
+
+    def stats(self) -> Dict[str, CacheStats]:
+        """Gets the counters of all caches.
+
+        Returns:
+            Copies of the counters, keyed by cache name.
+        """
+        with self._lock:
+            return {
+                name: dataclasses.replace(stats) for name, stats in self._stats.items()
+            }
+
+    @property
+    def nbytes(self) -> int:
+        """The total size of all cached values."""
+        with self._lock:
+            return sum(stats.nbytes for stats in self._stats.values())
+
+    def _put(self, name: str, key: Hashable, value: Any) -> None:
+        """Stores a value and evicts entries to stay within the limits.
+
+        Must be called with the lock held.
+
+        Args:
+            name: The name of the cache.
+            key: The key of the value.
+            value: The value.
+        """
+        entries = self._entries[name]
+        if key in entries:
+            self._remove(name, key)
+        entry = _Entry(value, estimate_nbytes(value), next(self._clock))
+        entries[key] = entry
+        self._stats[name].entries += 1
+        self._stats[name].nbytes += entry.nbytes
+
+        max_entries = self._stats[name].max_entries
+        while max_entries is not None and len(entries) > max_entries:
+            self._evict(name, next(iter(entries)))
+
+        while self.nbytes > self.max_bytes:
+            candidates = [
+                (next(iter(cache_entries.values())).last_access, cache_name)
+                for cache_name, cache_entries in self._entries.items()
+                if cache_entries and (cache_name != name or len(cache_entries) > 1)
+            ]
+            if not candidates:
+                break
+            _, cache_name = min(candidates)
+            self._evict(cache_name, next(iter(self._entries[cache_name])))
+
+    def _evict(self, name: str, key: Hashable) -> None:
+        """Evicts an entry. Must be called with the lock held.
+
+        Args:
+            name: The name of the cache.
+            key: The key of the entry.
+        """
+        logger.info("Evicting %s entry %s from memory.", name, key)
+        self._remove(name, key)
+        self._stats[name].evictions += 1
+
+    def _remove(self, name: str, key: Hashable) -> None:
+        """Removes an entry. Must be called with the lock held.
+
+        Args:
+            name: The name of the cache.
+            key: The key of the entry.
+        """
+        entry = self._entries[name].pop(key)
+        self._stats[name].entries -= 1
+        self._stats[name].nbytes -= entry.nbytes
+
+
+def estimate_nbytes(value: Any) -> int:
+    """Estimates the memory held by a value.
+
+    Numpy arrays count their buffer size, containers and objects count their
+    contents. Memory-mapped files do not count, as they are paged in and out by
+    the operating system.
+
+    Args:
+        value: The value.
+
+    Returns:
+        The estimated size in bytes.
+    """
+    seen = set()
+
+    def visit(obj: Any) -> int:
+        if id(obj) in seen:
+            return 0
+        seen.add(id(obj))
+        if isinstance(obj, (np.memmap, mmap.mmap)):
+            return 0
+        if isinstance(obj, np.ndarray):
+            return 0 if _is_mapped(obj) else obj.nbytes
+        if isinstance(obj, (bytes, bytearray, str)):
+            return sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            return sum(visit(key) + visit(item) for key, item in obj.items())
+        if isinstance(obj, (list, tuple, set, frozenset)):
+            return sys.getsizeof(obj) + sum(visit(item) for item in obj)
+        if hasattr(obj, "__dict__"):
+            return visit(vars(obj))
+        return sys.getsizeof(obj)
+
+    return visit(value)
+
+
+def _is_mapped(array: np.ndarray) -> bool:
+    """Checks whether an array is a view of a memory-mapped file.
+
+    Args:
+        array: The array.
+
+    Returns:
+        True if the array's buffer belongs to a memory map.
+    """
+    base: Any = array
+    while base is not None:
+        if isinstance(base, (np.memmap, mmap.mmap)):
+            return True
+        if isinstance(base, memoryview):
+            base = base.obj
+        else:
+            base = getattr(base, "base", None)
+    return False
+
+
+MANAGER = CacheManager(CACHE_MEMORY_BYTES)
+
+
+def cached(
+    name: str, max_entries: Optional[int] = None, manager: CacheManager = MANAGER
+) -> Callable[[T], T]:
+    """Caches a function in a named cache of the cache manager.
+
+    Calls are keyed on their bound arguments, so positional and keyword calls
+    share entries. The wrapped function gains `warm(*args, **kwargs)`,
+    `prime(value, *args, **kwargs)`, `invalidate(*args, **kwargs)` and
+    `cache_clear()` methods.
+
+    Args:
+        name: The name of the cache.
+        max_entries: The maximum number of entries of the cache.
+        manager: The cache manager.
+
+    Returns:
+        The decorator.
+    """
+
+    def decorator(function: T) -> T:
+        manager.register(name, max_entries)
+        make_key = _key_function(function)
+
+        @functools.wraps(function)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            return manager.get(
+                name,
+                make_key(*args, **kwargs),
+                functools.partial(function, *args, **kwargs),
+            )
+
+        def warm(*args: Any, **kwargs: Any) -> None:
+            wrapper(*args, **kwargs)
+
+        wrapper.warm = warm  # type: ignore[attr-defined]
+        _add_cache_methods(wrapper, name, make_key, manager)
+        return cast(T, wrapper)
+
+    return decorator
+
+
+def cached_async(
+    name: str, max_entries: Optional[int] = None, manager: CacheManager = MANAGER
+) -> Callable[[T], T]:
+    """Caches a coroutine function in a named cache of the cache manager.
+
+    Like `cached`, but concurrent calls for a key that is being loaded await the
+    same load without occupying a thread. The wrapped function gains
+    `prime(value, *args, **kwargs)`, `invalidate(*args, **kwargs)` and
+    `cache_clear()` methods.
+
+    Args:
+        name: The name of the cache.
+        max_entries: The maximum number of entries of the cache.
+        manager: The cache manager.
+
+    Returns:
+        The decorator.
+    """
+
+    def decorator(function: T) -> T:
+        manager.register(name, max_entries)
+        make_key = _key_function(function)
+
+        @functools.wraps(function)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            return await manager.get_async(
+                name,
+                make_key(*args, **kwargs),
+                functools.partial(function, *args, **kwargs),
+            )
+
+        _add_cache_methods(wrapper, name, make_key, manager)
+        return cast(T, wrapper)
+
+    return decorator
+
+
+def _key_function(function: Callable[..., Any]) -> Callable[..., Hashable]:
+    """Creates the function that maps the arguments of a call to a cache key.
+
+    Args:
+        function: The cached function.
+
+    Returns:
+        The key function, which keys calls on their bound arguments including
+        defaults.
+    """
+    signature = inspect.signature(function)
+
+    def make_key(*args: Any, **kwargs: Any) -> Hashable:
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        return tuple(bound.arguments.values())
+
+    return make_key
+
+
+def _add_cache_methods(
+    wrapper: Callable[..., Any],
+    name: str,
+    make_key: Callable[..., Hashable],
+    manager: CacheManager,
+) -> None:
+    """Adds the prime, invalidate and cache_clear methods to a cached function.
+
+    Args:
+        wrapper: The cached function.
+        name: The name of its cache.
+        make_key: The key function of its calls.
+        manager: The cache manager.
+    """
+
+    def prime(value: Any, *args: Any, **kwargs: Any) -> None:
+        manager.put(name, make_key(*args, **kwargs), value)
+
+    def invalidate(*args: Any, **kwargs: Any) -> None:
+        manager.invalidate(name, make_key(*args, **kwargs))
+
+    wrapper.prime = prime  # type: ignore[attr-defined]
+    wrapper.invalidate = invalidate  # type: ignore[attr-defined]
+    wrapper.cache_clear = functools.partial(  # type: ignore[attr-defined]
+        manager.invalidate, name
+    )
+
+
+def prime(function: Callable[..., Any], value: Any, *args: Any, **kwargs: Any) -> None:
+    """Stores a value in the cache of a cached function.
+
+    Later calls with the same arguments return the value without calling the
+    function.
+
+    Args:
+        function: The function, decorated with `cached` or `cached_async`.
+        value: The value to return for the arguments.
+        *args: The positional arguments.
+        **kwargs: The keyword arguments.
+    """
+    function.prime(value, *args, **kwargs)  # type: ignore[attr-defined]
@@ -1,43 +1,117 @@
 """Module for data access."""
 
-import dataclasses
 import functools
 import gzip
+import io
 import json
 import logging
-import tempfile
-from typing import List
+import pathlib
+import time
+from typing import Dict, List, Optional
 
 import fastapi
 import h5py
 import numpy as np
+import requests
+from azure.core.pipeline import transport
 from azure.storage import blob
 
-from src.core import settings, types
+from src.core import cache, packed_records, settings, storage, types
 
 config = settings.get_settings()
 ENVIRONMENT = config.ENVIRONMENT
 DATA_DIR = config.DATA_DIR
 AZURE_STORAGE_BLOB_URL = config.AZURE_STORAGE_BLOB_URL
 AZURE_ACCESS_KEY = config.AZURE_ACCESS_KEY
+AZURE_STORAGE_CONNECTION_STRING = config.AZURE_STORAGE_CONNECTION_STRING
+AZURE_CONTAINER_NAME = config.AZURE_CONTAINER_NAME
+AZURE_CONNECTION_POOL_SIZE = config.AZURE_CONNECTION_POOL_SIZE
+AZURE_MAX_CONCURRENCY = config.AZURE_MAX_CONCURRENCY
+AZURE_MAX_CHUNK_SIZE = config.AZURE_MAX_CHUNK_SIZE
+CACHE_DIR = config.CACHE_DIR
+CACHE_MAX_BYTES = config.CACHE_MAX_BYTES
+NEUROQUERY_CACHE_SIZE = config.NEUROQUERY_CACHE_SIZE
+NEUROQUERY_SHARD_SIZE = 4096
+NEUROQUERY_MISSING_SHARD_TTL = 300.0
 
 logger = logging.getLogger(config.LOGGER_NAME)
 
+_missing_neuroquery_shards: Dict[int, float] = {}
 
+
+@functools.lru_cache(maxsize=None)
 def get_blob_container() -> blob.ContainerClient:
     """Gets the blob container for the API.
 
+    The container client is created once per process and shares a pooled HTTP
+    session, so that connections are reused across requests. If a connection
+    string is configured, e.g. for a local Azurite emulator, it takes
+    precedence over the account URL and access key.
+
     Returns:
         The blob container.
 
     """
-    logger.debug("Getting blob container.")
-    blob_client = blob.BlobServiceClient(
-        account_url=AZURE_STORAGE_BLOB_URL,
-        credential=AZURE_ACCESS_KEY.get_secret_value(),
+    logger.info("Creating blob container client.")
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=AZURE_CONNECTION_POOL_SIZE,
+        pool_maxsize=AZURE_CONNECTION_POOL_SIZE,
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    client_options = {
+        "transport": transport.RequestsTransport(session=session),
+        "max_single_get_size": AZURE_MAX_CHUNK_SIZE,
+        "max_chunk_get_size": AZURE_MAX_CHUNK_SIZE,
+    }
+
+    connection_string = AZURE_STORAGE_CONNECTION_STRING.get_secret_value()
+    if connection_string:
+        blob_client = blob.BlobServiceClient.from_connection_string(
+            connection_string, **client_options
+        )
+    else:
+        blob_client = blob.BlobServiceClient(
+            account_url=AZURE_STORAGE_BLOB_URL,
+            credential=AZURE_ACCESS_KEY.get_secret_value(),
+            **client_options,
+        )
+
+    return blob_client.get_container_client(AZURE_CONTAINER_NAME)
+
+
+@functools.lru_cache(maxsize=None)
+def get_blob_storage() -> storage.StorageBackend:
+    """Gets the blob storage, behind a read-through disk cache.
+
+    Blobs are downloaded once per instance and served from the disk cache after
+    that, until they are evicted.
+
+    Returns:
+        The blob storage.
+
+    """
+    logger.info("Creating blob storage with disk cache at %s.", CACHE_DIR)
+    return storage.DiskCacheStorage(
+        storage.AzureBlobStorage(get_blob_container(), AZURE_MAX_CONCURRENCY),
+        CACHE_DIR,
+        CACHE_MAX_BYTES,
     )
 
-    return blob_client.get_container_client("main")
+
+@functools.lru_cache(maxsize=None)
+def get_data_storage() -> storage.StorageBackend:
+    """Gets the storage of the surface and feature files.
+
+    Returns:
+        Local storage of the data directory in development, otherwise the
+        blob storage.
+
+    """
+    if ENVIRONMENT == "development":
+        return storage.LocalStorage(DATA_DIR)
+    return get_blob_storage()
 
 
 def download_blob_to_bytes(blob_filename: str) -> bytes:
@@ -51,26 +125,35 @@ def download_blob_to_bytes(blob_filename: str) -> bytes:
 
     """
     logger.debug("Downloading file from blob.")
-    blob_client = get_blob_container()
-    file_blob = blob_client.get_blob_client(blob_filename)
-    return file_blob.download_blob().readall()
+    return get_blob_storage().read_bytes(blob_filename)
 
 
-def download_file_from_blob(
-    blob_filename: str,
-    local_filename: str,
-) -> None:
-    """Reads a file from blob storage.
+async def download_blob_to_bytes_async(blob_filename: str) -> bytes:
+    """Downloads a blob file to bytes without blocking the event loop.
 
     Args:
         blob_filename: The filename of the file in blob storage.
-        local_filename: The filename of the file locally.
+
+    Returns:
+        The file contents as bytes.
+
+    """
+    logger.debug("Downloading file from blob.")
+    return await get_blob_storage().read_bytes_async(blob_filename)
+
+
+def open_h5_file(backend: storage.StorageBackend, filename: str) -> h5py.File:
+    """Opens an h5 file in memory, without writing it to disk first.
+
+    Args:
+        backend: The storage that holds the file.
+        filename: The name of the file.
+
+    Returns:
+        The h5 file, opened read-only on an in-memory buffer.
 
     """
-    logger.debug("Reading file from blob.")
-    contents = download_blob_to_bytes(blob_filename)
-    with open(local_filename, "wb") as f:
-        f.write(contents)
+    return h5py.File(io.BytesIO(backend.read_bytes(filename)), "r")
 
 
 def get_feature_data(species: str, side: str) -> np.ndarray:
@@ -87,36 +170,112 @@ def get_feature_data(species: str, side: str) -> np.ndarray:
     logger.info("Getting feature file.")
     filename = f"{species}_{side}_gradient_10k_fs_lr.h5"
 
-    if ENVIRONMENT == "development":
-        filepath = str(DATA_DIR / filename)
-    else:
-        temp_file = tempfile.NamedTemporaryFile(suffix=".h5")
-        filepath = temp_file.name
-        download_file_from_blob(filename, filepath)
-
-    with h5py.File(filepath, "r") as h5file:
+    with open_h5_file(get_data_storage(), filename) as h5file:
         return np.array(h5file["data"])
 
 
+def get_neuroquery_shard_filename(shard: int) -> str:
+    """Gets the filename of a packed shard of neuroquery records.
+
+    Args:
+        shard: The index of the shard. Shard i holds the records of vertices
+            i * NEUROQUERY_SHARD_SIZE up to (i + 1) * NEUROQUERY_SHARD_SIZE.
+
+    Returns:
+        The filename.
+
+    """
+    return f"neuroquery_features_10k_shard_{str(shard).zfill(3)}.pack"
+
+
+@cache.cached("neuroquery_shards")
+def get_neuroquery_shard(shard: int) -> packed_records.PackedRecords:
+    """Gets a packed shard of neuroquery records.
+
+    The shard is memory-mapped from the disk cache, so a lookup only reads and
+    decompresses the requested record.
+
+    Args:
+        shard: The index of the shard.
+
+    Returns:
+        The shard.
+
+    Raises:
+        FileNotFoundError: If the shard has not been packed. The error is not
+            cached, so that shards packed later are picked up.
+
+    """
+    logger.info("Getting neuroquery shard %s.", shard)
+    backend = get_blob_storage()
+    filename = get_neuroquery_shard_filename(shard)
+    if backend.supports_local_path:
+        return packed_records.PackedRecords.from_file(backend.local_path(filename))
+    return packed_records.PackedRecords(backend.read_bytes(filename))
+
+
+def find_neuroquery_shard(shard: int) -> Optional[packed_records.PackedRecords]:
+    """Gets a packed shard of neuroquery records, if it exists.
+
+    Missing shards are remembered for NEUROQUERY_MISSING_SHARD_TTL seconds, so
+    that lookups do not query the storage for them on every vertex, but a shard
+    that is packed later is still picked up.
+
+    Args:
+        shard: The index of the shard.
+
+    Returns:
+        The shard, or None if it has not been packed.
+
+    """
+    if time.monotonic() < _missing_neuroquery_shards.get(shard, 0.0):
+        return None
+    try:
+        return get_neuroquery_shard(shard)
+    except FileNotFoundError:
+        logger.warning("Neuroquery shard %s not found, using vertex files.", shard)
+        _missing_neuroquery_shards[shard] = (
+            time.monotonic() + NEUROQUERY_MISSING_SHARD_TTL
+        )
+        return None
+
+
+def get_neuroquery_vertex_data(vertex: int) -> List[List[str]]:
+    """Gets the neuroquery data of a vertex from its own file.
+
+    Args:
+        vertex: The vertex index across all hemispheres.
+
+    Returns:
+        The neuroquery data.
+
+    """
+    filename = f"neuroquery_features_10k_{str(vertex).zfill(6)}.json.gz"
+    return json.loads(gzip.decompress(get_blob_storage().read_bytes(filename)))
+
+
+@cache.cached("neuroquery_records", max_entries=NEUROQUERY_CACHE_SIZE)
 def get_neuroquery_data(vertex: int) -> List[List[str]]:
     """Gets the neuroquery data.
 
+    Args:
+        vertex: The vertex index across all hemispheres.
+
     Returns:
         The neuroquery data.
 
     Notes:
-        Always fetched from Azure as this is too large for Git.
+        Always fetched from Azure as this is too large for Git. Records are read
+        from the packed shards, falling back to the per-vertex files for shards
+        that have not been packed.
 
     """
     logger.info("Getting neuroquery data.")
-    filename = f"neuroquery_features_10k_{str(vertex).zfill(6)}.json.gz"
-
-    temp_file = tempfile.NamedTemporaryFile(suffix=".json.gz")
-    filepath = temp_file.name
-    download_file_from_blob(filename, filepath)
-
-    with gzip.open(filepath, "rb") as file_buffer:
-        return json.load(file_buffer)
+    shard = find_neuroquery_shard(vertex // NEUROQUERY_SHARD_SIZE)
+    if shard is None:
+        return get_neuroquery_vertex_data(vertex)
+    record = shard[vertex % NEUROQUERY_SHARD_SIZE]
+    return json.loads(record) if record else []
 
 
 def get_surface_data(species: str, side: str) -> types.Surface:
@@ -132,14 +291,8 @@ def get_surface_data(species: str, side: str) -> types.Surface:
     """
     logger.info("Getting surface file.")
     filename = f"{species}_{side}_inflated_10k_fs_lr.h5"
-    if ENVIRONMENT == "development":
-        filepath = str(DATA_DIR / filename)
-    else:
-        temp_file = tempfile.NamedTemporaryFile(suffix=".h5")
-        filepath = temp_file.name
-        download_file_from_blob(filename, filepath)
 
-    with h5py.File(filepath, "r") as h5file:
+    with open_h5_file(get_data_storage(), filename) as h5file:
         name = h5file["name"][()].decode("utf-8")
         vertices = h5file["vertices"][()]
         faces = h5file["faces"][()]
@@ -147,7 +300,73 @@ def get_surface_data(species: str, side: str) -> types.Surface:
     return types.Surface(name=name, vertices=vertices, faces=faces)
 
 
-@functools.lru_cache(maxsize=None)
+def get_roi_table_filename(
+    species: str, side: str, roi_size: int, weighting: str
+) -> str:
+    """Gets the filename of a precomputed ROI table.
+
+    Args:
+        species: The species.
+        side: The side.
+        roi_size: The size of the ROI.
+        weighting: The weighting scheme.
+
+    Returns:
+        The filename, stored alongside the surface files.
+
+    """
+    return f"{species}_{side}_roi_{roi_size}_{weighting}_10k_fs_lr.h5"
+
+
+def get_roi_table_data(
+    species: str, side: str, roi_size: int, weighting: str
+) -> Optional[types.RoiTable]:
+    """Gets the precomputed ROI table for the given surface, if it exists.
+
+    Args:
+        species: The species.
+        side: The side.
+        roi_size: The size of the ROI.
+        weighting: The weighting scheme.
+
+    Returns:
+        The ROI table, or None if it has not been precomputed.
+
+    """
+    logger.info("Getting ROI table file.")
+    filename = get_roi_table_filename(species, side, roi_size, weighting)
+    try:
+        h5file = open_h5_file(get_data_storage(), filename)
+    except FileNotFoundError:
+        return None
+
+    with h5file:
+        return types.RoiTable(
+            indptr=h5file["indptr"][()],
+            indices=h5file["indices"][()],
+            weights=h5file["weights"][()],
+            roi_size=int(h5file.attrs["roi_size"]),
+            weighting=str(h5file.attrs["weighting"]),
+        )
+
+
+def write_roi_table(roi_table: types.RoiTable, filepath: pathlib.Path) -> None:
+    """Writes an ROI table to an h5 file.
+
+    Args:
+        roi_table: The ROI table.
+        filepath: The path of the output file.
+
+    """
+    with h5py.File(filepath, "w") as h5file:
+        h5file.create_dataset("indptr", data=roi_table.indptr)
+        h5file.create_dataset("indices", data=roi_table.indices)
+        h5file.create_dataset("weights", data=roi_table.weights)
+        h5file.attrs["roi_size"] = roi_table.roi_size
+        h5file.attrs["weighting"] = roi_table.weighting
+
+
+@cache.cached("surfaces")
 def get_surface(species: str, side: str) -> types.Surface:
     """Cached call to surface data.
 
@@ -162,38 +381,100 @@ def get_surface(species: str, side: str) -> types.Surface:
     return get_surface_data(species=species, side=side)
 
 
-@dataclasses.dataclass
-class VertexToParcelMapping:
-    """Vertex to parcel mapping."""
+VertexToParcelMapping = types.VertexToParcelMapping
 
-    AparcLabel: int
-    AparcName: str
-    MarkovLabel: int
-    MarkovName: str
+PARCEL_MAPPING_STEMS = {
+    "human": "svgs/human_to_monkey_mapping",
+    "macaque": "svgs/monkey_to_human_mapping",
+}
 
 
-def get_vertex_to_parcel_mapping(species: str) -> List[VertexToParcelMapping]:
-    """Gets the vertex to parcel mapping.
+def get_parcel_table_filename(species: str) -> str:
+    """Gets the blob filename of the binary parcel table of a species.
 
     Args:
         species: The source species.
 
     Returns:
-        The vertex to parcel mapping.
+        The filename, next to the JSON mapping it is built from.
 
     """
-    logger.info("Getting vertex to parcel mapping.")
-    if species == "human":
-        filename = "svgs/human_to_monkey_mapping.json"
-    elif species == "macaque":
-        filename = "svgs/monkey_to_human_mapping.json"
-    else:
+    if species not in PARCEL_MAPPING_STEMS:
         raise fastapi.HTTPException(
             status_code=400,
             detail="Invalid species.",
         )
-    with tempfile.NamedTemporaryFile(suffix=".json") as json_file:
-        download_file_from_blob(filename, json_file.name)
-        with open(json_file.name, "r") as f:
-            data_as_dicts = json.load(f)
-        return [VertexToParcelMapping(**data) for data in data_as_dicts]
+    return f"{PARCEL_MAPPING_STEMS[species]}.h5"
+
+
+def get_parcel_table_data(species: str) -> types.ParcelTable:
+    """Gets the vertex to parcel table.
+
+    The binary table is read if it exists, otherwise the table is built from the
+    JSON mapping.
+
+    Args:
+        species: The source species.
+
+    Returns:
+        The vertex to parcel table.
+
+    """
+    logger.info("Getting vertex to parcel table.")
+    backend = get_blob_storage()
+    try:
+        h5file = open_h5_file(backend, get_parcel_table_filename(species))
+    except FileNotFoundError:
+        logger.info("No binary parcel table, reading the JSON mapping.")
+        records = json.loads(
+            backend.read_bytes(f"{PARCEL_MAPPING_STEMS[species]}.json")
+        )
+        return types.ParcelTable.from_records(records)
+
+    with h5file:
+        return types.ParcelTable(
+            labels={
+                atlas: h5file[f"{atlas}/labels"][()]
+                for atlas in types.ParcelTable.ATLASES
+            },
+            codes={
+                atlas: h5file[f"{atlas}/codes"][()]
+                for atlas in types.ParcelTable.ATLASES
+            },
+            names={
+                atlas: list(h5file[f"{atlas}/names"].asstr()[()])
+                for atlas in types.ParcelTable.ATLASES
+            },
+        )
+
+
+def write_parcel_table(table: types.ParcelTable, filepath: pathlib.Path) -> None:
+    """Writes a vertex to parcel table to an h5 file.
+
+    Args:
+        table: The vertex to parcel table.
+        filepath: The path of the output file.
+
+    """
+    with h5py.File(filepath, "w") as h5file:
+        for atlas in types.ParcelTable.ATLASES:
+            h5file.create_dataset(f"{atlas}/labels", data=table.labels[atlas])
+            h5file.create_dataset(f"{atlas}/codes", data=table.codes[atlas])
+            h5file.create_dataset(
+                f"{atlas}/names",
+                data=np.array(table.names[atlas], dtype=h5py.string_dtype()),
+            )
+
+
+@cache.cached("parcel_tables")
+def get_parcel_table(species: str) -> types.ParcelTable:
+    """Cached call to the vertex to parcel table.
+
+    Args:
+        species: The source species.
+
+    Returns:
+        The vertex to parcel table.
+
+    """
+    return get_parcel_table_data(species)
@@ -0,0 +1,76 @@
+"""Bounded executors for blocking work from async views.
+
+Blocking I/O, such as blob downloads, runs on the I/O executor, and CPU-heavy
+work, such as similarity computations, on the CPU executor. Both are separate
+from the thread pool that FastAPI runs sync views in, so that slow downloads or
+computations cannot exhaust it, and their sizes bound the concurrency of each
+kind of work.
+"""
+import asyncio
+import concurrent.futures
+import functools
+from typing import Any, Callable, TypeVar
+
+from src.core import settings
+
+config = settings.get_settings()
+IO_WORKERS = config.IO_WORKERS
+CPU_WORKERS = config.CPU_WORKERS
+
+T = TypeVar("T")
+
+IO_EXECUTOR = concurrent.futures.ThreadPoolExecutor(IO_WORKERS, thread_name_prefix="io")
+CPU_EXECUTOR = concurrent.futures.ThreadPoolExecutor(
+    CPU_WORKERS, thread_name_prefix="cpu"
+)
+
+
+async def run_io(function: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Runs blocking I/O on the I/O executor.
+
+    Args:
+        function: The function to run.
+        *args: The positional arguments of the function.
+        **kwargs: The keyword arguments of the function.
+
+    Returns:
+        The return value of the function.
+    """
+    return await _run(IO_EXECUTOR, function, *args, **kwargs)
+
+
+async def run_cpu(function: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Runs CPU-heavy work on the CPU executor.
+
+    Args:
+        function: The function to run.
+        *args: The positional arguments of the function.
+        **kwargs: The keyword arguments of the function.
+
+    Returns:
+        The return value of the function.
+    """
+    return await _run(CPU_EXECUTOR, function, *args, **kwargs)
+
+
+async def _run(
+    executor: concurrent.futures.Executor,
+    function: Callable[..., T],
+    *args: Any,
+    **kwargs: Any,
+) -> T:
+    """Runs a function on an executor without blocking the event loop.
+
+    Args:
+        executor: The executor.
+        function: The function to run.
+        *args: The positional arguments of the function.
+        **kwargs: The keyword arguments of the function.
+
+    Returns:
+        The return value of the function.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        executor, functools.partial(function, *args, **kwargs)
+    )
@@ -0,0 +1,96 @@
+"""Packed files of individually compressed records.
+
+A packed file consists of:
+    - 4 bytes: the magic bytes b"CSMP".
+    - 4 bytes: the number of records n as a little-endian uint32.
+    - (n + 1) little-endian uint64 offsets of the records, relative to the end of
+      the offsets.
+    - The zlib-compressed records, back to back.
+
+Record i spans offsets[i]:offsets[i + 1], so reading one record is a seek into
+the file and a decompress of that record only. Empty records are stored as zero
+bytes.
+"""
+import mmap
+import pathlib
+import struct
+import zlib
+from typing import Iterable, Union
+
+import numpy as np
+
+MAGIC = b"CSMP"
+HEADER_SIZE = len(MAGIC) + 4
+
+
+class PackedRecords:
+    """Read access to a packed file, held in memory or memory-mapped."""
+
+    def __init__(self, buffer: Union[bytes, mmap.mmap]) -> None:
+        """Initializes the reader.
+
+        Args:
+            buffer: The contents of the packed file.
+        """
+        if buffer[: len(MAGIC)] != MAGIC:
+            raise ValueError("Not a packed records file.")
+        (n_records,) = struct.unpack_from("<I", buffer, len(MAGIC))
+        self.buffer = buffer
+        self.offsets = np.frombuffer(
+            buffer, dtype="<u8", count=n_records + 1, offset=HEADER_SIZE
+        )
+        self.data_start = HEADER_SIZE + self.offsets.nbytes
+
+    @classmethod
+    def from_file(cls, filepath: pathlib.Path) -> "PackedRecords":
+        """Memory-maps a packed file, read-only.
+
+        Args:
+            filepath: The path of the packed file.
+
+        Returns:
+            The reader.
+        """
+        with open(filepath, "rb") as file:
+            return cls(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: int) -> bytes:
+        """Reads and decompresses a record.
+
+        Args:
+            index: The index of the record.
+
+        Returns:
+            The decompressed record.
+        """
+        if not 0 <= index < len(self):
+            raise IndexError(f"Record index out of range: {index}")
+        start = self.data_start + int(self.offsets[index])
+        end = self.data_start + int(self.offsets[index + 1])
+        if start == end:
+            return b""
+        return zlib.decompress(self.buffer[start:end])
+
+
+def write_packed_records(
+    filepath: pathlib.Path, records: Iterable[bytes], level: int = 9
+) -> None:
+    """Writes records to a packed file.
+
+    Args:
+        filepath: The path of the output file.
+        records: The uncompressed records.
+        level: The zlib compression level.
+    """
+    compressed = [zlib.compress(record, level) if record else b"" for record in records]
+    offsets = np.zeros(len(compressed) + 1, dtype="<u8")
+    np.cumsum([len(record) for record in compressed], out=offsets[1:])
+    with open(filepath, "wb") as file:
+        file.write(MAGIC)
+        file.write(struct.pack("<I", len(compressed)))
+        file.write(offsets.tobytes())
+        for record in compressed:
+            file.write(record)
@@ -0,0 +1,188 @@
+"""Quantized storage of similarity results.
+
+Similarity vectors only drive a colour map, so they can be stored at reduced
+precision. 'float16' halves the size of float32. 'uint8' maps every row (the last
+axis) linearly onto 0..255 with a per-row scale and offset.
+"""
+import dataclasses
+import pathlib
+from typing import Any, Optional, Tuple
+
+import numpy as np
+from numpy.lib import format as npy_format
+
+PRECISIONS = ("float32", "float16", "uint8")
+
+
+@dataclasses.dataclass
+class QuantizedArray:
+    """An array stored at reduced precision.
+
+    For 'uint8', `scale` and `offset` have the shape of `data` without its last
+    axis, and `values = data * scale + offset`.
+    """
+
+    data: np.ndarray
+    scale: Optional[np.ndarray] = None
+    offset: Optional[np.ndarray] = None
+
+    @property
+    def precision(self) -> str:
+        """The storage precision."""
+        return str(self.data.dtype)
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        """The shape of the stored array."""
+        return self.data.shape
+
+    @property
+    def nbytes(self) -> int:
+        """The number of bytes used to store the array."""
+        return sum(
+            part.nbytes
+            for part in (self.data, self.scale, self.offset)
+            if part is not None
+        )
+
+    def __getitem__(self, index: Any) -> np.ndarray:
+        """Dequantizes a part of the array, indexed along the leading axes.
+
+        Args:
+            index: The index into the leading axes.
+
+        Returns:
+            The dequantized values as float64.
+        """
+        values = np.asarray(self.data[index], dtype=np.float64)
+        if self.scale is None or self.offset is None:
+            return values
+        scale = np.asarray(self.scale[index], dtype=np.float64)[..., np.newaxis]
+        offset = np.asarray(self.offset[index], dtype=np.float64)[..., np.newaxis]
+        return values * scale + offset
+
+    def __setitem__(self, index: Any, values: np.ndarray) -> None:
+        """Quantizes values into a part of the array.
+
+        Args:
+            index: The index into the leading axes.
+            values: The values to store.
+        """
+        quantized = quantize(values, self.precision)
+        self.data[index] = quantized.data
+        if self.scale is not None and self.offset is not None:
+            self.scale[index] = quantized.scale
+            self.offset[index] = quantized.offset
+
+    def dequantize(self) -> np.ndarray:
+        """Dequantizes the full array.
+
+        Returns:
+            The dequantized values as float64.
+        """
+        return self[...]
+
+
+def quantize(values: np.ndarray, precision: str) -> QuantizedArray:
+    """Quantizes an array.
+
+    Args:
+        values: The array to quantize.
+        precision: The storage precision, one of PRECISIONS.
+
+    Returns:
+        The quantized array.
+    """
+    if precision not in PRECISIONS:
+        raise ValueError(f"Invalid precision: {precision}")
+    values = np.asarray(values)
+    if precision != "uint8":
+        return QuantizedArray(data=values.astype(precision))
+
+    offset = np.asarray(values.min(axis=-1), dtype=np.float32)
+    scale = np.asarray((values.max(axis=-1) - offset) / 255, dtype=np.float32)
+    scale = np.where(scale == 0, np.float32(1), scale)
+    data = np.rint((values - offset[..., np.newaxis]) / scale[..., np.newaxis])
+    return QuantizedArray(
+        data=np.clip(data, 0, 255).astype(np.uint8), scale=scale, offset=offset
+    )
+
+
+def _scale_offset_paths(filepath: pathlib.Path) -> Tuple[pathlib.Path, pathlib.Path]:
+    """Gets the paths of the scale and offset files that accompany a uint8 array.
+
+    Args:
+        filepath: The path of the .npy data file.
+
+    Returns:
+        The paths of the scale and offset .npy files.
+    """
+    stem = filepath.with_suffix("")
+    return (
+        stem.with_name(f"{stem.name}_scale.npy"),
+        stem.with_name(f"{stem.name}_offset.npy"),
+    )
+
+
+def create_memmap(
+    filepath: pathlib.Path, shape: Tuple[int, ...], precision: str
+) -> QuantizedArray:
+    """Creates a writable, memory-mapped quantized array on disk.
+
+    Args:
+        filepath: The path of the .npy data file. For 'uint8', the scale and
+            offset are stored in '_scale.npy' and '_offset.npy' files next to it.
+        shape: The shape of the array.
+        precision: The storage precision, one of PRECISIONS.
+
+    Returns:
+        The memory-mapped quantized array.
+    """
+    if precision not in PRECISIONS:
+        raise ValueError(f"Invalid precision: {precision}")
+    data = npy_format.open_memmap(filepath, mode="w+", dtype=precision, shape=shape)
+    if precision != "uint8":
+        return QuantizedArray(data=data)
+
+    scale_path, offset_path = _scale_offset_paths(filepath)
+    return QuantizedArray(
+        data=data,
+        scale=npy_format.open_memmap(
+            scale_path, mode="w+", dtype=np.float32, shape=shape[:-1]
+        ),
+        offset=npy_format.open_memmap(
+            offset_path, mode="w+", dtype=np.float32, shape=shape[:-1]
+        ),
+    )
+
+
+def load_memmap(filepath: pathlib.Path) -> QuantizedArray:
+    """Memory-maps a quantized array from disk, read-only.
+
+    Args:
+        filepath: The path of the .npy data file.
+
+    Returns:
+        The memory-mapped quantized array.
+    """
+    data = np.load(filepath, mmap_mode="r")
+    if data.dtype != np.uint8:
+        return QuantizedArray(data=data)
+
+    scale_path, offset_path = _scale_offset_paths(filepath)
+    return QuantizedArray(
+        data=data,
+        scale=np.load(scale_path, mmap_mode="r"),
+        offset=np.load(offset_path, mmap_mode="r"),
+    )
+
+
+def flush(array: QuantizedArray) -> None:
+    """Flushes a memory-mapped quantized array to disk.
+
+    Args:
+        array: The quantized array.
+    """
+    for part in (array.data, array.scale, array.offset):
+        if isinstance(part, np.memmap):
+            part.flush()
@@ -0,0 +1,165 @@
+"""Pre-encoded responses with compression and conditional request handling.
+
+Payloads that only depend on a few request parameters can be encoded once and
+served as stored bytes. Every payload keeps a gzip variant, a brotli variant if
+the optional brotli package is installed, and a strong ETag per variant, so that
+repeat requests with a matching If-None-Match header are answered with 304 Not
+Modified. Bodies that are already compressed, such as PNG images, are only
+stored as is.
+"""
+import dataclasses
+import gzip
+import hashlib
+import logging
+from typing import Optional, Tuple
+
+import fastapi
+from fastapi import status
+
+from src.core import settings, utils
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+config = settings.get_settings()
+LOGGER_NAME = config.LOGGER_NAME
+
+logger = logging.getLogger(LOGGER_NAME)
+
+
+@dataclasses.dataclass(frozen=True)
+class EncodedPayload:
+    """An encoded response body with its compressed variants and ETags."""
+
+    body: bytes
+    gzip_body: Optional[bytes]
+    media_type: str
+    etag: str
+    gzip_etag: Optional[str]
+    br_body: Optional[bytes] = None
+    br_etag: Optional[str] = None
+
+    @classmethod
+    def from_body(
+        cls, body: bytes, media_type: str, compress: bool = True
+    ) -> "EncodedPayload":
+        """Compresses a body and computes its ETags.
+
+        Args:
+            body: The uncompressed response body.
+            media_type: The media type of the body.
+            compress: Whether to add compressed variants of the body.
+
+        Returns:
+            The encoded payload.
+        """
+        digest = hashlib.sha256(body).hexdigest()
+        if not compress:
+            return cls(
+                body=body,
+                gzip_body=None,
+                media_type=media_type,
+                etag=f'"{digest}"',
+                gzip_etag=None,
+            )
+        return cls(
+            body=body,
+            gzip_body=gzip.compress(body, compresslevel=9, mtime=0),
+            media_type=media_type,
+            etag=f'"{digest}"',
+            gzip_etag=f'"{digest}-gzip"',
+            br_body=None if brotli is None else brotli.compress(body, quality=11),
+            br_etag=None if brotli is None else f'"{digest}-br"',
+        )
+
+    @property
+    def nbytes(self) -> int:
+        """The number of bytes held by the payload."""
+        return len(self.body) + len(self.gzip_body or b"") + len(self.br_body or b"")
+
+
+def build_response(
+    request: fastapi.Request, payload: EncodedPayload
+) -> fastapi.Response:
+    """Creates a response for a pre-encoded payload.
+
+    The brotli variant is sent if the request accepts it and the payload has
+    one, otherwise the gzip variant if the request accepts it and the payload
+    has one. If the request's
+    If-None-Match header matches the ETag of the selected variant, an empty 304
+    response is sent instead.
+
+    Args:
+        request: The request.
+        payload: The pre-encoded payload.
+
+    Returns:
+        The response, with cache control headers added.
+    """
+    encoding, body, etag = _select_variant(
+        payload, request.headers.get("accept-encoding", "")
+    )
+    headers = {"ETag": etag, "Vary": "Accept, Accept-Encoding"}
+
+    if _etag_matches(request.headers.get("if-none-match", ""), etag):
+        logger.info("ETag matches, returning 304.")
+        response = fastapi.Response(
+            status_code=status.HTTP_304_NOT_MODIFIED, headers=headers
+        )
+        return utils.add_cache_control(response)
+
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    response = fastapi.Response(
+        content=body, media_type=payload.media_type, headers=headers
+    )
+    return utils.add_cache_control(response)
+
+
+def _select_variant(
+    payload: EncodedPayload, accept_encoding: str
+) -> Tuple[Optional[str], bytes, str]:
+    """Selects the variant of a payload to send.
+
+    Args:
+        payload: The pre-encoded payload.
+        accept_encoding: The Accept-Encoding header value.
+
+    Returns:
+        The content encoding, or None for the uncompressed body, the body and
+        its ETag.
+    """
+    if (
+        payload.br_body is not None
+        and payload.br_etag is not None
+        and utils.header_accepts(accept_encoding, "br")
+    ):
+        return "br", payload.br_body, payload.br_etag
+    if (
+        payload.gzip_body is not None
+        and payload.gzip_etag is not None
+        and utils.header_accepts(accept_encoding, "gzip")
+    ):
+        return "gzip", payload.gzip_body, payload.gzip_etag
+    return None, payload.body, payload.etag
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Checks whether an If-None-Match header matches an ETag.
+
+    Args:
+        if_none_match: The If-None-Match header value.
+        etag: The ETag of the response.
+
+    Returns:
+        True if the header is '*' or lists the ETag, using weak comparison.
+    """
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    if "*" in candidates:
+        return True
+    return etag in [
+        candidate[2:] if candidate.startswith("W/") else candidate
+        for candidate in candidates
+    ]
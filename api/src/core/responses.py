@@ -0,0 +1,59 @@
+"""Response classes for the API."""
+import json
+from typing import Any
+
+import numpy as np
+from fastapi import responses
+
+
+class NumpyJSONResponse(responses.JSONResponse):
+    """JSON response that serializes numpy arrays and scalars directly.
+
+    Returning large numeric payloads through FastAPI's default path validates
+    them against the response model and walks them with `jsonable_encoder`
+    before encoding. This response skips both: numpy arrays are converted with
+    `tolist()` and encoded by the C JSON encoder in a single pass.
+    """
+
+    def render(self, content: Any) -> bytes:
+        """Renders the content as compact JSON.
+
+        Args:
+            content: The content, which may contain numpy arrays and scalars.
+
+        Returns:
+            The encoded content.
+        """
+        return encode_json(content)
+
+
+def encode_json(content: Any) -> bytes:
+    """Encodes content that may contain numpy arrays as compact JSON.
+
+    Args:
+        content: The content, which may contain numpy arrays and scalars.
+
+    Returns:
+        The encoded content.
+    """
+    return json.dumps(
+        content,
+        default=_numpy_default,
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+def _numpy_default(value: Any) -> Any:
+    """Converts numpy objects to JSON-serializable Python objects.
+
+    Args:
+        value: The object that the JSON encoder cannot serialize.
+
+    Returns:
+        The converted object.
+    """
+    if isinstance(value, (np.ndarray, np.generic)):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
@@ -1,7 +1,10 @@
 """Settings for the API."""
 import functools
 import logging
+import os
 import pathlib
+import tempfile
+from typing import Literal, Optional
 
 import pydantic
 
@@ -18,6 +21,52 @@ class Settings(pydantic.BaseSettings):  # type: ignore[valid-type, misc]
 
     AZURE_STORAGE_BLOB_URL: str = pydantic.Field("", env="AZURE_STORAGE_BLOB_URL")
     AZURE_ACCESS_KEY: pydantic.SecretStr = pydantic.Field("", env="AZURE_ACCESS_KEY")
+    AZURE_STORAGE_CONNECTION_STRING: pydantic.SecretStr = pydantic.Field(
+        "", env="AZURE_STORAGE_CONNECTION_STRING"
+    )
+    AZURE_CONTAINER_NAME: str = pydantic.Field("main", env="AZURE_CONTAINER_NAME")
+    AZURE_CONNECTION_POOL_SIZE: int = pydantic.Field(
+        16, env="AZURE_CONNECTION_POOL_SIZE"
+    )
+    AZURE_MAX_CONCURRENCY: int = pydantic.Field(4, env="AZURE_MAX_CONCURRENCY")
+    AZURE_MAX_CHUNK_SIZE: int = pydantic.Field(
+        4 * 1024 * 1024, env="AZURE_MAX_CHUNK_SIZE"
+    )
+
+    CACHE_DIR: pathlib.Path = pydantic.Field(
+        pathlib.Path(tempfile.gettempdir()) / "cross-species-mapper-cache",
+        env="CACHE_DIR",
+    )
+    CACHE_MAX_BYTES: int = pydantic.Field(2 * 1024**3, env="CACHE_MAX_BYTES")
+    CACHE_MEMORY_BYTES: int = pydantic.Field(4 * 1024**3, env="CACHE_MEMORY_BYTES")
+    SIMILARITY_CACHE_SIZE: int = pydantic.Field(256, env="SIMILARITY_CACHE_SIZE")
+    SIMILARITY_CACHE_PRECISION: Literal["float32", "float16", "uint8"] = pydantic.Field(
+        "float16", env="SIMILARITY_CACHE_PRECISION"
+    )
+    GRAPH_CACHE_SIZE: int = pydantic.Field(512, env="GRAPH_CACHE_SIZE")
+    GRAPH_PRECISION: int = pydantic.Field(2, env="GRAPH_PRECISION")
+    GRAPH_THUMBNAIL_WIDTH: int = pydantic.Field(320, env="GRAPH_THUMBNAIL_WIDTH")
+    NEUROQUERY_CACHE_SIZE: int = pydantic.Field(4096, env="NEUROQUERY_CACHE_SIZE")
+
+    IO_WORKERS: int = pydantic.Field(32, env="IO_WORKERS")
+    CPU_WORKERS: int = pydantic.Field(
+        default_factory=lambda: os.cpu_count() or 1, env="CPU_WORKERS"
+    )
+
+    CPU_EXECUTOR_MODE: Literal["thread", "process"] = pydantic.Field(
+        "thread", env="CPU_EXECUTOR_MODE"
+    )
+
+    WARMUP_ENABLED: bool = pydantic.Field(True, env="WARMUP_ENABLED")
+    WARMUP_WORKERS: int = pydantic.Field(8, env="WARMUP_WORKERS")
+    WARMUP_RETRIES: int = pydantic.Field(3, env="WARMUP_RETRIES")
+    WARMUP_RETRY_DELAY: float = pydantic.Field(1.0, env="WARMUP_RETRY_DELAY")
+
+    ADMIN_TOKEN: pydantic.SecretStr = pydantic.Field("", env="ADMIN_TOKEN")
+
+    SIMILARITY_CUBE_DIR: Optional[pathlib.Path] = pydantic.Field(
+        None, env="SIMILARITY_CUBE_DIR"
+    )
 
 
 @functools.lru_cache()
@@ -0,0 +1,92 @@
+"""Numpy arrays shared between processes through memory-mapped files.
+
+The arrays are written once to .npy files, by default in the RAM-backed
+/dev/shm where it exists, and every process memory-maps them read-only. All
+processes share the same physical pages, so memory does not grow with the number
+of processes that attach the arrays.
+"""
+import dataclasses
+import logging
+import pathlib
+import shutil
+import tempfile
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from src.core import settings
+
+config = settings.get_settings()
+LOGGER_NAME = config.LOGGER_NAME
+
+logger = logging.getLogger(LOGGER_NAME)
+
+SHARED_MEMORY_DIR = pathlib.Path("/dev/shm")
+
+
+@dataclasses.dataclass(frozen=True)
+class SharedArrays:
+    """A picklable handle to arrays in memory-mapped files.
+
+    Attributes:
+        directory: The directory of the array files.
+        names: The names of the arrays, in the order of their files.
+        metadata: Picklable metadata that describes the arrays.
+    """
+
+    directory: pathlib.Path
+    names: Tuple[str, ...]
+    metadata: Dict[str, Any] = dataclasses.field(default_factory=dict)
+
+    @classmethod
+    def create(
+        cls,
+        arrays: Dict[str, np.ndarray],
+        metadata: Optional[Dict[str, Any]] = None,
+        parent_dir: Optional[pathlib.Path] = None,
+    ) -> "SharedArrays":
+        """Writes arrays to files that other processes can memory-map.
+
+        Args:
+            arrays: The arrays, keyed by name.
+            metadata: Picklable metadata that describes the arrays.
+            parent_dir: The directory to create the array directory in. Defaults
+                to /dev/shm if it exists, otherwise the system temporary
+                directory.
+
+        Returns:
+            The handle to the arrays.
+        """
+        if parent_dir is None and SHARED_MEMORY_DIR.is_dir():
+            parent_dir = SHARED_MEMORY_DIR
+        directory = pathlib.Path(
+            tempfile.mkdtemp(prefix="shared-arrays-", dir=parent_dir)
+        )
+        for index, array in enumerate(arrays.values()):
+            np.save(directory / f"{index}.npy", np.ascontiguousarray(array))
+        logger.info(
+            "Shared %s arrays of %s bytes in %s.",
+            len(arrays),
+            sum(array.nbytes for array in arrays.values()),
+            directory,
+        )
+        return cls(directory, tuple(arrays), dict(metadata or {}))
+
+    def load(self) -> Dict[str, np.ndarray]:
+        """Memory-maps the arrays, read-only.
+
+        Returns:
+            The arrays, keyed by name.
+        """
+        return {
+            name: np.load(self.directory / f"{index}.npy", mmap_mode="r")
+            for index, name in enumerate(self.names)
+        }
+
+    def close(self) -> None:
+        """Deletes the array files.
+
+        Processes that mapped the arrays keep their mappings until they release
+        them.
+        """
+        shutil.rmtree(self.directory, ignore_errors=True)
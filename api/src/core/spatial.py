@@ -0,0 +1,98 @@
+"""Spatial indexing of surface vertices."""
+from typing import Optional, Tuple
+
+import numpy as np
+import numpy.typing as npt
+
+
+class UniformGridIndex:
+    """Uniform grid index for radius and nearest-neighbour queries on points.
+
+    Points are bucketed into cubic cells of equal size. A query only computes
+    distances to the points in the cells that overlap the query ball, rather than
+    to all points.
+    """
+
+    def __init__(self, points: npt.ArrayLike, cell_size: Optional[float] = None):
+        """Builds the index.
+
+        Args:
+            points: The (n_points, n_dims) point coordinates.
+            cell_size: The edge length of a grid cell. Defaults to a size that
+                gives roughly as many cells along the longest axis as the cube
+                root of the number of points.
+        """
+        self.points = np.asarray(points, dtype=np.float64)
+        self.origin = self.points.min(axis=0)
+        extent = self.points.max(axis=0) - self.origin
+
+        if cell_size is None:
+            cell_size = float(extent.max()) / max(len(self.points) ** (1 / 3), 1)
+        self.cell_size = cell_size if cell_size > 0 else 1.0
+
+        cells = np.floor((self.points - self.origin) / self.cell_size).astype(np.int64)
+        self.shape = tuple(int(n) for n in cells.max(axis=0) + 1)
+        cell_ids = np.ravel_multi_index(cells.T, self.shape)
+
+        self.order = np.argsort(cell_ids, kind="stable")
+        self.cell_start = np.searchsorted(
+            cell_ids[self.order], np.arange(np.prod(self.shape) + 1)
+        )
+
+    def query_ball(
+        self, point: npt.ArrayLike, radius: float
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Finds all points within a radius of a point.
+
+        Args:
+            point: The query point.
+            radius: The query radius, inclusive.
+
+        Returns:
+            The indices of the points in ascending order, and their distances
+            to the query point.
+        """
+        point = np.asarray(point, dtype=np.float64)
+        low = np.floor((point - radius - self.origin) / self.cell_size)
+        high = np.floor((point + radius - self.origin) / self.cell_size)
+        low = np.maximum(low, 0).astype(np.int64)
+        high = np.minimum(high, np.array(self.shape) - 1).astype(np.int64)
+        if np.any(low > high):
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+
+        ranges = [np.arange(lo, hi + 1) for lo, hi in zip(low, high)]
+        cell_ids = np.ravel_multi_index(
+            [axis.ravel() for axis in np.meshgrid(*ranges, indexing="ij")], self.shape
+        )
+        candidates = np.concatenate(
+            [
+                self.order[self.cell_start[cell] : self.cell_start[cell + 1]]
+                for cell in cell_ids
+            ]
+        )
+        candidates.sort()
+
+        distances = np.sqrt(np.sum((self.points[candidates] - point) ** 2, axis=1))
+        within = distances <= radius
+        return candidates[within], distances[within]
+
+    def query_nearest(self, point: npt.ArrayLike) -> Tuple[int, float]:
+        """Finds the point nearest to a query point.
+
+        Args:
+            point: The query point.
+
+        Returns:
+            The index of the nearest point and its distance to the query point.
+        """
+        point = np.asarray(point, dtype=np.float64)
+        outside = np.maximum(self.origin - point, 0) + np.maximum(
+            point - self.origin - np.array(self.shape) * self.cell_size, 0
+        )
+        radius = float(np.linalg.norm(outside)) + self.cell_size
+        while True:
+            indices, distances = self.query_ball(point, radius)
+            if len(indices) > 0:
+                nearest = int(np.argmin(distances))
+                return int(indices[nearest]), float(distances[nearest])
+            radius *= 2
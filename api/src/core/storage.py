@@ -0,0 +1,340 @@
+"""Storage backends for the data files of the API.
+
+All backends expose files by name. Missing files raise FileNotFoundError,
+regardless of the backend.
+"""
+import abc
+import hashlib
+import logging
+import os
+import pathlib
+import tempfile
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from azure.core import exceptions as azure_exceptions
+from azure.storage import blob
+
+from src.core import executors, settings
+
+config = settings.get_settings()
+LOGGER_NAME = config.LOGGER_NAME
+
+logger = logging.getLogger(LOGGER_NAME)
+
+
+class StorageBackend(abc.ABC):
+    """Interface for a store of named files.
+
+    Attributes:
+        supports_local_path: Whether local_path is supported, i.e. whether the
+            backend keeps its files on local disk.
+    """
+
+    supports_local_path = False
+
+    @abc.abstractmethod
+    def read_bytes(self, name: str) -> bytes:
+        """Reads a file.
+
+        Args:
+            name: The name of the file.
+
+        Returns:
+            The file contents.
+        """
+
+    @abc.abstractmethod
+    def exists(self, name: str) -> bool:
+        """Checks whether a file exists.
+
+        Args:
+            name: The name of the file.
+
+        Returns:
+            True if the file exists, False otherwise.
+        """
+
+    async def read_bytes_async(self, name: str) -> bytes:
+        """Reads a file without blocking the event loop.
+
+        The read runs on the I/O executor.
+
+        Args:
+            name: The name of the file.
+
+        Returns:
+            The file contents.
+        """
+        return await executors.run_io(self.read_bytes, name)
+
+    def local_path(self, name: str) -> pathlib.Path:
+        """Gets the path of a file on local disk.
+
+        Only backends with supports_local_path set support this.
+
+        Args:
+            name: The name of the file.
+
+        Returns:
+            The path of the file.
+        """
+        raise NotImplementedError(
+            f"{type(self).__name__} does not store files on local disk."
+        )
+
+
+class LocalStorage(StorageBackend):
+    """Files in a local directory."""
+
+    supports_local_path = True
+
+    def __init__(self, root: pathlib.Path) -> None:
+        """Initializes the storage.
+
+        Args:
+            root: The directory that contains the files.
+        """
+        self.root = pathlib.Path(root)
+
+    def read_bytes(self, name: str) -> bytes:
+        return self.local_path(name).read_bytes()
+
+    def exists(self, name: str) -> bool:
+        return (self.root / name).is_file()
+
+    def local_path(self, name: str) -> pathlib.Path:
+        filepath = self.root / name
+        if not filepath.is_file():
+            raise FileNotFoundError(f"File not found: {name}")
+        return filepath
+
+
+class AzureBlobStorage(StorageBackend):
+    """Blobs in an Azure blob storage container."""
+
+    def __init__(self, container: blob.ContainerClient, max_concurrency: int = 1):
+        """Initializes the storage.
+
+        Args:
+            container: The container client.
+            max_concurrency: The number of parallel ranged requests per download.
+        """
+        self.container = container
+        self.max_concurrency = max_concurrency
+
+    def read_bytes(self, name: str) -> bytes:
+        logger.debug("Downloading %s from blob.", name)
+        blob_client = self.container.get_blob_client(name)
+        try:
+            downloader = blob_client.download_blob(max_concurrency=self.max_concurrency)
+        except azure_exceptions.ResourceNotFoundError as exc_info:
+            raise FileNotFoundError(f"Blob not found: {name}") from exc_info
+        return downloader.readall()
+
+    def exists(self, name: str) -> bool:
+        return bool(self.container.get_blob_client(name).exists())
+
+
+class InMemoryStorage(StorageBackend):
+    """Files held in a dictionary, e.g. for tests."""
+
+    def __init__(self, files: Optional[Dict[str, bytes]] = None) -> None:
+        """Initializes the storage.
+
+        Args:
+            files: The file contents keyed by name.
+        """
+        self.files = dict(files or {})
+
+    def read_bytes(self, name: str) -> bytes:
+        try:
+            return self.files[name]
+        except KeyError as exc_info:
+            raise FileNotFoundError(f"File not found: {name}") from exc_info
+
+    def exists(self, name: str) -> bool:
+        return name in self.files
+
+
+class DiskCacheStorage(StorageBackend):
+    """Read-through disk cache in front of another backend.
+
+    Files are fetched from the backend on first access and stored on local disk
+    under the hash of their name, alongside the SHA-256 hash of their contents.
+    Entries whose contents no longer match their hash are fetched again. When
+    the cache exceeds its size limit, the least recently used entries are
+    evicted. Writes go to a temporary file that is atomically renamed, so
+    concurrent readers never see partial files.
+    """
+
+    supports_local_path = True
+
+    def __init__(
+        self, backend: StorageBackend, cache_dir: pathlib.Path, max_bytes: int
+    ) -> None:
+        """Initializes the cache.
+
+        Args:
+            backend: The backend to read through to.
+            cache_dir: The directory to store cached files in.
+            max_bytes: The maximum total size of the cached files.
+        """
+        self.backend = backend
+        self.cache_dir = pathlib.Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._sizes = {entry: size for _, size, entry in self._scan()}
+        self._total = sum(self._sizes.values())
+
+    def read_bytes(self, name: str) -> bytes:
+        filepath = self._cache_path(name)
+        contents = self._read_cached(filepath)
+        if contents is not None:
+            return contents
+
+        contents = self.backend.read_bytes(name)
+        self._write_cached(filepath, contents)
+        return contents
+
+    def exists(self, name: str) -> bool:
+        return self._cache_path(name).is_file() or self.backend.exists(name)
+
+    def local_path(self, name: str) -> pathlib.Path:
+        filepath = self._cache_path(name)
+        if not self._touch_cached(filepath):
+            self._write_cached(filepath, self.backend.read_bytes(name))
+        return filepath
+
+    def _cache_path(self, name: str) -> pathlib.Path:
+        """Gets the cache path of a file.
+
+        Args:
+            name: The name of the file.
+
+        Returns:
+            The path of the cached file. The suffix of the name is kept so that
+            readers that look at file extensions still work.
+        """
+        digest = hashlib.sha256(name.encode()).hexdigest()
+        return self.cache_dir / f"{digest}{''.join(pathlib.Path(name).suffixes)}"
+
+    def _read_cached(self, filepath: pathlib.Path) -> Optional[bytes]:
+        """Reads a cached file if it exists and matches its content hash.
+
+        Args:
+            filepath: The path of the cached file.
+
+        Returns:
+            The file contents, or None on a cache miss.
+        """
+        hash_path = filepath.with_name(filepath.name + ".sha256")
+        try:
+            contents = filepath.read_bytes()
+            expected_hash = hash_path.read_text()
+        except FileNotFoundError:
+            return None
+        if hashlib.sha256(contents).hexdigest() != expected_hash:
+            logger.warning("Cached file %s is corrupt, fetching it again.", filepath)
+            return None
+        self._touch_cached(filepath)
+        return contents
+
+    def _touch_cached(self, filepath: pathlib.Path) -> bool:
+        """Marks a cached file as recently used without reading it.
+
+        Unlike _read_cached, the contents are not checked against their hash, so
+        this is cheap for large files.
+
+        Args:
+            filepath: The path of the cached file.
+
+        Returns:
+            True if the file and its hash are cached, False otherwise. A file
+            that is evicted concurrently counts as not cached.
+        """
+        hash_path = filepath.with_name(filepath.name + ".sha256")
+        try:
+            os.utime(filepath)
+        except FileNotFoundError:
+            return False
+        return hash_path.is_file()
+
+    def _write_cached(self, filepath: pathlib.Path, contents: bytes) -> None:
+        """Writes a file to the cache atomically and evicts old entries.
+
+        Args:
+            filepath: The path of the cached file.
+            contents: The file contents.
+        """
+        hash_path = filepath.with_name(filepath.name + ".sha256")
+        _atomic_write(hash_path, hashlib.sha256(contents).hexdigest().encode())
+        _atomic_write(filepath, contents)
+        with self._lock:
+            self._total += len(contents) - self._sizes.get(filepath, 0)
+            self._sizes[filepath] = len(contents)
+            if self._total > self.max_bytes:
+                self._evict(keep=filepath)
+
+    def _scan(self) -> List[Tuple[float, int, pathlib.Path]]:
+        """Lists the cached files.
+
+        Returns:
+            The modification time, size and path of every cached file.
+        """
+        entries = []
+        for entry in self.cache_dir.iterdir():
+            if entry.suffix in (".sha256", ".tmp"):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            if entry.is_file():
+                entries.append((stat.st_mtime, stat.st_size, entry))
+        return entries
+
+    def _evict(self, keep: pathlib.Path) -> None:
+        """Evicts the least recently used files until the cache fits its limit.
+
+        The cache size is tracked as files are written, so the directory is only
+        walked once the tracked size exceeds the limit. The walk also picks up
+        files that other processes wrote to or removed from the directory. Must
+        be called with the lock held.
+
+        Args:
+            keep: A file that is never evicted, i.e. the one just written.
+        """
+        entries = self._scan()
+        self._sizes = {entry: size for _, size, entry in entries}
+        self._total = sum(self._sizes.values())
+        for _, size, entry in sorted(entries, key=lambda entry: entry[0]):
+            if self._total <= self.max_bytes:
+                break
+            if entry == keep:
+                continue
+            logger.info("Evicting %s from the disk cache.", entry.name)
+            entry.unlink(missing_ok=True)
+            entry.with_name(entry.name + ".sha256").unlink(missing_ok=True)
+            del self._sizes[entry]
+            self._total -= size
+
+
+def _atomic_write(filepath: pathlib.Path, contents: bytes) -> None:
+    """Writes a file by renaming a completed temporary file into place.
+
+    Args:
+        filepath: The path of the file.
+        contents: The file contents.
+    """
+    file_descriptor, temp_name = tempfile.mkstemp(
+        dir=filepath.parent, prefix=filepath.name, suffix=".tmp"
+    )
+    try:
+        with os.fdopen(file_descriptor, "wb") as temp_file:
+            temp_file.write(contents)
+        os.replace(temp_name, filepath)
+    except BaseException:
+        pathlib.Path(temp_name).unlink(missing_ok=True)
+        raise
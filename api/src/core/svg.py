@@ -0,0 +1,93 @@
+"""Minification and rasterization of SVG graphs.
+
+Minification strips the XML declaration, doctype, comments and metadata, drops
+whitespace between tags, and rounds the coordinates in geometry attributes. The
+graphs are plots rendered at a few hundred pixels, so two decimals are well below
+a pixel. Transforms are left as is: their scale factors and matrix coefficients
+are relative, and rounding them to two decimals would distort the glyphs that
+they scale.
+
+Rasterization requires the optional cairosvg package.
+"""
+import re
+
+try:
+    import cairosvg
+except ImportError:
+    cairosvg = None
+
+GEOMETRY_ATTRIBUTES = (
+    "d",
+    "points",
+    "viewBox",
+    "x",
+    "y",
+    "x1",
+    "y1",
+    "x2",
+    "y2",
+    "cx",
+    "cy",
+    "r",
+    "rx",
+    "ry",
+    "width",
+    "height",
+)
+
+_REMOVED = re.compile(
+    rb"<\?xml.*?\?>|<!DOCTYPE[^>[]*(?:\[.*?\])?\s*>|<!--.*?-->"
+    rb"|<metadata[\s>].*?</metadata>",
+    re.DOTALL,
+)
+_BETWEEN_TAGS = re.compile(rb">\s+<")
+_ATTRIBUTE = re.compile(
+    rb"(\s(?:" + b"|".join(name.encode() for name in GEOMETRY_ATTRIBUTES) + rb')=")'
+    rb'([^"]*)(")'
+)
+_NUMBER = re.compile(rb"-?(?:\d+\.\d*|\.\d+|\d+)(?:[eE][-+]?\d+)?")
+_PATH_COMMAND = re.compile(rb"\s*([MLHVCSQTAZmlhvcsqtaz])\s*")
+
+
+def minify_svg(body: bytes, precision: int = 2) -> bytes:
+    """Minifies an SVG document.
+
+    Args:
+        body: The SVG document.
+        precision: The number of decimals to keep in geometry attributes.
+
+    Returns:
+        The minified SVG document.
+    """
+
+    def round_number(match: "re.Match[bytes]") -> bytes:
+        number = round(float(match.group()), precision)
+        text = f"{number:.{precision}f}".rstrip("0").rstrip(".")
+        return b"0" if text in ("", "-0") else text.encode()
+
+    def minify_attribute(match: "re.Match[bytes]") -> bytes:
+        name, value, quote = match.groups()
+        value = _NUMBER.sub(round_number, value)
+        if name.strip() == b'd="':
+            value = _PATH_COMMAND.sub(rb"\1", value)
+        return name + b" ".join(value.split()) + quote
+
+    body = _REMOVED.sub(b"", body)
+    body = _BETWEEN_TAGS.sub(b"><", body)
+    return _ATTRIBUTE.sub(minify_attribute, body).strip()
+
+
+def render_png(body: bytes, width: int) -> bytes:
+    """Renders an SVG document to a PNG image.
+
+    Args:
+        body: The SVG document.
+        width: The width of the image in pixels. The height follows from the
+            aspect ratio of the document.
+
+    Returns:
+        The PNG image.
+    """
+    if cairosvg is None:
+        raise RuntimeError("Rendering SVG requires the cairosvg package.")
+    return cairosvg.svg2png(bytestring=body, output_width=width)
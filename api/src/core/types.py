@@ -2,17 +2,31 @@
 Kept separate from the main code to avoid circular imports.
 """
 import dataclasses
+from typing import Any, Dict, FrozenSet, Iterable, List, Mapping, Tuple
 
 import numpy as np
+import numpy.typing as npt
+
+from src.core import spatial
 
 
 @dataclasses.dataclass
 class Surface:
-    """Convenience class for surface handling."""
+    """Convenience class for surface handling.
+
+    A spatial index of the vertices is built on construction, so that radius and
+    nearest-vertex queries do not need to visit every vertex.
+    """
 
     name: str
     vertices: np.ndarray
     faces: np.ndarray
+    index: spatial.UniformGridIndex = dataclasses.field(
+        init=False, repr=False, compare=False
+    )
+
+    def __post_init__(self) -> None:
+        self.index = spatial.UniformGridIndex(self.vertices)
 
     @property
     def species(self) -> str:
@@ -23,3 +37,310 @@ class Surface:
     def side(self) -> str:
         """The hemisphere of the surface."""
         return self.name.split("_")[1]
+
+    def vertices_within(
+        self, vertex: int, radius: float
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Finds the vertices within a Euclidean radius of a vertex.
+
+        Args:
+            vertex: The index of the center vertex.
+            radius: The radius, inclusive.
+
+        Returns:
+            The indices of the vertices in ascending order, and their distances
+            to the center vertex.
+        """
+        return self.index.query_ball(self.vertices[vertex], radius)
+
+    def nearest_vertex(self, point: npt.ArrayLike) -> int:
+        """Finds the vertex nearest to a point.
+
+        Args:
+            point: The coordinates of the point.
+
+        Returns:
+            The index of the nearest vertex.
+        """
+        return self.index.query_nearest(point)[0]
+
+
+@dataclasses.dataclass
+class FeatureMatrix:
+    """Feature matrix with rows pre-normalized to unit length.
+
+    Cosine similarities against a FeatureMatrix reduce to a dot product of the
+    unit vectors. Rows with a zero or non-finite norm have no defined direction;
+    these are stored as zero vectors and flagged in `zero_norm`, which gives them
+    a similarity of 0.
+    """
+
+    unit_features: np.ndarray
+    zero_norm: np.ndarray
+
+    @classmethod
+    def from_array(cls, features: np.ndarray) -> "FeatureMatrix":
+        """Normalizes the rows of a (n_vertices, n_features) array.
+
+        Args:
+            features: The feature array.
+
+        Returns:
+            The normalized feature matrix.
+        """
+        features = np.asarray(features, dtype=np.float64)
+        norms = np.linalg.norm(features, axis=1)
+        zero_norm = ~(np.isfinite(norms) & (norms > 0))
+        norms[zero_norm] = 1
+        unit_features = np.ascontiguousarray(features / norms[:, np.newaxis])
+        unit_features[zero_norm, :] = 0
+        return cls(unit_features=unit_features, zero_norm=zero_norm)
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        """The shape of the feature matrix."""
+        return self.unit_features.shape  # type: ignore[return-value]
+
+
+@dataclasses.dataclass
+class FeatureStack:
+    """Row-normalized features of several hemispheres in one contiguous array.
+
+    Stacking the hemispheres lets a single matrix product compute the similarity
+    to all of them at once. Rows of hemisphere `names[i]` are stored in
+    `unit_features[offsets[i]:offsets[i + 1]]`.
+    """
+
+    names: List[str]
+    unit_features: np.ndarray
+    zero_norm: np.ndarray
+    offsets: np.ndarray
+
+    @classmethod
+    def from_matrices(cls, matrices: Dict[str, FeatureMatrix]) -> "FeatureStack":
+        """Stacks feature matrices in the order of the dictionary.
+
+        Args:
+            matrices: The feature matrices keyed by hemisphere name.
+
+        Returns:
+            The stacked feature matrices.
+        """
+        names = list(matrices.keys())
+        sizes = [matrices[name].shape[0] for name in names]
+        return cls(
+            names=names,
+            unit_features=np.ascontiguousarray(
+                np.concatenate([matrices[name].unit_features for name in names])
+            ),
+            zero_norm=np.concatenate([matrices[name].zero_norm for name in names]),
+            offsets=np.concatenate([[0], np.cumsum(sizes)]),
+        )
+
+    def get(self, name: str) -> FeatureMatrix:
+        """Gets the feature matrix of one hemisphere as a view into the stack.
+
+        Args:
+            name: The name of the hemisphere.
+
+        Returns:
+            The feature matrix of the hemisphere.
+        """
+        index = self.names.index(name)
+        start, stop = self.offsets[index], self.offsets[index + 1]
+        return FeatureMatrix(
+            unit_features=self.unit_features[start:stop],
+            zero_norm=self.zero_norm[start:stop],
+        )
+
+    def split(self, values: np.ndarray) -> Dict[str, np.ndarray]:
+        """Splits an array along its last axis into the stacked hemispheres.
+
+        Args:
+            values: An array whose last axis matches the rows of the stack.
+
+        Returns:
+            The per-hemisphere views of the array.
+        """
+        return {
+            name: values[..., self.offsets[index] : self.offsets[index + 1]]
+            for index, name in enumerate(self.names)
+        }
+
+
+@dataclasses.dataclass
+class RoiTable:
+    """Precomputed ROI of every seed vertex of a surface, stored CSR-style.
+
+    The ROI of seed `i` consists of the vertices
+    `indices[indptr[i]:indptr[i + 1]]` with weights
+    `weights[indptr[i]:indptr[i + 1]]`.
+    """
+
+    indptr: np.ndarray
+    indices: np.ndarray
+    weights: np.ndarray
+    roi_size: int
+    weighting: str
+
+    @property
+    def n_seeds(self) -> int:
+        """The number of seed vertices in the table."""
+        return len(self.indptr) - 1
+
+    def get(self, seed_vertex: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Gets the ROI of a seed vertex.
+
+        Args:
+            seed_vertex: The seed vertex.
+
+        Returns:
+            The indices of the ROI vertices and their weights.
+
+        Raises:
+            IndexError: If the seed vertex is not in the table.
+        """
+        if not 0 <= seed_vertex < self.n_seeds:
+            raise IndexError(f"Seed vertex {seed_vertex} is not in the ROI table.")
+        start, stop = self.indptr[seed_vertex], self.indptr[seed_vertex + 1]
+        return self.indices[start:stop], self.weights[start:stop]
+
+
+@dataclasses.dataclass
+class VertexToParcelMapping:
+    """Vertex to parcel mapping."""
+
+    AparcLabel: int
+    AparcName: str
+    MarkovLabel: int
+    MarkovName: str
+
+
+@dataclasses.dataclass
+class ParcelTable:
+    """Vertex to parcel table of a surface, stored column-wise.
+
+    Vertex `i` lies in the parcel with label `labels[atlas][i]` and name
+    `names[atlas][codes[atlas][i]]` of each atlas. The vertices of every parcel
+    and the set of parcel names are indexed on construction.
+    """
+
+    labels: Dict[str, np.ndarray]
+    codes: Dict[str, np.ndarray]
+    names: Dict[str, List[str]]
+    region_names: Dict[str, FrozenSet[str]] = dataclasses.field(
+        init=False, repr=False, compare=False
+    )
+    _name_codes: Dict[str, Dict[str, int]] = dataclasses.field(
+        init=False, repr=False, compare=False
+    )
+    _order: Dict[str, np.ndarray] = dataclasses.field(
+        init=False, repr=False, compare=False
+    )
+    _bounds: Dict[str, np.ndarray] = dataclasses.field(
+        init=False, repr=False, compare=False
+    )
+
+    ATLASES = ("Aparc", "Markov")
+
+    def __post_init__(self) -> None:
+        self.region_names = {
+            atlas: frozenset(names) for atlas, names in self.names.items()
+        }
+        self._name_codes = {
+            atlas: {name: code for code, name in enumerate(names)}
+            for atlas, names in self.names.items()
+        }
+        self._order, self._bounds = {}, {}
+        for atlas, codes in self.codes.items():
+            self._order[atlas] = np.argsort(codes, kind="stable")
+            self._bounds[atlas] = np.searchsorted(
+                codes[self._order[atlas]], np.arange(len(self.names[atlas]) + 1)
+            )
+
+    @classmethod
+    def from_records(cls, records: Iterable[Mapping[str, Any]]) -> "ParcelTable":
+        """Builds the table from one record per vertex.
+
+        Args:
+            records: The records, with the label and name of each atlas in the
+                fields of VertexToParcelMapping.
+
+        Returns:
+            The parcel table.
+        """
+        records = list(records)
+        labels, codes, names = {}, {}, {}
+        for atlas in cls.ATLASES:
+            labels[atlas] = np.array(
+                [record[f"{atlas}Label"] for record in records], dtype=np.int32
+            )
+            unique_names, inverse = np.unique(
+                [str(record[f"{atlas}Name"]) for record in records],
+                return_inverse=True,
+            )
+            codes[atlas] = inverse.astype(np.int32)
+            names[atlas] = unique_names.tolist()
+        return cls(labels=labels, codes=codes, names=names)
+
+    def __len__(self) -> int:
+        return len(self.labels[self.ATLASES[0]])
+
+    def __getitem__(self, vertex: int) -> VertexToParcelMapping:
+        """Gets the parcels of a vertex.
+
+        Args:
+            vertex: The vertex.
+
+        Returns:
+            The label and name of the parcel of each atlas.
+        """
+        return VertexToParcelMapping(
+            AparcLabel=int(self.labels["Aparc"][vertex]),
+            AparcName=self.names["Aparc"][self.codes["Aparc"][vertex]],
+            MarkovLabel=int(self.labels["Markov"][vertex]),
+            MarkovName=self.names["Markov"][self.codes["Markov"][vertex]],
+        )
+
+    def vertices(self, atlas: str, name: str) -> np.ndarray:
+        """Gets the vertices of a parcel.
+
+        Args:
+            atlas: The atlas, either 'Aparc' or 'Markov'.
+            name: The name of the parcel.
+
+        Returns:
+            The vertices of the parcel in ascending order.
+
+        Raises:
+            KeyError: If the atlas has no parcel with this name.
+        """
+        code = self._name_codes[atlas][name]
+        bounds = self._bounds[atlas]
+        return self._order[atlas][bounds[code] : bounds[code + 1]]
+
+    def average(self, atlas: str, values: np.ndarray) -> np.ndarray:
+        """Averages per-vertex values within each parcel.
+
+        The vertices are grouped by parcel once, on construction, so that the
+        averages of all parcels take one gather and one cumulative sum.
+
+        Args:
+            atlas: The atlas, either 'Aparc' or 'Markov'.
+            values: An array whose last axis matches the vertices of the table.
+
+        Returns:
+            The mean value of each parcel along the last axis, in the order of
+            `names[atlas]`. Parcels without vertices are NaN.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if values.shape[-1] != len(self):
+            raise ValueError(
+                f"Expected {len(self)} values per row, got {values.shape[-1]}."
+            )
+        bounds = self._bounds[atlas]
+        cumulative = np.zeros(values.shape[:-1] + (len(self) + 1,))
+        np.cumsum(values[..., self._order[atlas]], axis=-1, out=cumulative[..., 1:])
+        sizes = np.diff(bounds)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return (cumulative[..., bounds[1:]] - cumulative[..., bounds[:-1]]) / sizes
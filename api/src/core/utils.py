@@ -1,9 +1,11 @@
 """Utility functions for the entire app."""
 import logging
+from typing import Any, Dict, Optional
 
 import fastapi
+import numpy as np
 
-from src.core import settings
+from src.core import binary, responses, settings
 
 config = settings.get_settings()
 LOGGER_NAME = config.LOGGER_NAME
@@ -28,3 +30,78 @@ def add_cache_control(
     logger.info("Adding cache control headers.")
     response.headers["Cache-Control"] = f"max-age={expiry_in_minutes * 60}"
     return response
+
+
+def header_accepts(header: str, token: str) -> bool:
+    """Checks whether an Accept-style header lists a token with non-zero quality.
+
+    Args:
+        header: The header value, e.g. 'application/json, */*;q=0.5'.
+        token: The media type or encoding to look for.
+
+    Returns:
+        True if the token is listed with a non-zero quality, False otherwise.
+
+    """
+    for item in header.split(","):
+        value, *parameters = [part.strip() for part in item.split(";")]
+        if value.lower() != token:
+            continue
+        for parameter in parameters:
+            name, _, quality = parameter.replace(" ", "").partition("=")
+            if name == "q":
+                try:
+                    return float(quality) > 0
+                except ValueError:
+                    return False
+        return True
+    return False
+
+
+def accepts_binary(request: fastapi.Request) -> bool:
+    """Checks whether a request asks for a binary response.
+
+    Args:
+        request: The request.
+
+    Returns:
+        True if the Accept header lists the binary media type with a non-zero
+        quality, False otherwise.
+
+    """
+    return header_accepts(request.headers.get("accept", ""), binary.MEDIA_TYPE)
+
+
+def binary_response(
+    arrays: Dict[str, np.ndarray], metadata: Optional[Dict[str, Any]] = None
+) -> fastapi.Response:
+    """Creates a binary response from numpy arrays.
+
+    Args:
+        arrays: The arrays to encode, keyed by name.
+        metadata: JSON-serializable metadata to include in the header.
+
+    Returns:
+        The response, with cache control headers added.
+
+    """
+    response = fastapi.Response(
+        content=binary.encode_arrays(arrays, metadata),
+        media_type=binary.MEDIA_TYPE,
+        headers={"Vary": "Accept"},
+    )
+    return add_cache_control(response)
+
+
+def json_response(content: Any) -> fastapi.Response:
+    """Creates a JSON response that may contain numpy arrays.
+
+    Args:
+        content: The content to encode, see `responses.NumpyJSONResponse`.
+
+    Returns:
+        The response, with cache control headers added.
+
+    """
+    response = responses.NumpyJSONResponse(content=content, headers={"Vary": "Accept"})
+    return add_cache_control(response)
@@ -0,0 +1,159 @@
+"""Startup warm-up of the data caches.
+
+The warm-up runs a set of named loading tasks in a thread pool, in a background
+thread so that the app serves requests, such as liveness probes, while it runs.
+The app reports ready once every task has succeeded. Failed tasks are retried
+with exponential backoff, and a warm-up that failed anyway can be started again,
+which reruns only the failed tasks.
+"""
+import concurrent.futures
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from src.core import settings
+
+config = settings.get_settings()
+LOGGER_NAME = config.LOGGER_NAME
+
+logger = logging.getLogger(LOGGER_NAME)
+
+PENDING = "pending"
+RUNNING = "running"
+READY = "ready"
+FAILED = "failed"
+
+MAX_RETRY_DELAY = 30.0
+
+
+class Warmup:
+    """State of the startup warm-up."""
+
+    def __init__(self) -> None:
+        """Initializes the warm-up in the pending state."""
+        self.status = PENDING
+        self.errors: Dict[str, str] = {}
+        self.duration: Optional[float] = None
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def ready(self) -> bool:
+        """Whether all warm-up tasks have succeeded."""
+        return self.status == READY
+
+    def start(
+        self,
+        tasks: Dict[str, Callable[[], Any]],
+        max_workers: int,
+        retries: int = 0,
+        retry_delay: float = 1.0,
+    ) -> Optional[threading.Thread]:
+        """Starts the warm-up in a background thread.
+
+        A pending warm-up runs all tasks, and a failed warm-up reruns the tasks
+        that failed. A running or ready warm-up is left alone.
+
+        Args:
+            tasks: The loading tasks, keyed by name.
+            max_workers: The number of tasks to run in parallel.
+            retries: The number of times to retry a failed task.
+            retry_delay: The delay before the first retry in seconds. It doubles
+                with every retry, up to MAX_RETRY_DELAY.
+
+        Returns:
+            The background thread, or None if the warm-up is running or ready.
+        """
+        with self._lock:
+            if self.status == FAILED:
+                tasks = {name: tasks[name] for name in self.errors if name in tasks}
+            elif self.status != PENDING:
+                return None
+            self.status = RUNNING
+            self._thread = threading.Thread(
+                target=self._run,
+                args=(tasks, max_workers, retries, retry_delay),
+                daemon=True,
+            )
+        self._thread.start()
+        return self._thread
+
+    def _run(
+        self,
+        tasks: Dict[str, Callable[[], Any]],
+        max_workers: int,
+        retries: int,
+        retry_delay: float,
+    ) -> None:
+        """Runs the warm-up tasks and records their outcome.
+
+        Args:
+            tasks: The loading tasks, keyed by name.
+            max_workers: The number of tasks to run in parallel.
+            retries: The number of times to retry a failed task.
+            retry_delay: The delay before the first retry in seconds.
+        """
+        logger.info("Warming up %s datasets.", len(tasks))
+        start = time.perf_counter()
+        with concurrent.futures.ThreadPoolExecutor(max(max_workers, 1)) as executor:
+            futures = {
+                executor.submit(_run_task, name, task, retries, retry_delay): name
+                for name, task in tasks.items()
+            }
+            for future in concurrent.futures.as_completed(futures):
+                name = futures[future]
+                try:
+                    future.result()
+                except Exception as exc_info:  # pylint: disable=broad-except
+                    logger.exception("Warm-up of %s failed.", name)
+                    self.errors[name] = repr(exc_info)
+                else:
+                    self.errors.pop(name, None)
+
+        self.duration = time.perf_counter() - start
+        self.status = FAILED if self.errors else READY
+        logger.info("Warm-up %s after %.1f s.", self.status, self.duration)
+
+    def report(self) -> Dict[str, Any]:
+        """Reports the state of the warm-up.
+
+        Returns:
+            The status, the errors of failed tasks and the duration in seconds.
+        """
+        return {
+            "status": self.status,
+            "errors": dict(self.errors),
+            "duration": self.duration,
+        }
+
+
+def _run_task(
+    name: str, task: Callable[[], Any], retries: int, retry_delay: float
+) -> Any:
+    """Runs a warm-up task, retrying it with exponential backoff if it fails.
+
+    Args:
+        name: The name of the task.
+        task: The loading task.
+        retries: The number of times to retry the task.
+        retry_delay: The delay before the first retry in seconds.
+
+    Returns:
+        The return value of the task.
+    """
+    for attempt in range(retries + 1):
+        try:
+            return task()
+        except Exception:  # pylint: disable=broad-except
+            if attempt == retries:
+                raise
+            delay = min(retry_delay * 2**attempt, MAX_RETRY_DELAY)
+            logger.warning(
+                "Warm-up of %s failed, retrying in %.1f s.", name, delay, exc_info=True
+            )
+            time.sleep(delay)
+    return None
+
+
+WARMUP = Warmup()
@@ -6,8 +6,11 @@ import fastapi
 from fastapi.middleware import cors
 
 from src.core import settings
+from src.routers.admin import views as admin_views
 from src.routers.features import views as feature_views
 from src.routers.graphs import views as graph_views
+from src.routers.health import controller as health_controller
+from src.routers.health import views as health_views
 from src.routers.surfaces import views as surface_views
 
 config = settings.get_settings()
@@ -16,8 +19,10 @@ settings.initialize_logger()
 logger = logging.getLogger(config.LOGGER_NAME)
 
 api = fastapi.APIRouter(prefix="/api/v1")
+api.include_router(admin_views.router)
 api.include_router(feature_views.router)
 api.include_router(graph_views.router)
+api.include_router(health_views.router)
 api.include_router(surface_views.router)
 
 logger.info("Starting API.")
@@ -32,3 +37,9 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+
+
+@app.on_event("startup")
+def start_warmup() -> None:
+    """Starts loading the datasets in the background."""
+    health_controller.start_warmup()
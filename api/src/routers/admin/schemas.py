@@ -0,0 +1,25 @@
+"""Output schemas for the admin router."""
+from typing import List, Optional
+
+import pydantic
+
+
+class CacheStats(pydantic.BaseModel):
+    """A schema for the counters of a named cache."""
+
+    name: str = pydantic.Field(..., example="surfaces")
+    entries: int = pydantic.Field(..., example=4)
+    nbytes: int = pydantic.Field(..., example=1048576)
+    hits: int = pydantic.Field(..., example=100)
+    misses: int = pydantic.Field(..., example=4)
+    evictions: int = pydantic.Field(..., example=0)
+    errors: int = pydantic.Field(..., example=0)
+    max_entries: Optional[int] = pydantic.Field(None, example=None)
+
+
+class CacheReport(pydantic.BaseModel):
+    """A schema for the state of all caches."""
+
+    nbytes: int = pydantic.Field(..., example=1048576)
+    max_bytes: int = pydantic.Field(..., example=4294967296)
+    caches: List[CacheStats]
@@ -0,0 +1,77 @@
+"""View definitions for the admin router."""
+import dataclasses
+import logging
+import secrets
+from typing import Any, Dict, Optional
+
+import fastapi
+from fastapi import status
+
+from src.core import cache, settings
+from src.routers.admin import schemas
+
+config = settings.get_settings()
+LOGGER_NAME = config.LOGGER_NAME
+ADMIN_TOKEN = config.ADMIN_TOKEN
+
+logger = logging.getLogger(LOGGER_NAME)
+
+
+def verify_admin_token(
+    x_admin_token: str = fastapi.Header("", description="The admin token."),
+) -> None:
+    """Rejects requests without the admin token.
+
+    Admin endpoints are disabled when no ADMIN_TOKEN is configured.
+
+    Args:
+        x_admin_token: The token sent in the X-Admin-Token header.
+    """
+    token = ADMIN_TOKEN.get_secret_value()
+    if not token or not secrets.compare_digest(x_admin_token, token):
+        raise fastapi.HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Invalid admin token."
+        )
+
+
+router = fastapi.APIRouter(
+    prefix="/admin",
+    tags=["admin"],
+    dependencies=[fastapi.Depends(verify_admin_token)],
+)
+
+
+@router.get("/cache", response_model=schemas.CacheReport)
+def get_cache_stats() -> Dict[str, Any]:
+    """Fetches the counters and sizes of the in-process caches.
+
+    Returns:
+        The total size, the memory budget and the counters of each cache.
+    """
+    logger.info("Calling GET /admin/cache endpoint.")
+    return {
+        "nbytes": cache.MANAGER.nbytes,
+        "max_bytes": cache.MANAGER.max_bytes,
+        "caches": [
+            dataclasses.asdict(stats) for stats in cache.MANAGER.stats().values()
+        ],
+    }
+
+
+@router.post("/cache/invalidate", status_code=status.HTTP_204_NO_CONTENT)
+def invalidate_cache(
+    name: Optional[str] = fastapi.Query(
+        None, description="The cache to clear. Clears all caches if omitted."
+    ),
+) -> None:
+    """Clears one or all in-process caches.
+
+    Args:
+        name: The name of the cache to clear, or None to clear all caches.
+    """
+    logger.info("Calling POST /admin/cache/invalidate endpoint.")
+    if name is not None and name not in cache.MANAGER.stats():
+        raise fastapi.HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail=f"Unknown cache: {name}."
+        )
+    cache.MANAGER.invalidate(name)
@@ -1,21 +1,40 @@
 """ Controller for the features router """
 from __future__ import annotations
 
-import itertools
+import asyncio
+import collections
 import logging
-from typing import Dict, List
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
-from src.core import data_fetcher, settings
+import fastapi
+import numpy as np
+
+from src.core import data_fetcher, executors, settings
+from src.routers.features import cube
 from src.routers.features import utils as features_utils
 
 config = settings.get_settings()
 LOGGER_NAME = config.LOGGER_NAME
 logger = logging.getLogger(LOGGER_NAME)
 
+ROI_SIZE = 5
+WEIGHTING = "gaussian"
+HEMISPHERE_VERTICES = 10242
+NEUROQUERY_VERTICES = 40968
+MAX_NEUROQUERY_BATCH = 2048
+MAX_SIMILARITY_BATCH = 2048
+SIMILARITY_BATCH_SIZE = 32
+NATIVE_ATLASES = {"human": "Aparc", "macaque": "Markov"}
+
 
 def get_cross_species_features(
-    species: str, side: str, seed_vertex: int
-) -> Dict[str, List[float]]:
+    species: str,
+    side: str,
+    seed_vertex: int,
+    method: str = "exact",
+    roi_size: int = ROI_SIZE,
+    weighting: str = WEIGHTING,
+) -> Dict[str, np.ndarray]:
     """Fetches the human and macaque feature matrices.
 
     Args:
@@ -24,34 +43,212 @@ def get_cross_species_features(
         side: The hemisphere to fetch the surfaces for, valid values are 'left' and
             'right'.
         seed_vertex: The vertex to compute the similarity from.
+        method: The similarity computation method, valid values are 'exact' and
+            'approximate'.
+        roi_size: The size of the ROI around the seed vertex.
+        weighting: The weighting scheme of the ROI, valid values are 'uniform'
+            and 'gaussian'.
 
     Returns:
-        A feature matrix stored as a list of lists.
+        A vector of similarities per vertex for each target hemisphere.
+
+    Notes:
+        Exact similarities with the default ROI are read from the precomputed
+        similarity cube when one is available.
     """
-    seed_features = features_utils.load_feature_data(species, side)
-    surface = data_fetcher.get_surface_data(species=species, side=side)
+    similarity_cube = cube.load_cube(species, side)
+    if (
+        similarity_cube is not None
+        and method == "exact"
+        and (roi_size, weighting) == (ROI_SIZE, WEIGHTING)
+    ):
+        logger.info("Reading feature similarity for %s_%s from cube.", species, side)
+        return cube.read_cube_row(similarity_cube, seed_vertex)
 
-    all_species = ["human", "macaque"]
-    all_sides = ["left", "right"]
+    target_stack = features_utils.load_feature_stack()
+    seed_features = target_stack.get(f"{species}_{side}")
+    surface = data_fetcher.get_surface(species=species, side=side)
+    roi_table = features_utils.load_roi_table(species, side, roi_size, weighting)
 
-    similarities = {}
-    for target_species, target_side in itertools.product(all_species, all_sides):
-        logger.info(
-            "Computing feature similarity for %s_%s.", target_species, target_side
-        )
-        target_features = features_utils.load_feature_data(target_species, target_side)
-        similarity = features_utils.compute_similarity(
-            seed_vertex,
-            surface,
-            seed_features,
-            target_features,
-            roi_size=5,
-            weighting="gaussian",
+    logger.info("Computing feature similarity for %s_%s.", species, side)
+    return features_utils.compute_similarity_batched(
+        seed_vertex,
+        surface,
+        seed_features,
+        target_stack,
+        roi_size=roi_size,
+        weighting=weighting,
+        method=method,
+        roi_table=roi_table,
+    )
+
+
+def get_cross_species_features_batch(
+    species: str,
+    side: str,
+    seed_vertices: Sequence[int],
+    method: str = "exact",
+    roi_size: int = ROI_SIZE,
+    weighting: str = WEIGHTING,
+) -> List[Dict[str, np.ndarray]]:
+    """Computes the feature similarities of several seed vertices at once.
+
+    Args:
+        species: The species where the seeds are, valid values are 'human' and
+            'macaque'.
+        side: The hemisphere where the seeds are, valid values are 'left' and
+            'right'.
+        seed_vertices: The vertices to compute the similarity from.
+        method: The similarity computation method, valid values are 'exact' and
+            'approximate'.
+        roi_size: The size of the ROI around the seed vertices.
+        weighting: The weighting scheme of the ROI, valid values are 'uniform'
+            and 'gaussian'.
+
+    Returns:
+        The vectors of similarities per vertex for each target hemisphere, for
+        each seed vertex in order.
+
+    Notes:
+        Exact similarities with the default ROI are read from the precomputed
+        similarity cube when one is available.
+    """
+    similarity_cube = cube.load_cube(species, side)
+    if (
+        similarity_cube is not None
+        and method == "exact"
+        and (roi_size, weighting) == (ROI_SIZE, WEIGHTING)
+    ):
+        return [
+            cube.read_cube_row(similarity_cube, seed_vertex)
+            for seed_vertex in seed_vertices
+        ]
+
+    target_stack = features_utils.load_feature_stack()
+    seed_features = target_stack.get(f"{species}_{side}")
+    surface = data_fetcher.get_surface(species=species, side=side)
+    roi_table = features_utils.load_roi_table(species, side, roi_size, weighting)
+
+    similarities = features_utils.compute_similarity_multi(
+        seed_vertices,
+        surface,
+        seed_features,
+        target_stack,
+        roi_size=roi_size,
+        weighting=weighting,
+        method=method,
+        roi_table=roi_table,
+    )
+    return [
+        {name: values[index] for name, values in similarities.items()}
+        for index in range(len(seed_vertices))
+    ]
+
+
+def get_seed_vertices(
+    species: str,
+    side: str,
+    vertices: Sequence[int],
+    parcel: Optional[str] = None,
+    atlas: Optional[str] = None,
+) -> List[int]:
+    """Resolves the seed vertices of a batch similarity request.
+
+    Args:
+        species: The species where the seeds are.
+        side: The hemisphere where the seeds are.
+        vertices: The seed vertices.
+        parcel: The name of a parcel whose vertices are added to the seeds.
+        atlas: The parcellation of the parcel. Defaults to the native atlas of
+            the species.
+
+    Returns:
+        The unique seed vertices, in request order followed by the vertices of
+        the parcel.
+
+    Notes:
+        At most MAX_SIMILARITY_BATCH vertices may be listed explicitly. Parcels
+        are not limited, as results are streamed in chunks of
+        SIMILARITY_BATCH_SIZE seeds whatever the number of seeds.
+    """
+    seed_vertices = list(dict.fromkeys(vertices))
+    if len(seed_vertices) > MAX_SIMILARITY_BATCH:
+        raise fastapi.HTTPException(
+            status_code=400,
+            detail=f"At most {MAX_SIMILARITY_BATCH} seed vertices per batch.",
         )
+    if parcel is not None:
+        parcel_table = data_fetcher.get_parcel_table(species)
+        try:
+            seed_vertices += parcel_table.vertices(
+                atlas or NATIVE_ATLASES[species], parcel
+            ).tolist()
+        except KeyError as exc_info:
+            raise fastapi.HTTPException(
+                status_code=404, detail=f"Parcel not found: {parcel}."
+            ) from exc_info
+
+    seed_vertices = list(dict.fromkeys(seed_vertices))
+    if not seed_vertices:
+        raise fastapi.HTTPException(status_code=400, detail="No seed vertices.")
+    validate_seed_vertices(species, side, seed_vertices)
+    return seed_vertices
+
+
+def validate_seed_vertices(
+    species: str, side: str, seed_vertices: Sequence[int]
+) -> None:
+    """Checks that seed vertices lie on their hemisphere.
+
+    Args:
+        species: The species where the seeds are.
+        side: The hemisphere where the seeds are.
+        seed_vertices: The seed vertices.
 
-        similarities[f"{target_species}_{target_side}"] = similarity.tolist()
+    Raises:
+        fastapi.HTTPException: 400 if a vertex is out of range.
 
-    return similarities
+    Notes:
+        The number of vertices is read from the similarity cube if one is
+        available, otherwise all hemispheres have HEMISPHERE_VERTICES vertices.
+        Neither needs the feature matrices to be loaded.
+    """
+    similarity_cube = cube.load_cube(species, side)
+    n_vertices = (
+        HEMISPHERE_VERTICES if similarity_cube is None else similarity_cube.shape[0]
+    )
+    for vertex in seed_vertices:
+        if not 0 <= vertex < n_vertices:
+            raise fastapi.HTTPException(
+                status_code=400,
+                detail=f"Invalid vertex: {vertex}, valid range is 0-{n_vertices - 1}.",
+            )
+
+
+def get_parcel_similarity(
+    similarities: Dict[str, np.ndarray], atlas: Optional[str] = None
+) -> Dict[str, Dict[str, float]]:
+    """Averages feature similarities within the parcels of each target hemisphere.
+
+    Args:
+        similarities: The similarity vectors, keyed by target hemisphere.
+        atlas: The parcellation, valid values are 'Aparc' and 'Markov'. Defaults
+            to the native atlas of each target species, Aparc for human and
+            Markov for macaque.
+
+    Returns:
+        The mean similarity per parcel name for each target hemisphere.
+    """
+    parcel_similarities = {}
+    for name, similarity in similarities.items():
+        target_species = name.split("_")[0]
+        target_atlas = atlas or NATIVE_ATLASES[target_species]
+        parcel_table = data_fetcher.get_parcel_table(target_species)
+        means = parcel_table.average(target_atlas, similarity)
+        parcel_similarities[name] = dict(
+            zip(parcel_table.names[target_atlas], means.tolist())
+        )
+    return parcel_similarities
 
 
 def get_neuroquery(species: str, side: str, vertex: int) -> List[List[str]]:
@@ -67,11 +264,75 @@ def get_neuroquery(species: str, side: str, vertex: int) -> List[List[str]]:
     Returns:
         A list of neuroquery features.
     """
-    n_vertices = 40968
+    return data_fetcher.get_neuroquery_data(_neuroquery_index(species, side, vertex))
+
+
+async def get_neuroquery_batch(
+    vertices: Sequence[Tuple[str, str, int]], aggregate: bool = False
+) -> Dict[str, Any]:
+    """Fetches the neuroquery features for many vertices at once.
+
+    Duplicate vertices are fetched once, and records are fetched concurrently on
+    the I/O executor.
+
+    Args:
+        vertices: The (species, side, vertex) triplets, in the order in which
+            they are returned.
+        aggregate: Whether to count, per term, the vertices that list it.
+
+    Returns:
+        The records of the unique vertices and, if requested, the term frequency
+        sorted from most to least frequent.
+    """
+    unique = list(dict.fromkeys(vertices))
+    if len(unique) > MAX_NEUROQUERY_BATCH:
+        raise fastapi.HTTPException(
+            status_code=400,
+            detail=f"At most {MAX_NEUROQUERY_BATCH} vertices per batch.",
+        )
+    for species, side, vertex in unique:
+        if not 0 <= vertex < NEUROQUERY_VERTICES // 4:
+            raise fastapi.HTTPException(
+                status_code=400, detail=f"Invalid vertex: {vertex}."
+            )
+
+    logger.info("Fetching neuroquery features for %s vertices.", len(unique))
+    all_terms = await asyncio.gather(
+        *(executors.run_io(get_neuroquery, *key) for key in unique)
+    )
+
+    result: Dict[str, Any] = {
+        "records": [
+            {"species": species, "side": side, "vertex": vertex, "terms": terms}
+            for (species, side, vertex), terms in zip(unique, all_terms)
+        ]
+    }
+    if aggregate:
+        counts = collections.Counter(
+            term for terms in all_terms for term in {entry[0] for entry in terms}
+        )
+        result["term_frequency"] = [
+            {"term": term, "count": count}
+            for term, count in sorted(
+                counts.items(), key=lambda item: (-item[1], item[0])
+            )
+        ]
+    return result
 
+
+def _neuroquery_index(species: str, side: str, vertex: int) -> int:
+    """Maps a vertex on a hemisphere to its index in the neuroquery data.
+
+    Args:
+        species: The species, valid values are 'human' and 'macaque'.
+        side: The hemisphere, valid values are 'left' and 'right'.
+        vertex: The vertex on the hemisphere.
+
+    Returns:
+        The vertex index across all hemispheres.
+    """
     if side == "right":
-        vertex += n_vertices // 4
+        vertex += NEUROQUERY_VERTICES // 4
     if species == "macaque":
-        vertex += n_vertices // 2
-
-    return data_fetcher.get_neuroquery_data(vertex)
+        vertex += NEUROQUERY_VERTICES // 2
+    return vertex
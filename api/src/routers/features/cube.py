@@ -0,0 +1,130 @@
+""" Precomputed similarity cubes for the features router.
+
+A cube holds the similarity of every seed vertex of one hemisphere to every
+vertex of the target hemispheres, with shape (n_seeds, n_targets, n_vertices),
+stored at one of the precisions of `quantization.PRECISIONS`. Cubes are built
+offline and memory-mapped, so that serving a request only reads one row from
+disk.
+"""
+from __future__ import annotations
+
+import logging
+import pathlib
+from typing import Dict, Optional
+
+import numpy as np
+
+from src.core import cache, quantization, settings, types
+from src.routers.features import utils as features_utils
+
+config = settings.get_settings()
+LOGGER_NAME = config.LOGGER_NAME
+SIMILARITY_CUBE_DIR = config.SIMILARITY_CUBE_DIR
+
+logger = logging.getLogger(LOGGER_NAME)
+
+BUILD_BATCH_SIZE = 32
+
+
+def get_cube_filename(species: str, side: str) -> str:
+    """Gets the filename of the similarity cube of a seed hemisphere.
+
+    Args:
+        species: The species of the seed hemisphere.
+        side: The side of the seed hemisphere.
+
+    Returns:
+        The filename of the cube.
+
+    """
+    return f"{species}_{side}_similarity_cube_10k_fs_lr.npy"
+
+
+@cache.cached("similarity_cubes")
+def load_cube(species: str, side: str) -> Optional[quantization.QuantizedArray]:
+    """Cached call to memory-map the similarity cube of a seed hemisphere.
+
+    Args:
+        species: The species of the seed hemisphere.
+        side: The side of the seed hemisphere.
+
+    Returns:
+        The read-only memory-mapped cube, or None if no cube directory is
+        configured or the cube does not exist.
+
+    """
+    if SIMILARITY_CUBE_DIR is None:
+        return None
+    filepath = SIMILARITY_CUBE_DIR / get_cube_filename(species, side)
+    if not filepath.exists():
+        logger.warning("No similarity cube found at %s.", filepath)
+        return None
+
+    logger.info("Memory-mapping similarity cube %s.", filepath)
+    return quantization.load_memmap(filepath)
+
+
+def read_cube_row(
+    cube: quantization.QuantizedArray, seed_vertex: int
+) -> Dict[str, np.ndarray]:
+    """Reads the similarities of one seed vertex from a cube.
+
+    Args:
+        cube: The similarity cube.
+        seed_vertex: The seed vertex.
+
+    Returns:
+        A vector of similarities per vertex for each target hemisphere.
+
+    """
+    row = cube[seed_vertex]
+    return {
+        f"{species}_{side}": row[index]
+        for index, (species, side) in enumerate(features_utils.TARGET_HEMISPHERES)
+    }
+
+
+def build_cube(
+    filepath: pathlib.Path,
+    seed_surface: types.Surface,
+    seed_features: types.FeatureMatrix,
+    target_stack: types.FeatureStack,
+    roi_table: types.RoiTable,
+    precision: str = "float32",
+) -> None:
+    """Computes the similarity cube of a seed hemisphere and writes it to disk.
+
+    Args:
+        filepath: The path of the output .npy file.
+        seed_surface: The seed surface.
+        seed_features: The normalized features of the seed surface.
+        target_stack: The normalized features of the target hemispheres, stacked
+            in the order of `features_utils.TARGET_HEMISPHERES`.
+        roi_table: The ROI table of the seed surface.
+        precision: The storage precision of the similarities, one of
+            `quantization.PRECISIONS`.
+
+    """
+    sizes = np.diff(target_stack.offsets)
+    if np.any(sizes != sizes[0]):
+        raise ValueError("All target hemispheres must have the same size.")
+
+    n_seeds = seed_surface.vertices.shape[0]
+    cube = quantization.create_memmap(
+        filepath, (n_seeds, len(target_stack.names), int(sizes[0])), precision
+    )
+    for start in range(0, n_seeds, BUILD_BATCH_SIZE):
+        seed_vertices = range(start, min(start + BUILD_BATCH_SIZE, n_seeds))
+        similarities = features_utils.compute_similarity_multi(
+            seed_vertices,
+            seed_surface,
+            seed_features,
+            target_stack,
+            roi_size=roi_table.roi_size,
+            weighting=roi_table.weighting,
+            roi_table=roi_table,
+        )
+        cube[seed_vertices.start : seed_vertices.stop] = np.stack(
+            list(similarities.values()), axis=1
+        )
+    quantization.flush(cube)
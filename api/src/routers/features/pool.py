@@ -0,0 +1,306 @@
+"""Process pool for feature similarity computations.
+
+With CPU_EXECUTOR_MODE set to 'process', similarities are computed in a pool of
+worker processes rather than in threads, so that the numpy work between BLAS
+calls does not contend for the GIL. The feature stack, surfaces and ROI tables
+are loaded once in the API process and shared with the workers as memory-mapped
+files; each worker primes its data caches with read-only views of them, so the
+controller runs unchanged and no worker holds a copy of the data.
+
+In either mode, recent results are cached at SIMILARITY_CACHE_PRECISION and
+identical concurrent requests are coalesced into one computation. If a worker process dies, the pool is restarted
+on the same shared data and the computation is retried once.
+"""
+import asyncio
+import atexit
+import concurrent.futures
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import process
+from typing import Any, Callable, Dict, List, Optional, Sequence, TypeVar
+
+import numpy as np
+
+from src.core import (
+    cache,
+    data_fetcher,
+    executors,
+    quantization,
+    settings,
+    shared_arrays,
+    types,
+)
+from src.routers.features import controller
+from src.routers.features import utils as features_utils
+
+config = settings.get_settings()
+LOGGER_NAME = config.LOGGER_NAME
+CPU_EXECUTOR_MODE = config.CPU_EXECUTOR_MODE
+CPU_WORKERS = config.CPU_WORKERS
+SIMILARITY_CACHE_SIZE = config.SIMILARITY_CACHE_SIZE
+SIMILARITY_CACHE_PRECISION = config.SIMILARITY_CACHE_PRECISION
+
+logger = logging.getLogger(LOGGER_NAME)
+
+T = TypeVar("T")
+
+_pool: Optional[concurrent.futures.ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+_shared: Optional[shared_arrays.SharedArrays] = None
+
+
+def share_similarity_data() -> shared_arrays.SharedArrays:
+    """Shares the data of the similarity computation.
+
+    Returns:
+        The handle to the feature stack, and the surfaces and ROI tables of all
+        hemispheres.
+    """
+    stack = features_utils.load_feature_stack()
+    arrays = {
+        "unit_features": stack.unit_features,
+        "zero_norm": stack.zero_norm,
+        "offsets": stack.offsets,
+    }
+    surface_names = {}
+    for species, side in features_utils.TARGET_HEMISPHERES:
+        name = f"{species}_{side}"
+        surface = data_fetcher.get_surface(species=species, side=side)
+        roi_table = features_utils.load_roi_table(
+            species, side, controller.ROI_SIZE, controller.WEIGHTING
+        )
+        surface_names[name] = surface.name
+        arrays[f"{name}/vertices"] = surface.vertices
+        arrays[f"{name}/faces"] = surface.faces
+        arrays[f"{name}/indptr"] = roi_table.indptr
+        arrays[f"{name}/indices"] = roi_table.indices
+        arrays[f"{name}/weights"] = roi_table.weights
+
+    return shared_arrays.SharedArrays.create(
+        arrays, metadata={"stack_names": stack.names, "surface_names": surface_names}
+    )
+
+
+def initialize_worker(shared: shared_arrays.SharedArrays) -> None:
+    """Primes the data caches of a process with views of the shared data.
+
+    Args:
+        shared: The handle to the shared data.
+    """
+    arrays = shared.load()
+    cache.prime(
+        features_utils.load_feature_stack,
+        types.FeatureStack(
+            names=shared.metadata["stack_names"],
+            unit_features=arrays["unit_features"],
+            zero_norm=arrays["zero_norm"],
+            offsets=arrays["offsets"],
+        ),
+    )
+    for species, side in features_utils.TARGET_HEMISPHERES:
+        name = f"{species}_{side}"
+        cache.prime(
+            data_fetcher.get_surface,
+            types.Surface(
+                name=shared.metadata["surface_names"][name],
+                vertices=arrays[f"{name}/vertices"],
+                faces=arrays[f"{name}/faces"],
+            ),
+            species=species,
+            side=side,
+        )
+        cache.prime(
+            features_utils.load_roi_table,
+            types.RoiTable(
+                indptr=arrays[f"{name}/indptr"],
+                indices=arrays[f"{name}/indices"],
+                weights=arrays[f"{name}/weights"],
+                roi_size=controller.ROI_SIZE,
+                weighting=controller.WEIGHTING,
+            ),
+            species,
+            side,
+            controller.ROI_SIZE,
+            controller.WEIGHTING,
+        )
+
+
+def get_similarity_pool() -> concurrent.futures.ProcessPoolExecutor:
+    """Gets the process pool, sharing the data and starting it on first use.
+
+    The API process also replaces its cached data with views of the shared
+    data, so that it does not keep a copy of its own. The data is shared once;
+    a pool that is restarted after a worker died reuses it.
+
+    Returns:
+        The process pool.
+    """
+    global _pool, _shared  # pylint: disable=global-statement
+    with _pool_lock:
+        if _shared is None:
+            _shared = share_similarity_data()
+            initialize_worker(_shared)
+            atexit.register(_shared.close)
+        if _pool is None:
+            logger.info("Starting %s similarity worker processes.", CPU_WORKERS)
+            _pool = concurrent.futures.ProcessPoolExecutor(
+                CPU_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=initialize_worker,
+                initargs=(_shared,),
+            )
+            atexit.register(_pool.shutdown)
+        return _pool
+
+
+def reset_similarity_pool(
+    broken_pool: concurrent.futures.ProcessPoolExecutor,
+) -> None:
+    """Discards a broken process pool, so that the next use starts a new one.
+
+    Args:
+        broken_pool: The pool that broke. If another caller already replaced
+            it, the current pool is kept.
+    """
+    global _pool  # pylint: disable=global-statement
+    with _pool_lock:
+        if _pool is broken_pool:
+            _pool = None
+    broken_pool.shutdown(wait=False)
+
+
+async def run_in_pool(function: Callable[..., T], *args: Any) -> T:
+    """Runs a function in the process pool, restarting the pool once if broken.
+
+    Args:
+        function: The function to run. It must be importable by the workers.
+        *args: The positional arguments of the function.
+
+    Returns:
+        The return value of the function.
+    """
+    loop = asyncio.get_running_loop()
+    similarity_pool = await executors.run_io(get_similarity_pool)
+    try:
+        return await loop.run_in_executor(similarity_pool, function, *args)
+    except process.BrokenProcessPool:
+        logger.warning("A similarity worker process died, restarting the pool.")
+        reset_similarity_pool(similarity_pool)
+    similarity_pool = await executors.run_io(get_similarity_pool)
+    return await loop.run_in_executor(similarity_pool, function, *args)
+
+
+async def get_cross_species_features(
+    species: str,
+    side: str,
+    seed_vertex: int,
+    method: str = "exact",
+    roi_size: int = controller.ROI_SIZE,
+    weighting: str = controller.WEIGHTING,
+) -> Dict[str, np.ndarray]:
+    """Computes the feature similarity on the configured CPU executor.
+
+    Results are kept in a bounded cache of recent seeds, and concurrent requests
+    for the same seed await a single computation. The cache stores the results
+    at SIMILARITY_CACHE_PRECISION, so they are returned dequantized.
+
+    Args:
+        species: The species where the seed is.
+        side: The hemisphere where the seed is.
+        seed_vertex: The vertex to compute the similarity from.
+        method: The similarity computation method.
+        roi_size: The size of the ROI around the seed vertex.
+        weighting: The weighting scheme of the ROI.
+
+    Returns:
+        A vector of similarities per vertex for each target hemisphere.
+    """
+    quantized = await _get_quantized_features(
+        species, side, seed_vertex, method, roi_size, weighting
+    )
+    return {name: values.dequantize() for name, values in quantized.items()}
+
+
+@cache.cached_async("similarities", max_entries=SIMILARITY_CACHE_SIZE)
+async def _get_quantized_features(
+    species: str,
+    side: str,
+    seed_vertex: int,
+    method: str,
+    roi_size: int,
+    weighting: str,
+) -> Dict[str, quantization.QuantizedArray]:
+    """Computes the feature similarity and quantizes it for the cache.
+
+    Args:
+        species: The species where the seed is.
+        side: The hemisphere where the seed is.
+        seed_vertex: The vertex to compute the similarity from.
+        method: The similarity computation method.
+        roi_size: The size of the ROI around the seed vertex.
+        weighting: The weighting scheme of the ROI.
+
+    Returns:
+        A quantized vector of similarities per vertex for each target hemisphere.
+    """
+    if CPU_EXECUTOR_MODE != "process":
+        similarities = await executors.run_cpu(
+            controller.get_cross_species_features,
+            species,
+            side,
+            seed_vertex,
+            method,
+            roi_size,
+            weighting,
+        )
+    else:
+        similarities = await run_in_pool(
+            controller.get_cross_species_features,
+            species,
+            side,
+            seed_vertex,
+            method,
+            roi_size,
+            weighting,
+        )
+    return {
+        name: quantization.quantize(values, SIMILARITY_CACHE_PRECISION)
+        for name, values in similarities.items()
+    }
+
+
+async def get_cross_species_features_batch(
+    species: str,
+    side: str,
+    seed_vertices: Sequence[int],
+    method: str = "exact",
+) -> List[Dict[str, np.ndarray]]:
+    """Computes the feature similarities of several seeds on the CPU executor.
+
+    Args:
+        species: The species where the seeds are.
+        side: The hemisphere where the seeds are.
+        seed_vertices: The vertices to compute the similarity from.
+        method: The similarity computation method.
+
+    Returns:
+        The vectors of similarities per vertex for each target hemisphere, for
+        each seed vertex in order.
+    """
+    if CPU_EXECUTOR_MODE != "process":
+        return await executors.run_cpu(
+            controller.get_cross_species_features_batch,
+            species,
+            side,
+            seed_vertices,
+            method,
+        )
+
+    return await run_in_pool(
+        controller.get_cross_species_features_batch,
+        species,
+        side,
+        seed_vertices,
+        method,
+    )
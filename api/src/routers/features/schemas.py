@@ -1,8 +1,18 @@
 """Output schemas for the features router."""
-from typing import List
+from typing import Dict, List, Literal, Optional
 
 import pydantic
 
+METHOD_DESCRIPTION = (
+    "The similarity computation method. 'approximate' averages the seed ROI "
+    "features before computing the similarity, which is about 3x faster but not "
+    "identical to 'exact'. Its mean absolute error is about 1e-4, but at target "
+    "vertices whose cosine similarity to the ROI approaches 1, such as the seed "
+    "and its neighbours, it reaches about 0.4 on the Fisher-Z scale: the exact "
+    "method clips the cosine of every ROI vertex at 0.9999 before the transform, "
+    "whereas the approximate method clips only their average."
+)
+
 
 class InputCoordinates(pydantic.BaseModel):
     """A schema for input coordinates."""
@@ -19,3 +29,91 @@ class FeatureSimilarity(pydantic.BaseModel):
     human_right: List[float] = pydantic.Field(..., example=[1, 2, 3])
     macaque_left: List[float] = pydantic.Field(..., example=[1, 2, 3])
     macaque_right: List[float] = pydantic.Field(..., example=[1, 2, 3])
+
+
+class ParcelSimilarity(pydantic.BaseModel):
+    """A schema for the mean feature similarity per parcel."""
+
+    human_left: Dict[str, float] = pydantic.Field(..., example={"precentral": 0.5})
+    human_right: Dict[str, float] = pydantic.Field(..., example={"precentral": 0.5})
+    macaque_left: Dict[str, float] = pydantic.Field(..., example={"F1": 0.5})
+    macaque_right: Dict[str, float] = pydantic.Field(..., example={"F1": 0.5})
+
+
+class CrossSpeciesBatchRequest(pydantic.BaseModel):
+    """A schema for the feature similarity of several seed vertices."""
+
+    species: Literal["human", "macaque"] = pydantic.Field(..., example="human")
+    side: Literal["left", "right"] = pydantic.Field(..., example="left")
+    vertices: List[int] = pydantic.Field(
+        default_factory=list,
+        example=[1, 2, 3],
+        description="The seed vertices. Their number is limited per request.",
+    )
+    parcel: Optional[str] = pydantic.Field(
+        None,
+        description=(
+            "A parcel whose vertices are added to the seeds. All vertices of the "
+            "parcel are seeds, however many there are."
+        ),
+    )
+    atlas: Optional[Literal["Aparc", "Markov"]] = pydantic.Field(
+        None,
+        description=(
+            "The parcellation of the parcel. Defaults to the native atlas of the "
+            "species, Aparc for human and Markov for macaque."
+        ),
+    )
+    method: Literal["exact", "approximate"] = pydantic.Field(
+        "exact", description=METHOD_DESCRIPTION
+    )
+
+
+class NeuroQueryVertex(pydantic.BaseModel):
+    """A schema for a vertex on a hemisphere."""
+
+    species: Literal["human", "macaque"] = pydantic.Field(..., example="human")
+    side: Literal["left", "right"] = pydantic.Field(..., example="left")
+    vertex: int = pydantic.Field(..., example=1)
+
+
+class NeuroQueryRange(pydantic.BaseModel):
+    """A schema for a range of vertices on a hemisphere."""
+
+    species: Literal["human", "macaque"] = pydantic.Field(..., example="human")
+    side: Literal["left", "right"] = pydantic.Field(..., example="left")
+    start: int = pydantic.Field(..., example=0, description="Inclusive.")
+    stop: int = pydantic.Field(..., example=10, description="Exclusive.")
+
+
+class NeuroQueryBatchRequest(pydantic.BaseModel):
+    """A schema for a batch of neuroquery lookups."""
+
+    vertices: List[NeuroQueryVertex] = pydantic.Field(default_factory=list)
+    range: Optional[NeuroQueryRange] = None
+    aggregate: bool = pydantic.Field(
+        False, description="Whether to include the term frequency across vertices."
+    )
+
+
+class NeuroQueryRecord(pydantic.BaseModel):
+    """A schema for the neuroquery terms of a vertex."""
+
+    species: str = pydantic.Field(..., example="human")
+    side: str = pydantic.Field(..., example="left")
+    vertex: int = pydantic.Field(..., example=1)
+    terms: List[List[str]] = pydantic.Field(..., example=[["memory", "0.5"]])
+
+
+class TermFrequency(pydantic.BaseModel):
+    """A schema for the number of vertices that list a term."""
+
+    term: str = pydantic.Field(..., example="memory")
+    count: int = pydantic.Field(..., example=3)
+
+
+class NeuroQueryBatch(pydantic.BaseModel):
+    """A schema for the result of a batch of neuroquery lookups."""
+
+    records: List[NeuroQueryRecord]
+    term_frequency: Optional[List[TermFrequency]] = None
@@ -1,24 +1,26 @@
 """ Utility functions for the features router. """
 from __future__ import annotations
 
-import functools
+import itertools
 import logging
-from typing import List
+from typing import Dict, List, Optional, Sequence, Tuple, Union
 
 import fastapi
 import numpy as np
 import numpy.typing as npt
 from fastapi import status
 
-from src.core import data_fetcher, settings, types
+from src.core import cache, data_fetcher, settings, types
 
 config = settings.get_settings()
 LOGGER_NAME = config.LOGGER_NAME
 
 logger = logging.getLogger(LOGGER_NAME)
 
+TARGET_HEMISPHERES = tuple(itertools.product(["human", "macaque"], ["left", "right"]))
 
-@functools.lru_cache(maxsize=None)
+
+@cache.cached("feature_data")
 def load_feature_data(
     species: str, side: str, remove_singleton: bool = True
 ) -> np.ndarray:
@@ -43,13 +45,122 @@ def load_feature_data(
     return nifti_data
 
 
+@cache.cached("feature_matrices")
+def load_feature_matrix(species: str, side: str) -> types.FeatureMatrix:
+    """Cached call to the row-normalized feature data.
+
+    Args:
+        species: The species to fetch the features for, valid values are
+            'human' and 'macaque'.
+        side: The hemisphere to fetch the features for, valid values are 'left' and
+            'right'.
+
+    Returns:
+        The feature data with rows normalized to unit length.
+
+    """
+    logger.info("Loading normalized feature data for %s_%s.", species, side)
+    features = np.squeeze(data_fetcher.get_feature_data(species, side))
+    return types.FeatureMatrix.from_array(features)
+
+
+@cache.cached("feature_stacks")
+def load_feature_stack(
+    hemispheres: Tuple[Tuple[str, str], ...] = TARGET_HEMISPHERES
+) -> types.FeatureStack:
+    """Cached call to the row-normalized features of several hemispheres.
+
+    Args:
+        hemispheres: The (species, side) pairs to stack, in order.
+
+    Returns:
+        The stacked features, keyed by '{species}_{side}'.
+
+    """
+    logger.info("Loading feature stack.")
+    return types.FeatureStack.from_matrices(
+        {
+            f"{species}_{side}": types.FeatureMatrix.from_array(
+                np.squeeze(data_fetcher.get_feature_data(species, side))
+            )
+            for species, side in hemispheres
+        }
+    )
+
+
+@cache.cached("roi_tables")
+def load_roi_table(
+    species: str, side: str, roi_size: int, weighting: str
+) -> types.RoiTable:
+    """Cached call to the ROI table of a surface.
+
+    The precomputed table is used if it exists, otherwise it is built from the
+    surface.
+
+    Args:
+        species: The species of the surface, valid values are 'human' and
+            'macaque'.
+        side: The hemisphere of the surface, valid values are 'left' and 'right'.
+        roi_size: The size of the ROI in the same units as the surface.
+        weighting: The weighting scheme, valid values are 'uniform' and
+            'gaussian'.
+
+    Returns:
+        The ROI table.
+
+    """
+    roi_table = data_fetcher.get_roi_table_data(species, side, roi_size, weighting)
+    if roi_table is not None:
+        return roi_table
+
+    logger.info("No precomputed ROI table for %s_%s, building it.", species, side)
+    surface = data_fetcher.get_surface(species=species, side=side)
+    return build_roi_table(surface, roi_size, weighting)
+
+
+def build_roi_table(
+    surface: types.Surface, roi_size: int, weighting: str
+) -> types.RoiTable:
+    """Computes the ROI of every vertex of a surface.
+
+    Args:
+        surface: The surface.
+        roi_size: The size of the ROI in the same units as the surface.
+        weighting: The weighting scheme, valid values are 'uniform' and
+            'gaussian'.
+
+    Returns:
+        The ROI table.
+
+    """
+    rois = [
+        _select_roi(seed_vertex, surface, roi_size, weighting)
+        for seed_vertex in range(surface.vertices.shape[0])
+    ]
+    sizes = [len(indices) for indices, _ in rois]
+    return types.RoiTable(
+        indptr=np.concatenate([[0], np.cumsum(sizes)]).astype(np.int64),
+        indices=np.concatenate([indices for indices, _ in rois]).astype(np.int32),
+        weights=np.concatenate(
+            [
+                np.ones(len(indices)) if weights is None else weights
+                for indices, weights in rois
+            ]
+        ),
+        roi_size=roi_size,
+        weighting=weighting,
+    )
+
+
 def compute_similarity(
     seed_vertex: int,
     seed_surface: types.Surface,
-    seed_features: npt.ArrayLike,
-    target_features: npt.ArrayLike,
+    seed_features: Union[npt.ArrayLike, types.FeatureMatrix],
+    target_features: Union[npt.ArrayLike, types.FeatureMatrix],
     roi_size: int = 5,
     weighting: str = "uniform",
+    method: str = "exact",
+    roi_table: Optional[types.RoiTable] = None,
 ) -> np.ndarray:
     """Computes feature similarity. This uses three steps:
         0. Select the vertices within the ROI of interest.
@@ -60,12 +171,18 @@ def compute_similarity(
     Args:
         seed_vertex: The vertex to use as the seed.
         seed_surface: The surface where the seed is selected.
-        seed_features: The features on the seed surface.
-        target_features: The features on the target surface.
+        seed_features: The features on the seed surface. Passing a
+            FeatureMatrix skips the row normalization.
+        target_features: The features on the target surface. Passing a
+            FeatureMatrix skips the row normalization.
         roi_size: The size of the ROI to use in the same units
             as the surface.
         weighting: The weighting scheme to use, valid values are
             'uniform' and 'gaussian'.
+        method: The computation method, valid values are 'exact' and
+            'approximate'. See `_roi_similarity` for details.
+        roi_table: The precomputed ROIs of the seed surface. Used instead of
+            a distance query if its ROI size and weighting match.
 
     Returns:
         A vector of similarities per vertex.
@@ -74,32 +191,157 @@ def compute_similarity(
         NaN values are replaced with 0 and Inf values are replaced with
         99999 as these are not JSON serializable.
     """
-    logger.info("Computing vertices within the ROI.")
-    vertices = seed_surface.vertices
-    distances = np.sqrt(np.sum((vertices - vertices[seed_vertex, :]) ** 2, axis=1))
-    indices = np.where(distances <= roi_size)[0]
+    indices, weights = _get_roi(
+        seed_vertex, seed_surface, roi_size, weighting, roi_table
+    )
 
-    logger.info("Computing similarity.")
-    cosine_similarity = _cosine_similarity(
-        np.array(seed_features)[indices, :], target_features
+    logger.info("Computing similarity with method: %s.", method)
+    seed_matrix = _as_feature_matrix(seed_features)
+    target_matrix = _as_feature_matrix(target_features)
+    return _roi_similarity(
+        seed_matrix.unit_features[indices, :],
+        weights,
+        target_matrix.unit_features,
+        method,
     )
-    fisher_z = np.arctanh(cosine_similarity)
 
-    if weighting == "uniform":
-        weights = None
-    elif weighting == "gaussian":
-        weights = np.exp(-(distances[indices] ** 2) / 2)
-    else:
-        logger.error("Invalid weighting scheme: %s", weighting)
+
+def compute_similarity_batched(
+    seed_vertex: int,
+    seed_surface: types.Surface,
+    seed_features: types.FeatureMatrix,
+    target_stack: types.FeatureStack,
+    roi_size: int = 5,
+    weighting: str = "uniform",
+    method: str = "exact",
+    roi_table: Optional[types.RoiTable] = None,
+) -> Dict[str, np.ndarray]:
+    """Computes feature similarity to all hemispheres of a feature stack.
+
+    This follows the same steps as `compute_similarity`, but computes the cosine
+    similarity of the ROI to every stacked hemisphere in a single matrix product.
+
+    Args:
+        seed_vertex: The vertex to use as the seed.
+        seed_surface: The surface where the seed is selected.
+        seed_features: The normalized features on the seed surface.
+        target_stack: The normalized features of the target hemispheres.
+        roi_size: The size of the ROI to use in the same units
+            as the surface.
+        weighting: The weighting scheme to use, valid values are
+            'uniform' and 'gaussian'.
+        method: The computation method, valid values are 'exact' and
+            'approximate'. See `_roi_similarity` for details.
+        roi_table: The precomputed ROIs of the seed surface. Used instead of
+            a distance query if its ROI size and weighting match.
+
+    Returns:
+        A vector of similarities per vertex for each target hemisphere.
+
+    """
+    indices, weights = _get_roi(
+        seed_vertex, seed_surface, roi_size, weighting, roi_table
+    )
+
+    logger.info(
+        "Computing similarity to %d hemispheres with method: %s.",
+        len(target_stack.names),
+        method,
+    )
+    similarity = _roi_similarity(
+        seed_features.unit_features[indices, :],
+        weights,
+        target_stack.unit_features,
+        method,
+    )
+    return target_stack.split(similarity)
+
+
+def compute_similarity_multi(
+    seed_vertices: Sequence[int],
+    seed_surface: types.Surface,
+    seed_features: types.FeatureMatrix,
+    target_stack: types.FeatureStack,
+    roi_size: int = 5,
+    weighting: str = "uniform",
+    method: str = "exact",
+    roi_table: Optional[types.RoiTable] = None,
+) -> Dict[str, np.ndarray]:
+    """Computes feature similarity of many seeds to all hemispheres of a stack.
+
+    This follows the same steps as `compute_similarity_batched` for every seed,
+    but the ROIs of all seeds are concatenated into segments of one array.
+    Vertices shared by several ROIs are computed once, so the similarities of
+    all seeds take a single matrix product. The per-seed weighted averages are
+    a second product with an (n_seeds, n_roi_vertices) matrix of ROI weights.
+
+    Args:
+        seed_vertices: The vertices to use as seeds.
+        seed_surface: The surface where the seeds are selected.
+        seed_features: The normalized features on the seed surface.
+        target_stack: The normalized features of the target hemispheres.
+        roi_size: The size of the ROI to use in the same units
+            as the surface.
+        weighting: The weighting scheme to use, valid values are
+            'uniform' and 'gaussian'.
+        method: The computation method, valid values are 'exact' and
+            'approximate'. See `_roi_similarity` for details.
+        roi_table: The precomputed ROIs of the seed surface. Used instead of
+            a distance query if its ROI size and weighting match.
+
+    Returns:
+        A (n_seeds, n_vertices) array of similarities for each target
+        hemisphere, with rows in the order of the seeds.
+
+    """
+    if method not in ("exact", "approximate"):
+        logger.error("Invalid similarity method: %s", method)
         raise fastapi.HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Invalid weighting scheme: {weighting}",
+            detail=f"Invalid similarity method: {method}",
         )
 
-    logger.info("Computing weighted average with method: %s.", weighting)
-    weighted_average = np.average(fisher_z, axis=0, weights=weights)
-
-    return weighted_average
+    rois = [
+        _get_roi(seed_vertex, seed_surface, roi_size, weighting, roi_table)
+        for seed_vertex in seed_vertices
+    ]
+    indices = np.concatenate([roi_indices for roi_indices, _ in rois])
+    weights = np.concatenate(
+        [
+            np.ones(len(roi_indices)) if roi_weights is None else roi_weights
+            for roi_indices, roi_weights in rois
+        ]
+    )
+    seed_ids = np.repeat(
+        np.arange(len(rois)), [len(roi_indices) for roi_indices, _ in rois]
+    )
+    unique_indices, inverse = np.unique(indices, return_inverse=True)
+    roi_unit_features = seed_features.unit_features[unique_indices, :]
+    roi_weights = np.zeros((len(rois), len(unique_indices)))
+    np.add.at(roi_weights, (seed_ids, inverse), weights)
+
+    logger.info(
+        "Computing similarity of %d seeds from %d ROI vertices with method: %s.",
+        len(rois),
+        len(unique_indices),
+        method,
+    )
+    if method == "exact":
+        cosine_similarity = _unit_cosine_similarity(
+            roi_unit_features, target_stack.unit_features
+        )
+        fisher_z = np.arctanh(cosine_similarity, out=cosine_similarity)
+        roi_weights /= roi_weights.sum(axis=1, keepdims=True)
+        similarity = roi_weights.astype(fisher_z.dtype, copy=False) @ fisher_z
+    else:
+        seed_vectors = types.FeatureMatrix.from_array(
+            roi_weights.astype(roi_unit_features.dtype, copy=False) @ roi_unit_features
+        ).unit_features
+        cosine_similarity = _unit_cosine_similarity(
+            seed_vectors, target_stack.unit_features
+        )
+        similarity = np.arctanh(cosine_similarity, out=cosine_similarity)
+    return target_stack.split(similarity)
 
 
 def create_sphere(size: List[int], center: List[int], radius: int) -> np.ndarray:
@@ -127,6 +369,156 @@ def create_sphere(size: List[int], center: List[int], radius: int) -> np.ndarray
     return sphere
 
 
+def _get_roi(
+    seed_vertex: int,
+    seed_surface: types.Surface,
+    roi_size: int,
+    weighting: str,
+    roi_table: Optional[types.RoiTable],
+) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """Gets the ROI from the table if it matches, otherwise computes it.
+
+    Args:
+        seed_vertex: The vertex to use as the seed.
+        seed_surface: The surface where the seed is selected.
+        roi_size: The size of the ROI to use in the same units
+            as the surface.
+        weighting: The weighting scheme to use, valid values are
+            'uniform' and 'gaussian'.
+        roi_table: The precomputed ROIs of the seed surface, if any.
+
+    Returns:
+        The indices of the ROI vertices and their weights, or None for
+        uniform weighting.
+
+    """
+    if (
+        roi_table is not None
+        and roi_table.roi_size == roi_size
+        and roi_table.weighting == weighting
+    ):
+        return roi_table.get(seed_vertex)
+
+    logger.info("Computing vertices within the ROI.")
+    return _select_roi(seed_vertex, seed_surface, roi_size, weighting)
+
+
+def _select_roi(
+    seed_vertex: int,
+    seed_surface: types.Surface,
+    roi_size: int,
+    weighting: str,
+) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """Selects the vertices within the ROI and their weights.
+
+    Args:
+        seed_vertex: The vertex to use as the seed.
+        seed_surface: The surface where the seed is selected.
+        roi_size: The size of the ROI to use in the same units
+            as the surface.
+        weighting: The weighting scheme to use, valid values are
+            'uniform' and 'gaussian'.
+
+    Returns:
+        The indices of the ROI vertices and their weights, or None for
+        uniform weighting.
+
+    """
+    if weighting not in ("uniform", "gaussian"):
+        logger.error("Invalid weighting scheme: %s", weighting)
+        raise fastapi.HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid weighting scheme: {weighting}",
+        )
+
+    indices, distances = seed_surface.vertices_within(seed_vertex, roi_size)
+
+    if weighting == "uniform":
+        return indices, None
+    return indices, np.exp(-(distances**2) / 2)
+
+
+def _roi_similarity(
+    roi_unit_features: np.ndarray,
+    weights: Optional[np.ndarray],
+    target_unit_features: np.ndarray,
+    method: str,
+) -> np.ndarray:
+    """Computes the similarity of an ROI to every target vertex.
+
+    The 'exact' method computes the cosine similarity of every ROI vertex to
+    every target vertex, applies the Fisher-Z transform and takes the weighted
+    average across the ROI. As the Fisher-Z transform is non-linear, the average
+    cannot be taken before the matrix product. The 'approximate' method does so
+    anyway: it averages the ROI features into a single unit vector and applies
+    the Fisher-Z transform to its cosine similarity with the targets. This costs
+    a single matrix-vector product instead of one per ROI vertex.
+
+    Args:
+        roi_unit_features: The (n_roi, n_features) normalized ROI features.
+        weights: The weights of the ROI vertices, or None for uniform weighting.
+        target_unit_features: The (n_targets, n_features) normalized target
+            features.
+        method: The computation method, valid values are 'exact' and
+            'approximate'.
+
+    Returns:
+        The similarity per target vertex.
+
+    """
+    if method == "exact":
+        cosine_similarity = _unit_cosine_similarity(
+            roi_unit_features, target_unit_features
+        )
+        return _fisher_z_average(cosine_similarity, weights)
+    if method == "approximate":
+        seed_vector = types.FeatureMatrix.from_array(
+            np.average(roi_unit_features, axis=0, weights=weights)[np.newaxis, :]
+        ).unit_features
+        cosine_similarity = _unit_cosine_similarity(seed_vector, target_unit_features)
+        return np.arctanh(cosine_similarity[0], out=cosine_similarity[0])
+
+    logger.error("Invalid similarity method: %s", method)
+    raise fastapi.HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=f"Invalid similarity method: {method}",
+    )
+
+
+def _fisher_z_average(
+    cosine_similarity: np.ndarray, weights: Optional[np.ndarray]
+) -> np.ndarray:
+    """Applies a Fisher-Z transform and averages across the ROI.
+
+    Args:
+        cosine_similarity: The (n_roi, n_targets) cosine similarities.
+        weights: The weights of the ROI vertices, or None for uniform weighting.
+
+    Returns:
+        The weighted average Fisher-Z similarity per target vertex.
+
+    """
+    fisher_z = np.arctanh(cosine_similarity, out=cosine_similarity)
+    return np.average(fisher_z, axis=0, weights=weights)
+
+
+def _as_feature_matrix(
+    features: Union[npt.ArrayLike, types.FeatureMatrix]
+) -> types.FeatureMatrix:
+    """Wraps raw features in a FeatureMatrix if they are not one already.
+
+    Args:
+        features: The raw features or a FeatureMatrix.
+
+    Returns:
+        The features as a FeatureMatrix.
+
+    """
+    if isinstance(features, types.FeatureMatrix):
+        return features
+    return types.FeatureMatrix.from_array(np.asarray(features))
+
+
 def _cosine_similarity(
     seed_features: npt.ArrayLike, target_features: npt.ArrayLike
 ) -> np.ndarray:
@@ -140,11 +532,26 @@ def _cosine_similarity(
         A vector of similarities per vertex.
 
     """
-    cosine_similarity = np.dot(seed_features, np.transpose(target_features)) / (
-        np.linalg.norm(seed_features, axis=1)[:, np.newaxis]
-        * np.linalg.norm(target_features, axis=1)[np.newaxis, :]
+    return _unit_cosine_similarity(
+        _as_feature_matrix(seed_features).unit_features,
+        _as_feature_matrix(target_features).unit_features,
     )
-    cosine_similarity[cosine_similarity > 0.9999] = 0.9999
-    cosine_similarity[cosine_similarity < -0.9999] = -0.9999
-    cosine_similarity[np.isnan(cosine_similarity)] = 0
+
+
+def _unit_cosine_similarity(
+    seed_unit_features: np.ndarray, target_unit_features: np.ndarray
+) -> np.ndarray:
+    """Computes the cosine similarity between two sets of unit-length features.
+
+    Args:
+        seed_unit_features: The row-normalized features on the seed surface.
+        target_unit_features: The row-normalized features on the target surface.
+
+    Returns:
+        A vector of similarities per vertex, clipped to (-0.9999, 0.9999) to keep
+        the Fisher-Z transform finite.
+
+    """
+    cosine_similarity = np.dot(seed_unit_features, target_unit_features.T)
+    np.clip(cosine_similarity, -0.9999, 0.9999, out=cosine_similarity)
     return cosine_similarity
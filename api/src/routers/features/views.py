@@ -2,13 +2,14 @@
 from __future__ import annotations
 
 import logging
-from typing import Dict, List
+from typing import Any, AsyncIterator, Dict, List, Literal, Optional, Sequence
 
 import fastapi
+import numpy as np
 from fastapi import status
 
-from src.core import settings, utils
-from src.routers.features import controller, schemas
+from src.core import binary, executors, responses, settings, utils
+from src.routers.features import controller, pool, schemas
 
 router = fastapi.APIRouter(prefix="/features", tags=["features"])
 
@@ -16,17 +17,26 @@ config = settings.get_settings()
 LOGGER_NAME = config.LOGGER_NAME
 logger = logging.getLogger(LOGGER_NAME)
 
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
 
 @router.get(
     "/cross_species",
-    responses={status.HTTP_200_OK: {"model": List[schemas.FeatureSimilarity]}},
+    responses={
+        status.HTTP_200_OK: {
+            "model": List[schemas.FeatureSimilarity],
+            "content": {binary.MEDIA_TYPE: {}},
+        }
+    },
+    response_model=None,
+    response_class=responses.NumpyJSONResponse,
 )
-def get_feature_similarity(
-    response: fastapi.Response,
-    species: str = fastapi.Query(
+async def get_feature_similarity(
+    request: fastapi.Request,
+    species: Literal["human", "macaque"] = fastapi.Query(
         ..., example="human", description="The species to fetch the hemispheres for."
     ),
-    side: str = fastapi.Query(
+    side: Literal["left", "right"] = fastapi.Query(
         ..., example="left", description="The hemisphere to fetch the surfaces for."
     ),
     vertex: int = fastapi.Query(
@@ -34,7 +44,10 @@ def get_feature_similarity(
         example=1,
         description="The vertex to fetch the feature similarity for, 0-indexed.",
     ),
-) -> Dict[str, List[float]]:
+    method: Literal["exact", "approximate"] = fastapi.Query(
+        "exact", description=schemas.METHOD_DESCRIPTION
+    ),
+) -> fastapi.Response:
     """Fetches the human and macaque feature matrices.
 
     Args:
@@ -43,21 +56,164 @@ def get_feature_similarity(
         side: The hemisphere where the seed is, valid values are 'left' and
             'right'.
         vertex: The vertex to fetch the feature similarity for, 0-indexed.
+        method: The similarity computation method, valid values are 'exact' and
+            'approximate'.
 
     Returns:
-        A Pydantic BaseClass containing the feature vectors for similarity to
-        the seed vertex.
+        A JSON response containing the feature vectors for similarity to
+        the seed vertex. If the request accepts 'application/octet-stream', the
+        vectors are returned as float32 buffers instead, see `core.binary`.
     """
     logger.info("Calling GET /surfaces/similarity endpoint.")
+    await executors.run_io(controller.validate_seed_vertices, species, side, [vertex])
+    similarities = await pool.get_cross_species_features(species, side, vertex, method)
+    return await executors.run_cpu(
+        _feature_similarity_response, similarities, utils.accepts_binary(request)
+    )
+
+
+@router.get("/cross_species/parcels", response_model=schemas.ParcelSimilarity)
+async def get_parcel_similarity(
+    response: fastapi.Response,
+    species: Literal["human", "macaque"] = fastapi.Query(
+        ..., example="human", description="The species to fetch the hemispheres for."
+    ),
+    side: Literal["left", "right"] = fastapi.Query(
+        ..., example="left", description="The hemisphere to fetch the surfaces for."
+    ),
+    vertex: int = fastapi.Query(
+        ...,
+        example=1,
+        description="The vertex to fetch the feature similarity for, 0-indexed.",
+    ),
+    method: Literal["exact", "approximate"] = fastapi.Query(
+        "exact", description=schemas.METHOD_DESCRIPTION
+    ),
+    atlas: Optional[Literal["Aparc", "Markov"]] = fastapi.Query(
+        None,
+        description=(
+            "The parcellation to average over. Defaults to the native atlas of "
+            "each target species, Aparc for human and Markov for macaque."
+        ),
+    ),
+) -> Dict[str, Dict[str, float]]:
+    """Fetches the mean feature similarity per parcel of each target hemisphere.
+
+    Args:
+        species: The species where the seed is, valid values are
+            'human' and 'macaque'.
+        side: The hemisphere where the seed is, valid values are 'left' and
+            'right'.
+        vertex: The vertex to fetch the feature similarity for, 0-indexed.
+        method: The similarity computation method, valid values are 'exact' and
+            'approximate'.
+        atlas: The parcellation, valid values are 'Aparc' and 'Markov'.
+
+    Returns:
+        The mean similarity per parcel name for each target hemisphere.
+    """
+    logger.info("Calling GET /features/cross_species/parcels endpoint.")
     response = utils.add_cache_control(response)
-    return controller.get_cross_species_features(species, side, vertex)
+    await executors.run_io(controller.validate_seed_vertices, species, side, [vertex])
+    similarities = await pool.get_cross_species_features(species, side, vertex, method)
+    return await executors.run_cpu(
+        controller.get_parcel_similarity, similarities, atlas
+    )
+
+
+@router.post(
+    "/cross_species/batch",
+    description=(
+        "Streams the feature similarity of several seed vertices as JSON lines. "
+        f"At most {controller.MAX_SIMILARITY_BATCH} vertices may be listed; the "
+        "vertices of a parcel are not limited."
+    ),
+    response_class=fastapi.responses.StreamingResponse,
+    responses={status.HTTP_200_OK: {"content": {NDJSON_MEDIA_TYPE: {}}}},
+)
+async def get_feature_similarity_batch(
+    batch: schemas.CrossSpeciesBatchRequest,
+) -> fastapi.responses.StreamingResponse:
+    """Fetches the feature similarity of several seed vertices.
+
+    Args:
+        batch: The seed hemisphere, the seed vertices and/or a parcel whose
+            vertices are seeds, and the similarity computation method.
+
+    Returns:
+        A newline-delimited JSON stream with one line per seed vertex, holding
+        the vertex and its feature vectors for similarity. Seeds are computed
+        in batches, and each batch is sent as soon as it is computed.
+    """
+    logger.info("Calling POST /features/cross_species/batch endpoint.")
+    seed_vertices = await executors.run_io(
+        controller.get_seed_vertices,
+        batch.species,
+        batch.side,
+        batch.vertices,
+        batch.parcel,
+        batch.atlas,
+    )
+
+    async def stream() -> AsyncIterator[bytes]:
+        for start in range(0, len(seed_vertices), controller.SIMILARITY_BATCH_SIZE):
+            chunk = seed_vertices[start : start + controller.SIMILARITY_BATCH_SIZE]
+            similarities = await pool.get_cross_species_features_batch(
+                batch.species, batch.side, chunk, batch.method
+            )
+            yield await executors.run_cpu(_similarity_lines, chunk, similarities)
+
+    return fastapi.responses.StreamingResponse(stream(), media_type=NDJSON_MEDIA_TYPE)
+
+
+def _similarity_lines(
+    seed_vertices: Sequence[int], similarities: Sequence[Dict[str, np.ndarray]]
+) -> bytes:
+    """Encodes the feature similarities of seed vertices as JSON lines.
+
+    Args:
+        seed_vertices: The seed vertices.
+        similarities: The similarity vectors of each seed, keyed by target
+            hemisphere.
+
+    Returns:
+        One JSON object per seed, each followed by a newline.
+    """
+    return b"".join(
+        responses.encode_json({"vertex": vertex, **similarity}) + b"\n"
+        for vertex, similarity in zip(seed_vertices, similarities)
+    )
+
+
+def _feature_similarity_response(
+    similarities: Dict[str, np.ndarray], as_binary: bool
+) -> fastapi.Response:
+    """Encodes the feature similarity response.
+
+    Args:
+        similarities: The similarity vectors, keyed by target hemisphere.
+        as_binary: Whether to encode the similarities in the binary format
+            rather than as JSON.
+
+    Returns:
+        The encoded response.
+    """
+    if as_binary:
+        return utils.binary_response(
+            {
+                name: similarity.astype(np.float32)
+                for name, similarity in similarities.items()
+            }
+        )
+
+    return utils.json_response(similarities)
 
 
 @router.get(
     "/neuroquery",
     responses={status.HTTP_200_OK: {"model": List[List[str]]}},
 )
-def get_neuroquery(
+async def get_neuroquery(
     response: fastapi.Response,
     species: str = fastapi.Query(
         ..., example="human", description="The species to fetch the hemispheres for."
@@ -85,4 +241,37 @@ def get_neuroquery(
     """
     logger.info("Calling GET /surfaces/neuroquery endpoint.")
     response = utils.add_cache_control(response)
-    return controller.get_neuroquery(species, side, vertex)
+    return await executors.run_io(controller.get_neuroquery, species, side, vertex)
+
+
+@router.post(
+    "/neuroquery/batch",
+    response_model=schemas.NeuroQueryBatch,
+    response_model_exclude_none=True,
+)
+async def get_neuroquery_batch(
+    batch: schemas.NeuroQueryBatchRequest,
+) -> Dict[str, Any]:
+    """Fetches the neuroquery for many vertices in one request.
+
+    Args:
+        batch: The vertices, as a list and/or a range on one hemisphere, and
+            whether to aggregate the terms across vertices.
+
+    Returns:
+        The neuroquery of each unique vertex, in request order, and optionally
+        the number of vertices that list each term.
+    """
+    logger.info("Calling POST /features/neuroquery/batch endpoint.")
+    vertices = [(item.species, item.side, item.vertex) for item in batch.vertices]
+    if batch.range is not None:
+        if batch.range.stop - batch.range.start > controller.MAX_NEUROQUERY_BATCH:
+            raise fastapi.HTTPException(
+                status_code=400,
+                detail=f"At most {controller.MAX_NEUROQUERY_BATCH} vertices per batch.",
+            )
+        vertices += [
+            (batch.range.species, batch.range.side, vertex)
+            for vertex in range(batch.range.start, batch.range.stop)
+        ]
+    return await controller.get_neuroquery_batch(vertices, batch.aggregate)
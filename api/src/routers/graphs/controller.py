@@ -1,11 +1,18 @@
-from typing import Literal, Set
+from typing import FrozenSet, Literal
 
 import fastapi
 
-from src.core import data_fetcher
+from src.core import cache, data_fetcher, executors, response_cache, settings, svg
 
-HUMAN_TO_MACAQUE = data_fetcher.get_vertex_to_parcel_mapping("human")
-MACAQUE_TO_HUMAN = data_fetcher.get_vertex_to_parcel_mapping("macaque")
+config = settings.get_settings()
+GRAPH_CACHE_SIZE = config.GRAPH_CACHE_SIZE
+GRAPH_PRECISION = config.GRAPH_PRECISION
+GRAPH_THUMBNAIL_WIDTH = config.GRAPH_THUMBNAIL_WIDTH
+
+SVG_MEDIA_TYPE = "image/svg+xml"
+PNG_MEDIA_TYPE = "image/png"
+
+GraphVariant = Literal["original", "minified", "thumbnail"]
 
 MODALITY_ABBREVIATIONS = {
     "human": {"area": "SA_", "thickness": "CT_", "volume": ""},
@@ -16,7 +23,7 @@ MODALITY_ABBREVIATIONS = {
 
 def get_region_names(
     species: Literal["human", "macaque"],
-) -> Set[str]:
+) -> FrozenSet[str]:
     """Fetches the region names for the given species.
 
     Regions are the same across human to macaque and macaque to human mappings.
@@ -27,34 +34,131 @@ def get_region_names(
     Returns:
         A fastapi response containing the region names.
     """
-    if species == "human":
-        return set(mapping.AparcName for mapping in HUMAN_TO_MACAQUE)
-    elif species == "macaque":
-        return set(mapping.MarkovName for mapping in HUMAN_TO_MACAQUE)
+    atlas = "Aparc" if species == "human" else "Markov"
+    return data_fetcher.get_parcel_table("human").region_names[atlas]
 
 
-def get_graph_by_region(
+def get_graph_filename(
     region: str,
     modality: str,
     target_species: Literal["human", "macaque"],
-) -> fastapi.Response:
-    """Fetches the graph for a given region, modality, and species.
+) -> str:
+    """Gets the blob filename of the graph for a given region, modality, and species.
     Args:
         region: The region to fetch the graphs for.
         modality: The modality of the graph.
         target_species: The species to return the graph for.
 
     Returns:
-        A fastapi response containing the bytes of the graph.
+        The filename of the SVG graph.
     """
+    if modality not in MODALITY_ABBREVIATIONS[target_species]:
+        raise fastapi.HTTPException(status_code=400, detail="Invalid modality.")
+
     if target_species == "human":
         filename = f"svgs/{target_species}/{MODALITY_ABBREVIATIONS['human_dirnames'][modality]}/FIT_{MODALITY_ABBREVIATIONS['human'][modality]}{region}/FIT_{MODALITY_ABBREVIATIONS['human'][modality]}{region}_final.svg"
 
     elif target_species == "macaque":
         filename = f"svgs/{target_species}/{MODALITY_ABBREVIATIONS[target_species][modality]}/{region}/{region}_centile_log_highres_V2.0.svg"
 
-    bytes = data_fetcher.download_blob_to_bytes(filename)
-    return fastapi.Response(content=bytes, media_type="image/svg+xml")
+    return filename
+
+
+@cache.cached_async("graphs", max_entries=GRAPH_CACHE_SIZE)
+async def get_graph_payload(
+    region: str,
+    modality: str,
+    target_species: Literal["human", "macaque"],
+    variant: GraphVariant = "original",
+) -> response_cache.EncodedPayload:
+    """Cached call to the encoded graph for a given region, modality, and species.
+
+    The SVG is downloaded through the disk cache of the blob storage, and kept in
+    memory with its compressed variants and ETags. The minified SVG and the PNG
+    thumbnail are derived from the cached original on their first request.
+
+    Args:
+        region: The region to fetch the graphs for.
+        modality: The modality of the graph.
+        target_species: The species to return the graph for.
+        variant: The original SVG, the minified SVG or a PNG thumbnail.
+
+    Returns:
+        The encoded graph.
+    """
+    if variant == "minified":
+        original = await get_graph_payload(region, modality, target_species)
+        return await executors.run_cpu(_encode_minified, original.body)
+    if variant == "thumbnail":
+        if svg.cairosvg is None:
+            raise fastapi.HTTPException(
+                status_code=501, detail="Thumbnails are not available."
+            )
+        original = await get_graph_payload(region, modality, target_species)
+        return await executors.run_cpu(_encode_thumbnail, original.body)
+
+    filename = get_graph_filename(region, modality, target_species)
+    try:
+        body = await data_fetcher.download_blob_to_bytes_async(filename)
+    except FileNotFoundError as exc_info:
+        raise fastapi.HTTPException(
+            status_code=404, detail="Graph not found."
+        ) from exc_info
+    return await executors.run_cpu(
+        response_cache.EncodedPayload.from_body, body, SVG_MEDIA_TYPE
+    )
+
+
+def _encode_minified(body: bytes) -> response_cache.EncodedPayload:
+    """Minifies and encodes an SVG graph.
+
+    Args:
+        body: The SVG graph.
+
+    Returns:
+        The encoded minified graph.
+    """
+    return response_cache.EncodedPayload.from_body(
+        svg.minify_svg(body, GRAPH_PRECISION), SVG_MEDIA_TYPE
+    )
+
+
+def _encode_thumbnail(body: bytes) -> response_cache.EncodedPayload:
+    """Renders and encodes a PNG thumbnail of an SVG graph.
+
+    Args:
+        body: The SVG graph.
+
+    Returns:
+        The encoded thumbnail, without compressed variants.
+    """
+    return response_cache.EncodedPayload.from_body(
+        svg.render_png(body, GRAPH_THUMBNAIL_WIDTH), PNG_MEDIA_TYPE, compress=False
+    )
+
+
+async def get_graph_by_region(
+    request: fastapi.Request,
+    region: str,
+    modality: str,
+    target_species: Literal["human", "macaque"],
+    variant: GraphVariant = "original",
+) -> fastapi.Response:
+    """Fetches the graph for a given region, modality, and species.
+    Args:
+        request: The request, whose Accept-Encoding and If-None-Match headers
+            select the response variant.
+        region: The region to fetch the graphs for.
+        modality: The modality of the graph.
+        target_species: The species to return the graph for.
+        variant: The original SVG, the minified SVG or a PNG thumbnail.
+
+    Returns:
+        A fastapi response containing the bytes of the graph, compressed if
+        accepted, or an empty 304 response if the client's copy is current.
+    """
+    payload = await get_graph_payload(region, modality, target_species, variant)
+    return response_cache.build_response(request, payload)
 
 
 def get_vertex_to_parcel_mapping(
@@ -69,7 +173,4 @@ def get_vertex_to_parcel_mapping(
     Returns:
         The parcel mapping for the given vertex and species.
     """
-    if source_species == "human":
-        return HUMAN_TO_MACAQUE[vertex]
-    elif source_species == "macaque":
-        return MACAQUE_TO_HUMAN[vertex]
+    return data_fetcher.get_parcel_table(source_species)[vertex]
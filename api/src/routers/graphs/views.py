@@ -1,11 +1,11 @@
 """View definitions for the surfaces router."""
 
 import logging
-from typing import Literal, Set
+from typing import FrozenSet, Literal
 
 import fastapi
 
-from src.core import data_fetcher, settings
+from src.core import data_fetcher, executors, settings
 from src.routers.graphs import controller
 
 config = settings.get_settings()
@@ -17,7 +17,7 @@ router = fastapi.APIRouter(prefix="/graphs", tags=["graphs"])
 
 
 @router.get("/vertex-to-parcel")
-def get_vertex_to_parcel_mapping(
+async def get_vertex_to_parcel_mapping(
     vertex_id: int = fastapi.Query(
         ..., description="The vertex ID to fetch the parcel for."
     ),
@@ -34,16 +34,32 @@ def get_vertex_to_parcel_mapping(
         A fastapi response containing the vertex to parcel mapping.
     """
     logger.info("Calling GET /surfaces/vertex-to-parcel endpoint.")
-    return controller.get_vertex_to_parcel_mapping(vertex_id, species)
-
-
-@router.get("/region")
-def get_graph_by_region(
+    return await executors.run_io(
+        controller.get_vertex_to_parcel_mapping, vertex_id, species
+    )
+
+
+@router.get(
+    "/region",
+    response_class=fastapi.Response,
+    responses={
+        200: {"content": {controller.SVG_MEDIA_TYPE: {}, controller.PNG_MEDIA_TYPE: {}}}
+    },
+)
+async def get_graph_by_region(
+    request: fastapi.Request,
     region: str = fastapi.Query(..., description="The region to fetch the graphs for."),
     modality: str = fastapi.Query(..., description="The modality of the graph."),
     target_species: Literal["human", "macaque"] = fastapi.Query(
         ..., description="The species to return the graph for."
     ),
+    variant: controller.GraphVariant = fastapi.Query(
+        "original",
+        description=(
+            "The original SVG, a minified SVG with reduced coordinate precision, "
+            "or a small PNG thumbnail."
+        ),
+    ),
 ) -> fastapi.Response:
     """Fetches the graph for a given region, modality, and species.
 
@@ -51,20 +67,25 @@ def get_graph_by_region(
         region: The region to fetch the graphs for.
         modality: The modality of the graph.
         target_species: The species to return the graph for.
+        variant: The original SVG, the minified SVG or a PNG thumbnail.
 
     Returns:
-        A fastapi response containing the bytes of the graph.
+        A fastapi response containing the bytes of the graph. The graph is sent
+        compressed if accepted, and requests with a matching If-None-Match
+        header get a 304 response.
     """
     logger.info("Calling GET /surfaces/region endpoint.")
-    return controller.get_graph_by_region(region, modality, target_species)
+    return await controller.get_graph_by_region(
+        request, region, modality, target_species, variant
+    )
 
 
 @router.get("/region-names")
-def get_region_names(
+async def get_region_names(
     species: Literal["human", "macaque"] = fastapi.Query(
         ..., description="The species for which to get region names."
     ),
-) -> Set[str]:
+) -> FrozenSet[str]:
     """Fetches the region names for the given species.
 
     Args:
@@ -74,4 +95,4 @@ def get_region_names(
         A set containing the region names.
     """
     logger.info("Calling GET /surfaces/region-names endpoint.")
-    return controller.get_region_names(species)
+    return await executors.run_io(controller.get_region_names, species)
@@ -0,0 +1,67 @@
+"""Controller for the health router."""
+import functools
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from src.core import data_fetcher, settings, warmup
+from src.routers.features import controller as features_controller
+from src.routers.features import cube
+from src.routers.features import pool as features_pool
+from src.routers.features import utils as features_utils
+from src.routers.surfaces import controller as surfaces_controller
+
+config = settings.get_settings()
+LOGGER_NAME = config.LOGGER_NAME
+WARMUP_ENABLED = config.WARMUP_ENABLED
+WARMUP_WORKERS = config.WARMUP_WORKERS
+WARMUP_RETRIES = config.WARMUP_RETRIES
+WARMUP_RETRY_DELAY = config.WARMUP_RETRY_DELAY
+
+logger = logging.getLogger(LOGGER_NAME)
+
+
+def get_warmup_tasks() -> Dict[str, Callable[[], Any]]:
+    """Gets the loading tasks of the datasets that requests depend on.
+
+    Returns:
+        The loading tasks, keyed by name. Tasks fill the data caches, so that
+        they only load data that is not yet cached.
+    """
+    tasks: Dict[str, Callable[[], Any]] = {
+        "feature_stack": features_utils.load_feature_stack,
+    }
+    for species, side in features_utils.TARGET_HEMISPHERES:
+        name = f"{species}_{side}"
+        tasks[f"surface_{name}"] = functools.partial(
+            surfaces_controller.get_hemisphere_payload, species, side, True
+        )
+        tasks[f"roi_table_{name}"] = functools.partial(
+            features_utils.load_roi_table,
+            species,
+            side,
+            features_controller.ROI_SIZE,
+            features_controller.WEIGHTING,
+        )
+        tasks[f"similarity_cube_{name}"] = functools.partial(
+            cube.load_cube, species, side
+        )
+    if features_pool.CPU_EXECUTOR_MODE == "process":
+        tasks["similarity_pool"] = features_pool.get_similarity_pool
+    for species in ("human", "macaque"):
+        tasks[f"parcel_table_{species}"] = functools.partial(
+            data_fetcher.get_parcel_table, species
+        )
+    return tasks
+
+
+def start_warmup() -> Optional[threading.Thread]:
+    """Starts the warm-up in the background, or reruns its failed tasks.
+
+    Returns:
+        The background thread, or None if the warm-up is running or ready.
+    """
+    tasks = get_warmup_tasks() if WARMUP_ENABLED else {}
+    return warmup.WARMUP.start(
+        tasks, WARMUP_WORKERS, WARMUP_RETRIES, WARMUP_RETRY_DELAY
+    )
@@ -0,0 +1,52 @@
+"""View definitions for the health router."""
+import logging
+from typing import Any, Dict
+
+import fastapi
+from fastapi import status
+
+from src.core import settings, warmup
+from src.routers.health import controller
+
+config = settings.get_settings()
+LOGGER_NAME = config.LOGGER_NAME
+
+logger = logging.getLogger(LOGGER_NAME)
+
+router = fastapi.APIRouter(prefix="/health", tags=["health"])
+
+
+@router.get("/live")
+async def get_liveness() -> Dict[str, str]:
+    """Reports that the app is serving requests.
+
+    Returns:
+        The status of the app.
+    """
+    return {"status": "alive"}
+
+
+@router.get(
+    "/ready",
+    responses={status.HTTP_503_SERVICE_UNAVAILABLE: {"description": "Not ready."}},
+)
+async def get_readiness(response: fastapi.Response) -> Dict[str, Any]:
+    """Reports whether the startup warm-up has finished.
+
+    If the warm-up failed, its failed tasks are rerun in the background, so that
+    the app becomes ready once transient errors clear.
+
+    Args:
+        response: The response, whose status is set to 503 until the warm-up
+            has succeeded.
+
+    Returns:
+        The status of the warm-up, the errors of failed warm-up tasks and its
+        duration in seconds.
+    """
+    report = warmup.WARMUP.report()
+    if report["status"] == warmup.FAILED:
+        controller.start_warmup()
+    if report["status"] != warmup.READY:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return report
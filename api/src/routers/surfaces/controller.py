@@ -1,9 +1,11 @@
 """Controller for the surface endpoints."""
 
 import logging
+from typing import Any, Dict
 
-from src.core import data_fetcher, settings
-from src.routers.surfaces import schemas
+import numpy as np
+
+from src.core import binary, cache, data_fetcher, response_cache, responses, settings
 
 config = settings.get_settings()
 LOGGER_NAME = config.LOGGER_NAME
@@ -11,7 +13,7 @@ LOGGER_NAME = config.LOGGER_NAME
 logger = logging.getLogger(LOGGER_NAME)
 
 
-def get_hemispheres(species: str, side: str) -> schemas.Surface:
+def get_hemispheres(species: str, side: str) -> Dict[str, Any]:
     """Fetches the human and macaque fsLR-10k surfaces.
 
     Args:
@@ -21,13 +23,67 @@ def get_hemispheres(species: str, side: str) -> schemas.Surface:
             'right'.
 
     Returns:
-        A hemispheric surface for humans or macaques.
+        A hemispheric surface for humans or macaques, with the fields of
+        `schemas.Surface` and the vertices and faces as numpy arrays.
     """
     logger.info("Fetching %s_%s surface.", species, side)
-    surface = data_fetcher.get_surface_data(species=species, side=side)
+    surface = data_fetcher.get_surface(species=species, side=side)
+
+    return {
+        "name": f"{species}_{side}",
+        "vertices": surface.vertices,
+        "faces": surface.faces,
+    }
+
+
+def get_hemisphere_arrays(species: str, side: str) -> Dict[str, np.ndarray]:
+    """Fetches the vertices and faces of a fsLR-10k surface as typed arrays.
+
+    Args:
+        species: The species to fetch the hemispheres for, valid values are
+            'human' and 'macaque'.
+        side: The hemisphere to fetch the surfaces for, valid values are 'left' and
+            'right'.
+
+    Returns:
+        The float32 vertices and uint32 faces of the surface.
+    """
+    logger.info("Fetching %s_%s surface arrays.", species, side)
+    surface = data_fetcher.get_surface(species=species, side=side)
+
+    return {
+        "vertices": surface.vertices.astype(np.float32),
+        "faces": surface.faces.astype(np.uint32),
+    }
+
+
+@cache.cached("surface_payloads")
+def get_hemisphere_payload(
+    species: str, side: str, as_binary: bool
+) -> response_cache.EncodedPayload:
+    """Cached call to the encoded response body of a fsLR-10k surface.
+
+    Args:
+        species: The species to fetch the hemispheres for, valid values are
+            'human' and 'macaque'.
+        side: The hemisphere to fetch the surfaces for, valid values are 'left' and
+            'right'.
+        as_binary: Whether to encode the surface in the binary format rather than
+            as JSON.
 
-    return schemas.Surface(
-        name=f"{species}_{side}",
-        vertices=surface.vertices.tolist(),
-        faces=surface.faces.tolist(),
+    Returns:
+        The encoded surface with its compressed variant and ETags.
+    """
+    logger.info("Encoding %s_%s surface.", species, side)
+    if as_binary:
+        return response_cache.EncodedPayload.from_body(
+            binary.encode_arrays(
+                get_hemisphere_arrays(species, side),
+                metadata={"name": f"{species}_{side}"},
+            ),
+            binary.MEDIA_TYPE,
+        )
+    return response_cache.EncodedPayload.from_body(
+        responses.NumpyJSONResponse(get_hemispheres(species, side)).body,
+        "application/json",
     )
@@ -4,7 +4,7 @@ import logging
 import fastapi
 from fastapi import status
 
-from src.core import settings, utils
+from src.core import binary, executors, response_cache, responses, settings, utils
 from src.routers.surfaces import controller, schemas
 
 config = settings.get_settings()
@@ -15,16 +15,26 @@ logger = logging.getLogger(LOGGER_NAME)
 router = fastapi.APIRouter(prefix="/surfaces", tags=["surfaces"])
 
 
-@router.get("/hemispheres", responses={status.HTTP_200_OK: {"model": schemas.Surface}})
-def get_hemispheres(
-    response: fastapi.Response,
+@router.get(
+    "/hemispheres",
+    responses={
+        status.HTTP_200_OK: {
+            "model": schemas.Surface,
+            "content": {binary.MEDIA_TYPE: {}},
+        }
+    },
+    response_model=None,
+    response_class=responses.NumpyJSONResponse,
+)
+async def get_hemispheres(
+    request: fastapi.Request,
     species: str = fastapi.Query(
         ..., example="human", description="The species to fetch the hemispheres for."
     ),
     side: str = fastapi.Query(
         ..., example="left", description="The hemisphere to fetch the surfaces for."
     ),
-) -> schemas.Surface:
+) -> fastapi.Response:
     """Fetches the human and macaque hemisphere surfaces.
 
     Args:
@@ -34,8 +44,14 @@ def get_hemispheres(
             'right'.
 
     Returns:
-        A Pydantic BaseClass containing the surface.
+        A JSON response matching `schemas.Surface`. If the request accepts
+        'application/octet-stream', the vertices and faces are returned as
+        float32 and uint32 buffers instead, see `core.binary`. Bodies are
+        encoded once per surface and sent gzipped if accepted; requests with a
+        matching If-None-Match header get a 304 response.
     """
     logger.info("Calling GET /surfaces/hemispheres endpoint.")
-    response = utils.add_cache_control(response)
-    return controller.get_hemispheres(species, side)
+    payload = await executors.run_io(
+        controller.get_hemisphere_payload, species, side, utils.accepts_binary(request)
+    )
+    return response_cache.build_response(request, payload)
@@ -0,0 +1,28 @@
+"""Fixtures shared by the unit and endpoint tests."""
+import dataclasses
+from typing import Callable
+
+import pytest
+
+from src.core import data_fetcher, types
+
+
+@pytest.fixture
+def parcel_table(
+    monkeypatch: pytest.MonkeyPatch,
+) -> Callable[..., types.ParcelTable]:
+    """Replaces the parcel tables of all species with one built from mappings.
+
+    Returns:
+        A function that takes the parcel mapping of every vertex, in order, and
+        returns the table that `data_fetcher.get_parcel_table` now returns.
+    """
+
+    def set_parcel_table(*mappings: types.VertexToParcelMapping) -> types.ParcelTable:
+        table = types.ParcelTable.from_records(
+            dataclasses.asdict(mapping) for mapping in mappings
+        )
+        monkeypatch.setattr(data_fetcher, "get_parcel_table", lambda species: table)
+        return table
+
+    return set_parcel_table
@@ -0,0 +1,26 @@
+"""Endpoint tests for the admin router."""
+import pydantic
+import pytest
+from fastapi import status, testclient
+
+from src import main
+from src.routers.admin import views
+
+client = testclient.TestClient(main.app)
+
+
+def test_cache_stats_require_token() -> None:
+    """Test that the admin endpoints reject requests without the token."""
+    response = client.get("/api/v1/admin/cache")
+
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+def test_get_cache_stats(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that the cache stats are returned."""
+    monkeypatch.setattr(views, "ADMIN_TOKEN", pydantic.SecretStr("secret"))
+
+    response = client.get("/api/v1/admin/cache", headers={"X-Admin-Token": "secret"})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert "surfaces" in [stats["name"] for stats in response.json()["caches"]]
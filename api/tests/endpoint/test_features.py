@@ -1,8 +1,14 @@
 """Endpoint tests for the surfaces router."""
+import json
+from typing import Callable, Dict, List
 
+import numpy as np
+import pytest
 from fastapi import status, testclient
 
 from src import main
+from src.core import types
+from src.routers.features import controller, cube
 
 client = testclient.TestClient(main.app)
 
@@ -41,3 +47,105 @@ def test_get_neuroquery_too_high_vertex() -> None:
 
     assert response.status_code == status.HTTP_400_BAD_REQUEST
     assert response.json()["detail"] == "Invalid vertex: 10242, valid range is 0-10241."
+
+
+@pytest.fixture
+def small_hemisphere(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Hemispheres of 4 vertices, whose batch similarities are the seed vertex."""
+
+    def fake_batch(
+        species: str, side: str, seed_vertices: List[int], method: str
+    ) -> List[Dict[str, np.ndarray]]:
+        return [{"human_left": np.full(4, vertex)} for vertex in seed_vertices]
+
+    monkeypatch.setattr(cube, "load_cube", lambda species, side: None)
+    monkeypatch.setattr(controller, "HEMISPHERE_VERTICES", 4)
+    monkeypatch.setattr(controller, "get_cross_species_features_batch", fake_batch)
+
+
+@pytest.mark.usefixtures("small_hemisphere")
+def test_cross_species_similarity_batch(
+    parcel_table: Callable[..., types.ParcelTable], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that batch similarities are streamed as one JSON line per seed."""
+    parcel_table(
+        *(
+            types.VertexToParcelMapping(0, name, 0, "V1")
+            for name in ["cuneus", "insula", "cuneus", "insula"]
+        )
+    )
+    monkeypatch.setattr(controller, "SIMILARITY_BATCH_SIZE", 2)
+
+    response = client.post(
+        "/api/v1/features/cross_species/batch",
+        json={"species": "human", "side": "left", "vertices": [3], "parcel": "cuneus"},
+    )
+    invalid = client.post(
+        "/api/v1/features/cross_species/batch",
+        json={"species": "human", "side": "left", "vertices": [4]},
+    )
+    missing = client.post(
+        "/api/v1/features/cross_species/batch",
+        json={"species": "human", "side": "left", "parcel": "V7"},
+    )
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert [line["vertex"] for line in lines] == [3, 0, 2]
+    assert lines[1]["human_left"] == [0, 0, 0, 0]
+    assert invalid.status_code == status.HTTP_400_BAD_REQUEST
+    assert missing.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.parametrize("path", ["cross_species", "cross_species/parcels"])
+def test_cross_species_similarity_invalid_hemisphere(path: str) -> None:
+    """Test that unknown species and sides are rejected before any computation."""
+    species = client.get(
+        f"/api/v1/features/{path}",
+        params={"species": "dog", "side": "left", "vertex": 1},
+    )
+    side = client.get(
+        f"/api/v1/features/{path}",
+        params={"species": "human", "side": "middle", "vertex": 1},
+    )
+
+    assert species.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert side.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.parametrize("path", ["cross_species", "cross_species/parcels"])
+@pytest.mark.parametrize("vertex", [-1, 4])
+@pytest.mark.usefixtures("small_hemisphere")
+def test_cross_species_similarity_invalid_vertex(path: str, vertex: int) -> None:
+    """Test that seed vertices outside the hemisphere are rejected."""
+    response = client.get(
+        f"/api/v1/features/{path}",
+        params={"species": "human", "side": "left", "vertex": vertex},
+    )
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json()["detail"] == f"Invalid vertex: {vertex}, valid range is 0-3."
+
+
+@pytest.mark.usefixtures("small_hemisphere")
+def test_cross_species_similarity_batch_limit(
+    parcel_table: Callable[..., types.ParcelTable], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that the batch limit applies to listed vertices but not to parcels."""
+    parcel_table(*[types.VertexToParcelMapping(0, "cuneus", 0, "V1")] * 4)
+    monkeypatch.setattr(controller, "MAX_SIMILARITY_BATCH", 2)
+
+    parcel = client.post(
+        "/api/v1/features/cross_species/batch",
+        json={"species": "human", "side": "left", "parcel": "cuneus"},
+    )
+    listed = client.post(
+        "/api/v1/features/cross_species/batch",
+        json={"species": "human", "side": "left", "vertices": [0, 1, 2]},
+    )
+
+    assert parcel.status_code == status.HTTP_200_OK
+    assert len(parcel.text.splitlines()) == 4
+    assert listed.status_code == status.HTTP_400_BAD_REQUEST
+    assert listed.json()["detail"] == "At most 2 seed vertices per batch."
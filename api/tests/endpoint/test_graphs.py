@@ -0,0 +1,127 @@
+"""Endpoint tests for the graphs router."""
+from typing import Callable, Iterator
+
+import pytest
+from fastapi import status, testclient
+
+from src import main
+from src.core import data_fetcher, storage, svg, types
+from src.routers.graphs import controller
+
+client = testclient.TestClient(main.app)
+
+SVG = b'<svg xmlns="http://www.w3.org/2000/svg">\n <rect width="10.004"/>\n</svg>'
+PARAMS = {"region": "V1", "modality": "area", "target_species": "macaque"}
+
+
+class CountingStorage(storage.InMemoryStorage):
+    """In-memory storage that counts reads."""
+
+    reads = 0
+
+    def read_bytes(self, name: str) -> bytes:
+        """Records the read and returns the file contents."""
+        self.reads += 1
+        return super().read_bytes(name)
+
+
+@pytest.fixture
+def blob_storage(monkeypatch: pytest.MonkeyPatch) -> Iterator[CountingStorage]:
+    """Blob storage with one macaque graph."""
+    backend = CountingStorage(
+        {"svgs/macaque/Area/V1/V1_centile_log_highres_V2.0.svg": SVG}
+    )
+    monkeypatch.setattr(data_fetcher, "get_blob_storage", lambda: backend)
+    controller.get_graph_payload.cache_clear()  # type: ignore[attr-defined]
+    yield backend
+    controller.get_graph_payload.cache_clear()  # type: ignore[attr-defined]
+
+
+def test_get_graph_is_cached(blob_storage: CountingStorage) -> None:
+    """Test that graphs are compressed, tagged and downloaded once."""
+    first = client.get("/api/v1/graphs/region", params=PARAMS)
+    second = client.get(
+        "/api/v1/graphs/region",
+        params=PARAMS,
+        headers={"If-None-Match": first.headers["etag"]},
+    )
+
+    assert first.status_code == status.HTTP_200_OK
+    assert first.headers["content-type"] == "image/svg+xml"
+    assert first.headers["content-encoding"] == "gzip"
+    assert first.content == SVG
+    assert second.status_code == status.HTTP_304_NOT_MODIFIED
+    assert blob_storage.reads == 1
+
+
+def test_get_graph_uncompressed(blob_storage: CountingStorage) -> None:
+    """Test that the plain SVG is sent without Accept-Encoding."""
+    response = client.get(
+        "/api/v1/graphs/region", params=PARAMS, headers={"Accept-Encoding": "identity"}
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert "content-encoding" not in response.headers
+    assert response.content == SVG
+
+
+def test_get_graph_errors(blob_storage: CountingStorage) -> None:
+    """Test that unknown graphs and modalities are rejected."""
+    missing = client.get("/api/v1/graphs/region", params={**PARAMS, "region": "V2"})
+    invalid = client.get(
+        "/api/v1/graphs/region", params={**PARAMS, "modality": "colour"}
+    )
+
+    assert missing.status_code == status.HTTP_404_NOT_FOUND
+    assert invalid.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_get_graph_minified(blob_storage: CountingStorage) -> None:
+    """Test that the minified variant is derived from the cached original."""
+    original = client.get("/api/v1/graphs/region", params=PARAMS)
+    minified = client.get(
+        "/api/v1/graphs/region", params={**PARAMS, "variant": "minified"}
+    )
+
+    assert minified.status_code == status.HTTP_200_OK
+    assert minified.headers["content-type"] == "image/svg+xml"
+    assert minified.content == svg.minify_svg(SVG)
+    assert minified.headers["etag"] != original.headers["etag"]
+    assert blob_storage.reads == 1
+
+
+def test_get_graph_thumbnail_unavailable(
+    blob_storage: CountingStorage, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that thumbnails are rejected without a rasterizer."""
+    monkeypatch.setattr(svg, "cairosvg", None)
+
+    response = client.get(
+        "/api/v1/graphs/region", params={**PARAMS, "variant": "thumbnail"}
+    )
+
+    assert response.status_code == status.HTTP_501_NOT_IMPLEMENTED
+
+
+def test_get_region_names_and_parcels(
+    parcel_table: Callable[..., types.ParcelTable]
+) -> None:
+    """Test that region names and vertex parcels are read from the parcel table."""
+    parcel_table(
+        types.VertexToParcelMapping(3, "cuneus", 7, "V1"),
+        types.VertexToParcelMapping(5, "insula", 9, "V2"),
+    )
+
+    names = client.get("/api/v1/graphs/region-names", params={"species": "macaque"})
+    parcel = client.get(
+        "/api/v1/graphs/vertex-to-parcel", params={"vertex_id": 1, "species": "human"}
+    )
+
+    assert names.status_code == status.HTTP_200_OK
+    assert sorted(names.json()) == ["V1", "V2"]
+    assert parcel.json() == {
+        "AparcLabel": 5,
+        "AparcName": "insula",
+        "MarkovLabel": 9,
+        "MarkovName": "V2",
+    }
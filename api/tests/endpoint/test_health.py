@@ -0,0 +1,57 @@
+"""Endpoint tests for the health router."""
+import pytest
+from fastapi import status, testclient
+
+from src import main
+from src.core import warmup
+from src.routers.health import controller as health_controller
+
+client = testclient.TestClient(main.app)
+
+
+def test_liveness() -> None:
+    """Test that the app reports alive before the warm-up finishes."""
+    response = client.get("/api/v1/health/live")
+
+    assert response.status_code == status.HTTP_200_OK
+
+
+def test_readiness(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that the app reports ready only after the warm-up succeeds."""
+    state = warmup.Warmup()
+    monkeypatch.setattr(warmup, "WARMUP", state)
+
+    pending = client.get("/api/v1/health/ready")
+    thread = state.start({}, 1)
+    assert thread is not None
+    thread.join()
+    ready = client.get("/api/v1/health/ready")
+
+    assert pending.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert ready.status_code == status.HTTP_200_OK
+    assert ready.json()["status"] == warmup.READY
+
+
+def test_readiness_reruns_failed_warmup(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that a readiness probe reruns the tasks of a failed warm-up."""
+    state = warmup.Warmup()
+    failures = [OSError("transient")]
+
+    def flaky() -> None:
+        if failures:
+            raise failures.pop()
+
+    monkeypatch.setattr(warmup, "WARMUP", state)
+    monkeypatch.setattr(health_controller, "get_warmup_tasks", lambda: {"a": flaky})
+    thread = state.start({"a": flaky}, 1)
+    assert thread is not None
+    thread.join()
+
+    failed = client.get("/api/v1/health/ready")
+    assert state._thread is not None  # pylint: disable=protected-access
+    state._thread.join()  # pylint: disable=protected-access
+    ready = client.get("/api/v1/health/ready")
+
+    assert failed.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert failed.json()["status"] == warmup.FAILED
+    assert ready.status_code == status.HTTP_200_OK
@@ -0,0 +1,62 @@
+"""Unit tests for the binary response format."""
+import json
+import struct
+from typing import Dict
+
+import fastapi
+import numpy as np
+import pytest
+
+from src.core import binary, utils
+
+
+def test_encode_decode_round_trip() -> None:
+    """Test that arrays and metadata survive encoding and decoding."""
+    arrays: Dict[str, np.ndarray] = {
+        "vertices": np.arange(9, dtype=np.float32).reshape(3, 3),
+        "faces": np.array([[0, 1, 2]], dtype=np.uint32),
+        "odd": np.arange(3, dtype=np.uint8),
+    }
+
+    payload = binary.encode_arrays(arrays, {"name": "human_left"})
+    decoded, metadata = binary.decode_arrays(payload)
+
+    assert metadata == {"name": "human_left"}
+    for name, array in arrays.items():
+        assert decoded[name].dtype == array.dtype
+        assert np.array_equal(decoded[name], array)
+
+
+def test_encode_aligns_buffers() -> None:
+    """Test that every buffer starts at an 8-byte aligned position."""
+    arrays: Dict[str, np.ndarray] = {
+        "a": np.arange(3, dtype=np.uint8),
+        "b": np.arange(3, dtype=np.float64),
+    }
+
+    payload = binary.encode_arrays(arrays)
+    (header_length,) = struct.unpack_from("<I", payload, 4)
+    header = json.loads(payload[8 : 8 + header_length])
+
+    assert (8 + header_length) % binary.ALIGNMENT == 0
+    for description in header["arrays"]:
+        assert description["offset"] % binary.ALIGNMENT == 0
+
+
+@pytest.mark.parametrize(
+    "accept, expected",
+    [
+        ("application/octet-stream", True),
+        ("application/json, application/octet-stream;q=0.5", True),
+        ("application/octet-stream; q=0", False),
+        ("application/json", False),
+        ("", False),
+    ],
+)
+def test_accepts_binary(accept: str, expected: bool) -> None:
+    """Test content negotiation on the Accept header."""
+    request = fastapi.Request(
+        {"type": "http", "headers": [(b"accept", accept.encode())]}
+    )
+
+    assert utils.accepts_binary(request) == expected
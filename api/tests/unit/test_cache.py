@@ -0,0 +1,211 @@
+"""Unit tests for the cache manager."""
+import asyncio
+import pathlib
+import threading
+import time
+from typing import List, Union
+
+import numpy as np
+import pytest
+
+from src.core import cache
+
+
+def test_cached_counts_hits_and_misses() -> None:
+    """Test that positional and keyword calls share an entry."""
+    manager = cache.CacheManager(max_bytes=1024**2)
+    calls = []
+
+    @cache.cached("squares", manager=manager)
+    def square(value: int, power: int = 2) -> int:
+        calls.append(value)
+        return value**power
+
+    results = [square(3), square(value=3), square(3, 2), square(4)]
+    stats = manager.stats()["squares"]
+
+    assert results == [9, 9, 9, 16]
+    assert calls == [3, 4]
+    assert (stats.hits, stats.misses, stats.entries) == (2, 2, 2)
+
+
+def test_memory_budget_evicts_least_recently_used() -> None:
+    """Test that the least recently used entry across caches is evicted."""
+    manager = cache.CacheManager(max_bytes=2500)
+
+    @cache.cached("first", manager=manager)
+    def first(size: int) -> np.ndarray:
+        return np.zeros(size, dtype=np.uint8)
+
+    @cache.cached("second", manager=manager)
+    def second(size: int) -> np.ndarray:
+        return np.zeros(size, dtype=np.uint8)
+
+    first(1000)
+    second(1000)
+    first(1000)
+    second(1001)
+    stats = manager.stats()
+
+    assert manager.nbytes == 2001
+    assert stats["first"].entries == 1
+    assert stats["second"].entries == 1
+    assert stats["second"].evictions == 1
+
+
+def test_max_entries() -> None:
+    """Test that a cache keeps at most max_entries entries."""
+    manager = cache.CacheManager(max_bytes=1024**2)
+
+    @cache.cached("identity", max_entries=2, manager=manager)
+    def identity(value: int) -> int:
+        return value
+
+    for value in range(5):
+        identity(value)
+
+    assert manager.stats()["identity"].entries == 2
+
+
+def test_concurrent_loads_are_coalesced() -> None:
+    """Test that concurrent calls for one key load it once."""
+    manager = cache.CacheManager(max_bytes=1024**2)
+    calls = []
+
+    @cache.cached("slow", manager=manager)
+    def slow(value: int) -> int:
+        calls.append(value)
+        time.sleep(0.1)
+        return value
+
+    threads = [threading.Thread(target=slow, args=(1,)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert calls == [1]
+
+
+def test_failed_loads_are_not_cached() -> None:
+    """Test that a failed load is retried on the next call."""
+    manager = cache.CacheManager(max_bytes=1024**2)
+    outcomes: List[Union[Exception, int]] = [ValueError("boom"), 1]
+
+    @cache.cached("flaky", manager=manager)
+    def flaky() -> int:
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    with pytest.raises(ValueError):
+        flaky()
+    actual = flaky()
+
+    assert actual == 1
+    assert manager.stats()["flaky"].errors == 1
+
+
+def test_invalidate() -> None:
+    """Test that invalidated entries are loaded again."""
+    manager = cache.CacheManager(max_bytes=1024**2)
+    calls = []
+
+    @cache.cached("identity", manager=manager)
+    def identity(value: int) -> int:
+        calls.append(value)
+        return value
+
+    identity.warm(1)  # type: ignore[attr-defined]
+    identity.warm(2)  # type: ignore[attr-defined]
+    identity.invalidate(1)  # type: ignore[attr-defined]
+    identity(1)
+    identity(2)
+
+    assert calls == [1, 2, 1]
+    assert manager.stats()["identity"].nbytes > 0
+
+
+def test_estimate_nbytes_skips_memory_maps(tmp_path: pathlib.Path) -> None:
+    """Test that in-memory arrays count and memory-mapped arrays do not."""
+    filepath = tmp_path / "array.npy"
+    np.save(filepath, np.zeros(1000))
+
+    assert cache.estimate_nbytes({"a": np.zeros(10)}) >= 80
+    assert cache.estimate_nbytes(np.load(filepath, mmap_mode="r")) == 0
+
+
+def test_concurrent_async_calls_are_coalesced() -> None:
+    """Test that concurrent awaits for one key compute it once."""
+    manager = cache.CacheManager(max_bytes=1024**2)
+    calls = []
+
+    @cache.cached_async("similarities", max_entries=1, manager=manager)
+    async def compute(vertex: int) -> int:
+        calls.append(vertex)
+        await asyncio.sleep(0.05)
+        return vertex * 2
+
+    async def run() -> list:
+        first = await asyncio.gather(*(compute(1) for _ in range(8)))
+        return [*first, await compute(1), await compute(2), await compute(1)]
+
+    results = asyncio.run(run())
+    stats = manager.stats()["similarities"]
+
+    assert results == [2] * 9 + [4, 2]
+    assert calls == [1, 2, 1]
+    assert (stats.hits, stats.misses, stats.evictions) == (8, 3, 2)
+
+
+def test_failed_async_loads_are_not_cached() -> None:
+    """Test that a failed async load raises for all waiters and is retried."""
+    manager = cache.CacheManager(max_bytes=1024**2)
+    outcomes: List[Union[Exception, int]] = [ValueError("boom"), 1]
+
+    @cache.cached_async("flaky", manager=manager)
+    async def flaky() -> int:
+        await asyncio.sleep(0.01)
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    async def run() -> List[Union[int, BaseException]]:
+        return list(await asyncio.gather(flaky(), flaky(), return_exceptions=True))
+
+    failures = asyncio.run(run())
+
+    assert all(isinstance(failure, ValueError) for failure in failures)
+    assert asyncio.run(flaky()) == 1
+
+
+def test_async_calls_from_several_event_loops() -> None:
+    """Test that calls from event loops in other threads await the same load."""
+    manager = cache.CacheManager(max_bytes=1024**2)
+    calls = []
+    started = threading.Event()
+
+    @cache.cached_async("similarities", manager=manager)
+    async def compute(vertex: int) -> int:
+        calls.append(vertex)
+        started.set()
+        await asyncio.sleep(0.1)
+        return vertex * 2
+
+    results: List[int] = []
+
+    def run() -> None:
+        results.append(asyncio.run(compute(1)))
+
+    first = threading.Thread(target=run)
+    first.start()
+    started.wait()
+    second = threading.Thread(target=run)
+    second.start()
+    first.join()
+    second.join()
+
+    assert results == [2, 2]
+    assert calls == [1]
@@ -0,0 +1,27 @@
+"""Unit tests for the bounded executors."""
+import asyncio
+import threading
+
+from src.core import executors, storage
+
+
+def test_run_io_and_cpu_use_their_executors() -> None:
+    """Test that work runs on the threads of the matching executor."""
+
+    async def run() -> tuple:
+        return (
+            await executors.run_io(lambda: threading.current_thread().name),
+            await executors.run_cpu(lambda: threading.current_thread().name),
+        )
+
+    io_thread, cpu_thread = asyncio.run(run())
+
+    assert io_thread.startswith("io")
+    assert cpu_thread.startswith("cpu")
+
+
+def test_read_bytes_async() -> None:
+    """Test that storage reads can be awaited."""
+    backend = storage.InMemoryStorage({"a.svg": b"<svg/>"})
+
+    assert asyncio.run(backend.read_bytes_async("a.svg")) == b"<svg/>"
@@ -1,8 +1,15 @@
 # pylint: disable=protected-access
+import asyncio
+import pathlib
+from typing import Callable, List
+
+import fastapi
 import numpy as np
+import pytest
 from sklearn.metrics import pairwise
 
-from src.routers.features import utils
+from src.core import data_fetcher, quantization, types
+from src.routers.features import controller, cube, utils
 
 
 def test_cosine_similarity() -> None:
@@ -14,3 +21,260 @@ def test_cosine_similarity() -> None:
     actual = utils._cosine_similarity(a, b)
 
     assert np.allclose(actual, expected)
+
+
+def test_feature_matrix_zero_norm_rows() -> None:
+    """Test that zero-norm rows are flagged and get zero similarity."""
+    features = np.array([[3.0, 4.0], [0.0, 0.0]])
+
+    matrix = types.FeatureMatrix.from_array(features)
+    similarity = utils._cosine_similarity(features, features)
+
+    assert np.allclose(matrix.unit_features[0], [0.6, 0.8])
+    assert np.array_equal(matrix.zero_norm, [False, True])
+    assert np.allclose(similarity[:, 1], 0)
+    assert np.allclose(similarity[1, :], 0)
+
+
+def test_compute_similarity_feature_matrix() -> None:
+    """Test the similarity computed from pre-normalized features."""
+    rng = np.random.default_rng(0)
+    surface = types.Surface(
+        name="human_left",
+        vertices=rng.uniform(0, 10, (50, 3)),
+        faces=np.zeros((0, 3), dtype=np.int64),
+    )
+    seed_features = rng.normal(size=(50, 4))
+    target_features = rng.normal(size=(60, 4))
+
+    distances = np.linalg.norm(surface.vertices - surface.vertices[3], axis=1)
+    roi = distances <= 4
+    fisher_z = np.arctanh(
+        pairwise.cosine_similarity(seed_features[roi], target_features)
+    )
+    expected = np.average(fisher_z, axis=0, weights=np.exp(-distances[roi] ** 2 / 2))
+    actual = utils.compute_similarity(
+        3,
+        surface,
+        types.FeatureMatrix.from_array(seed_features),
+        types.FeatureMatrix.from_array(target_features),
+        roi_size=4,
+        weighting="gaussian",
+    )
+
+    assert np.allclose(actual, expected)
+
+
+def test_compute_similarity_batched_matches_single() -> None:
+    """Test that the batched similarity matches per-hemisphere similarities."""
+    rng = np.random.default_rng(1)
+    surface = types.Surface(
+        name="human_left",
+        vertices=rng.uniform(0, 10, (50, 3)),
+        faces=np.zeros((0, 3), dtype=np.int64),
+    )
+    matrices = {
+        "human_left": types.FeatureMatrix.from_array(rng.normal(size=(50, 4))),
+        "macaque_left": types.FeatureMatrix.from_array(rng.normal(size=(30, 4))),
+    }
+    stack = types.FeatureStack.from_matrices(matrices)
+
+    actual = utils.compute_similarity_batched(
+        7, surface, stack.get("human_left"), stack, roi_size=4, weighting="gaussian"
+    )
+
+    assert list(actual.keys()) == ["human_left", "macaque_left"]
+    for name, matrix in matrices.items():
+        expected = utils.compute_similarity(
+            7, surface, matrices["human_left"], matrix, 4, "gaussian"
+        )
+        assert np.allclose(actual[name], expected)
+
+
+@pytest.mark.parametrize("method", ["exact", "approximate"])
+def test_compute_similarity_multi_matches_single(method: str) -> None:
+    """Test that multi-seed similarities match per-seed similarities."""
+    rng = np.random.default_rng(5)
+    surface = types.Surface(
+        name="human_left",
+        vertices=rng.uniform(0, 10, (50, 3)),
+        faces=np.zeros((0, 3), dtype=np.int64),
+    )
+    stack = types.FeatureStack.from_matrices(
+        {
+            "human_left": types.FeatureMatrix.from_array(rng.normal(size=(50, 4))),
+            "macaque_left": types.FeatureMatrix.from_array(rng.normal(size=(30, 4))),
+        }
+    )
+    roi_table = utils.build_roi_table(surface, 4, "gaussian")
+    seeds = [7, 3, 7, 49]
+
+    actual = utils.compute_similarity_multi(
+        seeds,
+        surface,
+        stack.get("human_left"),
+        stack,
+        4,
+        "gaussian",
+        method,
+        roi_table,
+    )
+
+    for row, seed in enumerate(seeds):
+        expected = utils.compute_similarity_batched(
+            seed, surface, stack.get("human_left"), stack, 4, "gaussian", method
+        )
+        for name in expected:
+            assert np.allclose(actual[name][row], expected[name])
+
+
+def test_compute_similarity_approximate_single_vertex_roi() -> None:
+    """Test that approximate and exact similarity agree for a single-vertex ROI."""
+    rng = np.random.default_rng(2)
+    surface = types.Surface(
+        name="human_left",
+        vertices=np.arange(30, dtype=float)[:, np.newaxis] * np.ones((1, 3)),
+        faces=np.zeros((0, 3), dtype=np.int64),
+    )
+    seed_features = rng.normal(size=(30, 4))
+    target_features = rng.normal(size=(20, 4))
+
+    exact = utils.compute_similarity(
+        5, surface, seed_features, target_features, 1, "uniform", "exact"
+    )
+    approximate = utils.compute_similarity(
+        5, surface, seed_features, target_features, 1, "uniform", "approximate"
+    )
+
+    assert np.allclose(approximate, exact)
+
+
+def test_roi_table_matches_distance_query() -> None:
+    """Test that similarities from an ROI table match those from a distance query."""
+    rng = np.random.default_rng(3)
+    surface = types.Surface(
+        name="human_left",
+        vertices=rng.uniform(0, 10, (50, 3)),
+        faces=np.zeros((0, 3), dtype=np.int64),
+    )
+    seed_features = rng.normal(size=(50, 4))
+    target_features = rng.normal(size=(20, 4))
+
+    roi_table = utils.build_roi_table(surface, 4, "gaussian")
+    expected = utils.compute_similarity(
+        11, surface, seed_features, target_features, 4, "gaussian"
+    )
+    actual = utils.compute_similarity(
+        11,
+        surface,
+        seed_features,
+        target_features,
+        4,
+        "gaussian",
+        roi_table=roi_table,
+    )
+
+    assert roi_table.n_seeds == 50
+    assert np.allclose(actual, expected)
+
+
+def test_similarity_cube_round_trip(tmp_path: pathlib.Path) -> None:
+    """Test that a similarity cube row matches the computed similarity."""
+    rng = np.random.default_rng(4)
+    surface = types.Surface(
+        name="human_left",
+        vertices=rng.uniform(0, 10, (12, 3)),
+        faces=np.zeros((0, 3), dtype=np.int64),
+    )
+    stack = types.FeatureStack.from_matrices(
+        {
+            f"{species}_{side}": types.FeatureMatrix.from_array(
+                rng.normal(size=(12, 4))
+            )
+            for species, side in utils.TARGET_HEMISPHERES
+        }
+    )
+    roi_table = utils.build_roi_table(surface, 4, "gaussian")
+    filepath = tmp_path / cube.get_cube_filename("human", "left")
+
+    cube.build_cube(
+        filepath, surface, stack.get("human_left"), stack, roi_table, "float32"
+    )
+    actual = cube.read_cube_row(quantization.load_memmap(filepath), 5)
+    expected = utils.compute_similarity_batched(
+        5, surface, stack.get("human_left"), stack, 4, "gaussian"
+    )
+
+    assert actual.keys() == expected.keys()
+    for name in expected:
+        assert np.allclose(actual[name], expected[name], atol=1e-6)
+
+
+def test_neuroquery_batch(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that batched neuroquery lookups are deduplicated and aggregated."""
+    fetched = []
+
+    def fake_neuroquery_data(vertex: int) -> List[List[str]]:
+        fetched.append(vertex)
+        return [["memory", "0.5"], [f"term{vertex % 2}", "0.1"]]
+
+    monkeypatch.setattr(data_fetcher, "get_neuroquery_data", fake_neuroquery_data)
+    offset = controller.NEUROQUERY_VERTICES // 4
+
+    actual = asyncio.run(
+        controller.get_neuroquery_batch(
+            [("human", "left", 1), ("human", "right", 2), ("human", "left", 1)],
+            aggregate=True,
+        )
+    )
+
+    assert sorted(fetched) == [1, offset + 2]
+    assert [record["vertex"] for record in actual["records"]] == [1, 2]
+    assert actual["term_frequency"][0] == {"term": "memory", "count": 2}
+    assert len(actual["term_frequency"]) == 3
+
+
+def test_neuroquery_batch_rejects_invalid_vertices() -> None:
+    """Test that vertices outside the hemisphere are rejected."""
+    with pytest.raises(fastapi.HTTPException) as exc_info:
+        asyncio.run(controller.get_neuroquery_batch([("human", "left", -1)]))
+
+    assert exc_info.value.status_code == 400
+
+
+def test_parcel_similarity(parcel_table: Callable[..., types.ParcelTable]) -> None:
+    """Test that similarities are averaged within the parcels of each target."""
+    parcel_table(
+        *(
+            types.VertexToParcelMapping(0, aparc, 0, markov)
+            for aparc, markov in zip("abab", "xxyy")
+        )
+    )
+    similarities = {
+        "human_left": np.array([0.0, 1.0, 2.0, 3.0]),
+        "macaque_left": np.array([4.0, 2.0, 0.0, 0.0], dtype=np.float16),
+    }
+
+    native = controller.get_parcel_similarity(similarities)
+    markov = controller.get_parcel_similarity(similarities, "Markov")
+
+    assert native == {
+        "human_left": {"a": 1.0, "b": 2.0},
+        "macaque_left": {"x": 3.0, "y": 0.0},
+    }
+    assert markov["human_left"] == {"x": 0.5, "y": 2.5}
+
+
+def test_roi_table_rejects_invalid_seed() -> None:
+    """Test that seeds outside the ROI table raise instead of wrapping around."""
+    roi_table = types.RoiTable(
+        indptr=np.array([0, 1, 2]),
+        indices=np.array([0, 1]),
+        weights=np.ones(2),
+        roi_size=5,
+        weighting="gaussian",
+    )
+
+    for seed_vertex in (-1, 2):
+        with pytest.raises(IndexError):
+            roi_table.get(seed_vertex)
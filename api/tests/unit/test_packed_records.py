@@ -0,0 +1,26 @@
+"""Unit tests for packed record files."""
+import pathlib
+
+import pytest
+
+from src.core import packed_records
+
+
+def test_packed_records_round_trip(tmp_path: pathlib.Path) -> None:
+    """Test that records are read back from a memory-mapped packed file."""
+    records = [b"first", b"", b"third" * 100]
+    filepath = tmp_path / "records.pack"
+
+    packed_records.write_packed_records(filepath, records)
+    reader = packed_records.PackedRecords.from_file(filepath)
+
+    assert len(reader) == 3
+    assert [reader[index] for index in range(3)] == records
+    with pytest.raises(IndexError):
+        reader[3]
+
+
+def test_packed_records_rejects_other_files() -> None:
+    """Test that buffers without the magic bytes are rejected."""
+    with pytest.raises(ValueError):
+        packed_records.PackedRecords(b"CSMB\0\0\0\0")
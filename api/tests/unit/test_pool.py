@@ -0,0 +1,129 @@
+"""Unit tests for the similarity process pool."""
+import asyncio
+import os
+import pathlib
+from concurrent.futures import process
+from typing import Dict, Iterator
+
+import numpy as np
+import pytest
+
+from src.core import cache, data_fetcher, shared_arrays, types
+from src.routers.features import controller, pool
+from src.routers.features import utils as features_utils
+
+
+def test_shared_arrays_round_trip(tmp_path: pathlib.Path) -> None:
+    """Test that shared arrays are memory-mapped back and deleted on close."""
+    arrays: Dict[str, np.ndarray] = {
+        "a/b": np.arange(6).reshape(2, 3),
+        "c": np.ones(4, dtype=np.float32),
+    }
+
+    shared = shared_arrays.SharedArrays.create(arrays, {"key": 1}, tmp_path)
+    loaded = shared.load()
+    shared.close()
+
+    assert shared.metadata == {"key": 1}
+    assert all(np.array_equal(loaded[name], arrays[name]) for name in arrays)
+    assert isinstance(loaded["c"], np.memmap)
+    assert not shared.directory.exists()
+
+
+def prime_synthetic_data() -> None:
+    """Primes the data caches with small random hemispheres."""
+    rng = np.random.default_rng(0)
+    matrices = {}
+    for species, side in features_utils.TARGET_HEMISPHERES:
+        vertices = rng.normal(size=(200, 3))
+        vertices *= 10 / np.linalg.norm(vertices, axis=1, keepdims=True)
+        surface = types.Surface(
+            name=f"{species}_{side}", vertices=vertices, faces=np.array([[0, 1, 2]])
+        )
+        cache.prime(data_fetcher.get_surface, surface, species=species, side=side)
+        cache.prime(
+            features_utils.load_roi_table,
+            features_utils.build_roi_table(
+                surface, controller.ROI_SIZE, controller.WEIGHTING
+            ),
+            species,
+            side,
+            controller.ROI_SIZE,
+            controller.WEIGHTING,
+        )
+        matrices[f"{species}_{side}"] = types.FeatureMatrix.from_array(
+            rng.normal(size=(200, 20))
+        )
+    cache.prime(
+        features_utils.load_feature_stack, types.FeatureStack.from_matrices(matrices)
+    )
+
+
+@pytest.fixture
+def similarity_pool(monkeypatch: pytest.MonkeyPatch) -> Iterator[None]:
+    """A single-worker process pool over synthetic data, torn down afterwards."""
+    monkeypatch.setattr(pool, "CPU_EXECUTOR_MODE", "process")
+    monkeypatch.setattr(pool, "CPU_WORKERS", 1)
+    monkeypatch.setattr(pool, "_pool", None)
+    monkeypatch.setattr(pool, "_shared", None)
+    prime_synthetic_data()
+    try:
+        yield
+    finally:
+        # pylint: disable=protected-access
+        if pool._pool is not None:
+            pool._pool.shutdown()
+        if pool._shared is not None:
+            pool._shared.close()
+        cache.MANAGER.invalidate()
+
+
+@pytest.mark.usefixtures("similarity_pool")
+def test_worker_process_matches_in_process() -> None:
+    """Test that a worker process computes the same similarity from shared data."""
+    expected = controller.get_cross_species_features("human", "left", 5)
+
+    actual = (
+        pool.get_similarity_pool()
+        .submit(controller.get_cross_species_features, "human", "left", 5)
+        .result()
+    )
+
+    assert actual.keys() == expected.keys()
+    assert all(np.allclose(actual[name], expected[name]) for name in expected)
+
+
+@pytest.mark.usefixtures("similarity_pool")
+def test_broken_pool_is_restarted() -> None:
+    """Test that a pool whose worker died is restarted and the call retried."""
+    expected = controller.get_cross_species_features_batch("human", "left", [5])
+    broken_pool = pool.get_similarity_pool()
+    with pytest.raises(process.BrokenProcessPool):
+        broken_pool.submit(os._exit, 1).result()
+
+    actual = asyncio.run(pool.get_cross_species_features_batch("human", "left", [5]))
+
+    assert pool.get_similarity_pool() is not broken_pool
+    assert actual[0].keys() == expected[0].keys()
+    assert all(np.allclose(actual[0][name], expected[0][name]) for name in expected[0])
+
+
+def test_similarities_are_cached_quantized(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that cached similarities are stored at reduced precision."""
+    monkeypatch.setattr(pool, "CPU_EXECUTOR_MODE", "thread")
+    monkeypatch.setattr(pool, "SIMILARITY_CACHE_PRECISION", "float16")
+    prime_synthetic_data()
+    try:
+        expected = controller.get_cross_species_features("human", "left", 5)
+        actual = asyncio.run(pool.get_cross_species_features("human", "left", 5))
+        stats = cache.MANAGER.stats()["similarities"]
+    finally:
+        cache.MANAGER.invalidate()
+
+    assert actual.keys() == expected.keys()
+    assert all(actual[name].dtype == np.float64 for name in actual)
+    assert all(
+        np.allclose(actual[name], expected[name], rtol=1e-3, atol=1e-3)
+        for name in expected
+    )
+    assert stats.nbytes < sum(values.nbytes for values in expected.values()) / 2
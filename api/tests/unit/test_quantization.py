@@ -0,0 +1,54 @@
+"""Unit tests for quantized similarity storage."""
+import pathlib
+
+import numpy as np
+import pytest
+
+from src.core import quantization
+
+
+@pytest.mark.parametrize(
+    "precision, tolerance", [("float32", 1e-6), ("float16", 5e-3), ("uint8", 2e-2)]
+)
+def test_quantize_round_trip(precision: str, tolerance: float) -> None:
+    """Test that dequantized values are within the precision's tolerance."""
+    values = np.random.default_rng(0).uniform(-1, 2, (3, 100))
+
+    quantized = quantization.quantize(values, precision)
+
+    assert quantized.precision == precision
+    assert np.abs(quantized.dequantize() - values).max() < tolerance
+
+
+def test_quantize_uint8_constant_row() -> None:
+    """Test that constant rows survive uint8 quantization."""
+    values = np.full((2, 10), 0.5)
+
+    quantized = quantization.quantize(values, "uint8")
+
+    assert np.allclose(quantized.dequantize(), values)
+
+
+def test_memmap_round_trip(tmp_path: pathlib.Path) -> None:
+    """Test that rows written to a memory-mapped uint8 array can be read back."""
+    values = np.random.default_rng(1).uniform(-1, 2, (4, 2, 50))
+    filepath = tmp_path / "cube.npy"
+
+    array = quantization.create_memmap(filepath, values.shape, "uint8")
+    for index, row in enumerate(values):
+        array[index] = row
+    quantization.flush(array)
+    loaded = quantization.load_memmap(filepath)
+
+    assert loaded.precision == "uint8"
+    assert np.abs(loaded[2] - values[2]).max() < 2e-2
+
+
+def test_quantize_uint8_vector() -> None:
+    """Test that a single vector is quantized with a scalar scale and offset."""
+    values = np.linspace(-1, 1, 11)
+
+    quantized = quantization.quantize(values, "uint8")
+
+    assert quantized.scale is not None and quantized.scale.shape == ()
+    assert np.abs(quantized.dequantize() - values).max() < 1e-2
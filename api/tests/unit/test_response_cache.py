@@ -0,0 +1,90 @@
+"""Unit tests for the pre-encoded response cache."""
+import dataclasses
+import gzip
+from typing import Dict
+
+import fastapi
+import pytest
+from fastapi import status
+
+from src.core import response_cache
+
+
+def make_request(headers: Dict[str, str]) -> fastapi.Request:
+    """Creates a request with the given headers."""
+    return fastapi.Request(
+        {
+            "type": "http",
+            "headers": [
+                (key.lower().encode(), value.encode()) for key, value in headers.items()
+            ],
+        }
+    )
+
+
+@pytest.fixture
+def payload() -> response_cache.EncodedPayload:
+    """A JSON payload."""
+    return response_cache.EncodedPayload.from_body(b'{"a":1}', "application/json")
+
+
+def test_build_response_identity(payload: response_cache.EncodedPayload) -> None:
+    """Test that the uncompressed body is sent without Accept-Encoding."""
+    response = response_cache.build_response(make_request({}), payload)
+
+    assert response.body == b'{"a":1}'
+    assert response.headers["etag"] == payload.etag
+    assert "content-encoding" not in response.headers
+
+
+def test_build_response_gzip(payload: response_cache.EncodedPayload) -> None:
+    """Test that the gzip variant is sent when accepted."""
+    request = make_request({"Accept-Encoding": "br, gzip"})
+
+    response = response_cache.build_response(request, payload)
+
+    assert gzip.decompress(response.body) == b'{"a":1}'
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["etag"] == payload.gzip_etag
+
+
+@pytest.mark.parametrize(
+    "if_none_match", ["{etag}", "W/{etag}", '"other", {etag}', "*"]
+)
+def test_build_response_not_modified(
+    payload: response_cache.EncodedPayload, if_none_match: str
+) -> None:
+    """Test that a matching If-None-Match header results in a 304."""
+    request = make_request({"If-None-Match": if_none_match.format(etag=payload.etag)})
+
+    response = response_cache.build_response(request, payload)
+
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response.body == b""
+
+
+def test_build_response_other_etag(payload: response_cache.EncodedPayload) -> None:
+    """Test that a non-matching If-None-Match header results in a full response."""
+    assert payload.gzip_etag is not None
+    request = make_request({"If-None-Match": payload.gzip_etag})
+
+    response = response_cache.build_response(request, payload)
+
+    assert response.status_code == status.HTTP_200_OK
+
+
+def test_build_response_brotli(payload: response_cache.EncodedPayload) -> None:
+    """Test that a brotli variant is preferred when present and accepted."""
+    with_brotli = dataclasses.replace(payload, br_body=b"br", br_etag='"x-br"')
+
+    brotli_response = response_cache.build_response(
+        make_request({"Accept-Encoding": "gzip, br"}), with_brotli
+    )
+    gzip_response = response_cache.build_response(
+        make_request({"Accept-Encoding": "gzip"}), with_brotli
+    )
+
+    assert brotli_response.body == b"br"
+    assert brotli_response.headers["content-encoding"] == "br"
+    assert brotli_response.headers["etag"] == '"x-br"'
+    assert gzip_response.headers["content-encoding"] == "gzip"
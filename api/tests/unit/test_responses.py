@@ -0,0 +1,32 @@
+"""Unit tests for the response classes."""
+import json
+
+import numpy as np
+import pytest
+
+from src.core import responses
+
+
+def test_numpy_json_response_matches_json() -> None:
+    """Test that numpy content is encoded like the equivalent Python content."""
+    content = {
+        "name": "human_left",
+        "vertices": np.array([[0.1, 2.0, -3.5]]),
+        "faces": np.array([[0, 1, 2]], dtype=np.int64),
+        "count": np.int32(3),
+    }
+
+    response = responses.NumpyJSONResponse(content)
+
+    assert json.loads(response.body) == {
+        "name": "human_left",
+        "vertices": [[0.1, 2.0, -3.5]],
+        "faces": [[0, 1, 2]],
+        "count": 3,
+    }
+
+
+def test_numpy_json_response_rejects_unknown_objects() -> None:
+    """Test that objects other than numpy types are not silently encoded."""
+    with pytest.raises(TypeError):
+        responses.NumpyJSONResponse({"value": object()})
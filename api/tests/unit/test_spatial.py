@@ -0,0 +1,36 @@
+"""Unit tests for the spatial index."""
+import numpy as np
+import pytest
+
+from src.core import spatial
+
+
+@pytest.fixture
+def points() -> np.ndarray:
+    """Random points in a box."""
+    return np.random.default_rng(0).uniform(-50, 50, (2000, 3))
+
+
+@pytest.mark.parametrize("radius", [0, 3, 10, 200])
+def test_query_ball_matches_brute_force(points: np.ndarray, radius: float) -> None:
+    """Test that a ball query returns the same vertices as a full distance pass."""
+    index = spatial.UniformGridIndex(points)
+    center = points[17]
+    distances = np.linalg.norm(points - center, axis=1)
+
+    indices, actual_distances = index.query_ball(center, radius)
+
+    assert np.array_equal(indices, np.where(distances <= radius)[0])
+    assert np.allclose(actual_distances, distances[indices])
+
+
+@pytest.mark.parametrize("query", [[0, 0, 0], [1.5, -20, 49], [300, 300, -300]])
+def test_query_nearest_matches_brute_force(points: np.ndarray, query: list) -> None:
+    """Test that the nearest point is found, also for points outside the grid."""
+    index = spatial.UniformGridIndex(points, cell_size=4)
+
+    nearest, distance = index.query_nearest(query)
+
+    distances = np.linalg.norm(points - np.array(query), axis=1)
+    assert nearest == np.argmin(distances)
+    assert np.isclose(distance, distances.min())
@@ -0,0 +1,257 @@
+"""Unit tests for the storage backends."""
+import gzip
+import json
+import os
+import pathlib
+from typing import List, Tuple
+
+import h5py
+import numpy as np
+import pytest
+
+from src.core import data_fetcher, packed_records, storage
+
+
+class CountingStorage(storage.InMemoryStorage):
+    """In-memory storage that counts reads."""
+
+    def __init__(self, files: dict) -> None:
+        super().__init__(files)
+        self.reads: list = []
+
+    def read_bytes(self, name: str) -> bytes:
+        """Records the read and returns the file contents."""
+        self.reads.append(name)
+        return super().read_bytes(name)
+
+
+def test_local_storage(tmp_path: pathlib.Path) -> None:
+    """Test that local storage reads files and reports missing ones."""
+    (tmp_path / "a.json").write_bytes(b"{}")
+    local = storage.LocalStorage(tmp_path)
+
+    assert local.read_bytes("a.json") == b"{}"
+    assert local.local_path("a.json") == tmp_path / "a.json"
+    assert local.exists("a.json")
+    assert not local.exists("b.json")
+    with pytest.raises(FileNotFoundError):
+        local.read_bytes("b.json")
+
+
+def test_supports_local_path(tmp_path: pathlib.Path) -> None:
+    """Test that only backends that keep files on local disk support local paths."""
+    memory = storage.InMemoryStorage({"a.h5": b"contents"})
+    cache = storage.DiskCacheStorage(memory, tmp_path, max_bytes=1024)
+
+    assert storage.LocalStorage(tmp_path).supports_local_path
+    assert cache.supports_local_path
+    assert not memory.supports_local_path
+    with pytest.raises(NotImplementedError):
+        memory.local_path("a.h5")
+
+
+def test_disk_cache_reads_through_once(tmp_path: pathlib.Path) -> None:
+    """Test that the disk cache fetches a file once and keeps its suffix."""
+    backend = CountingStorage({"a.json.gz": b"contents"})
+    cache = storage.DiskCacheStorage(backend, tmp_path, max_bytes=1024)
+
+    first = cache.read_bytes("a.json.gz")
+    second = cache.read_bytes("a.json.gz")
+    filepath = cache.local_path("a.json.gz")
+
+    assert first == second == b"contents"
+    assert backend.reads == ["a.json.gz"]
+    assert filepath.name.endswith(".json.gz")
+    assert filepath.read_bytes() == b"contents"
+
+
+def test_disk_cache_refetches_corrupt_files(tmp_path: pathlib.Path) -> None:
+    """Test that a cached file that no longer matches its hash is fetched again."""
+    backend = CountingStorage({"a.h5": b"contents"})
+    cache = storage.DiskCacheStorage(backend, tmp_path, max_bytes=1024)
+
+    cache.local_path("a.h5").write_bytes(b"truncated")
+    actual = cache.read_bytes("a.h5")
+
+    assert actual == b"contents"
+    assert backend.reads == ["a.h5", "a.h5"]
+
+
+def test_disk_cache_evicts_least_recently_used(tmp_path: pathlib.Path) -> None:
+    """Test that the least recently used file is evicted when the cache is full."""
+    backend = storage.InMemoryStorage({name: b"x" * 10 for name in "abc"})
+    cache = storage.DiskCacheStorage(backend, tmp_path, max_bytes=25)
+
+    path_a = cache.local_path("a")
+    path_b = cache.local_path("b")
+    os.utime(path_a, (0, 0))
+    cache.local_path("c")
+
+    assert not path_a.exists()
+    assert path_b.exists()
+
+
+def test_disk_cache_tracks_size_without_scanning(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that the directory is only walked once the cache exceeds its limit."""
+    backend = storage.InMemoryStorage({name: b"x" * 10 for name in "abcd"})
+    storage.DiskCacheStorage(backend, tmp_path, max_bytes=35).local_path("a")
+    cache = storage.DiskCacheStorage(backend, tmp_path, max_bytes=35)
+    scan = cache._scan  # pylint: disable=protected-access
+    scans = []
+
+    def counting_scan() -> List[Tuple[float, int, pathlib.Path]]:
+        scans.append(1)
+        return scan()
+
+    monkeypatch.setattr(cache, "_scan", counting_scan)
+
+    cache.local_path("a")
+    cache.local_path("b")
+    cache.local_path("c")
+    scans_below_limit = len(scans)
+    cache.local_path("d")
+
+    assert scans_below_limit == 0
+    assert len(scans) == 1
+    assert len(list(tmp_path.glob("*.sha256"))) == 3
+
+
+def test_disk_cache_local_path_does_not_read(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that getting the path of a cached file does not read or hash it."""
+    backend = storage.InMemoryStorage({"a.h5": b"contents"})
+    cache = storage.DiskCacheStorage(backend, tmp_path, max_bytes=1024)
+    filepath = cache.local_path("a.h5")
+    os.utime(filepath, (0, 0))
+
+    def fail(filepath: pathlib.Path) -> bytes:
+        raise AssertionError(f"Read {filepath}")
+
+    monkeypatch.setattr(cache, "_read_cached", fail)
+
+    assert cache.local_path("a.h5") == filepath
+    assert filepath.stat().st_mtime > 0
+
+
+def test_disk_cache_read_after_eviction(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that a file evicted right after it was read is still returned."""
+    backend = storage.InMemoryStorage({"a.h5": b"contents"})
+    cache = storage.DiskCacheStorage(backend, tmp_path, max_bytes=1024)
+    filepath = cache.local_path("a.h5")
+    read_bytes = pathlib.Path.read_bytes
+
+    def read_and_evict(path: pathlib.Path) -> bytes:
+        contents = read_bytes(path)
+        if path == filepath:
+            path.unlink()
+        return contents
+
+    monkeypatch.setattr(pathlib.Path, "read_bytes", read_and_evict)
+
+    assert cache.read_bytes("a.h5") == b"contents"
+
+
+def test_disk_cache_missing_file(tmp_path: pathlib.Path) -> None:
+    """Test that missing files raise FileNotFoundError."""
+    cache = storage.DiskCacheStorage(storage.InMemoryStorage(), tmp_path, 1024)
+
+    assert not cache.exists("a.h5")
+    with pytest.raises(FileNotFoundError):
+        cache.local_path("a.h5")
+
+
+def test_surface_data_from_storage(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that surfaces are loaded in memory through the configured storage."""
+    source = tmp_path / "source.h5"
+    with h5py.File(source, "w") as h5file:
+        h5file.create_dataset("name", data=b"human_left")
+        h5file.create_dataset("vertices", data=np.eye(3))
+        h5file.create_dataset("faces", data=np.array([[0, 1, 2]]))
+    files = {"human_left_inflated_10k_fs_lr.h5": source.read_bytes()}
+    monkeypatch.setattr(
+        data_fetcher, "get_data_storage", lambda: storage.InMemoryStorage(files)
+    )
+
+    surface = data_fetcher.get_surface_data("human", "left")
+
+    assert np.array_equal(surface.vertices, np.eye(3))
+    assert np.array_equal(surface.faces, [[0, 1, 2]])
+
+
+def test_neuroquery_data_from_storage(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that gzipped JSON is decoded straight from the downloaded bytes when
+    no packed shard exists."""
+    records = [["memory", "0.5"]]
+    files = {
+        "neuroquery_features_10k_000042.json.gz": gzip.compress(
+            json.dumps(records).encode()
+        )
+    }
+    monkeypatch.setattr(
+        data_fetcher, "get_blob_storage", lambda: storage.InMemoryStorage(files)
+    )
+    monkeypatch.setattr(data_fetcher, "_missing_neuroquery_shards", {})
+    data_fetcher.get_neuroquery_shard.cache_clear()  # type: ignore[attr-defined]
+    data_fetcher.get_neuroquery_data.cache_clear()  # type: ignore[attr-defined]
+
+    actual = data_fetcher.get_neuroquery_data(42)
+    data_fetcher.get_neuroquery_shard.cache_clear()  # type: ignore[attr-defined]
+    data_fetcher.get_neuroquery_data.cache_clear()  # type: ignore[attr-defined]
+
+    assert actual == records
+
+
+def test_neuroquery_missing_shard_expires(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that a shard packed after a failed lookup is picked up later."""
+    filename = data_fetcher.get_neuroquery_shard_filename(0)
+    now = [1000.0]
+    monkeypatch.setattr(data_fetcher.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(data_fetcher, "_missing_neuroquery_shards", {})
+    monkeypatch.setattr(
+        data_fetcher, "get_blob_storage", lambda: storage.LocalStorage(tmp_path)
+    )
+    data_fetcher.get_neuroquery_shard.cache_clear()  # type: ignore[attr-defined]
+
+    missing = data_fetcher.find_neuroquery_shard(0)
+    packed_records.write_packed_records(tmp_path / filename, [b"[]"])
+    remembered = data_fetcher.find_neuroquery_shard(0)
+    now[0] += data_fetcher.NEUROQUERY_MISSING_SHARD_TTL
+    found = data_fetcher.find_neuroquery_shard(0)
+    data_fetcher.get_neuroquery_shard.cache_clear()  # type: ignore[attr-defined]
+
+    assert missing is None
+    assert remembered is None
+    assert found is not None and len(found) == 1
+
+
+def test_neuroquery_data_from_shard(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that neuroquery records are read from a memory-mapped shard."""
+    shard_size = data_fetcher.NEUROQUERY_SHARD_SIZE
+    records = [b""] * shard_size
+    records[2] = json.dumps([["memory", "0.5"]]).encode()
+    filename = data_fetcher.get_neuroquery_shard_filename(1)
+    packed_records.write_packed_records(tmp_path / filename, records)
+    monkeypatch.setattr(
+        data_fetcher, "get_blob_storage", lambda: storage.LocalStorage(tmp_path)
+    )
+    data_fetcher.get_neuroquery_shard.cache_clear()  # type: ignore[attr-defined]
+    data_fetcher.get_neuroquery_data.cache_clear()  # type: ignore[attr-defined]
+
+    actual = data_fetcher.get_neuroquery_data(shard_size + 2)
+    empty = data_fetcher.get_neuroquery_data(shard_size + 3)
+    data_fetcher.get_neuroquery_shard.cache_clear()  # type: ignore[attr-defined]
+    data_fetcher.get_neuroquery_data.cache_clear()  # type: ignore[attr-defined]
+
+    assert actual == [["memory", "0.5"]]
+    assert empty == []
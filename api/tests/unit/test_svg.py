@@ -0,0 +1,57 @@
+"""Unit tests for the SVG minification."""
+import xml.etree.ElementTree as ElementTree
+
+from src.core import svg
+
+SVG = b"""<?xml version="1.0" encoding="utf-8" standalone="no"?>
+<!DOCTYPE svg PUBLIC "-//W3C//DTD SVG 1.1//EN"
+  "http://www.w3.org/Graphics/SVG/1.1/DTD/svg11.dtd">
+<svg xmlns="http://www.w3.org/2000/svg" width="460.8pt" height="345.6pt" viewBox="0 0 460.8 345.6">
+ <metadata>
+  <rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#"/>
+ </metadata>
+ <!-- axes -->
+ <g id="patch_1">
+  <path d="M 73.832812 307.584 L 414.632812 307.584 L 414.632812 -0.004 z" style="stroke-width: 0.8"/>
+  <text x="12.3456" y="1e-05">FIT 1.23456</text>
+ </g>
+</svg>
+"""
+
+
+def test_minify_svg() -> None:
+    """Test that SVGs are minified without changing their structure."""
+    minified = svg.minify_svg(SVG, precision=2)
+    root = ElementTree.fromstring(minified)
+    path = root.find(".//{http://www.w3.org/2000/svg}path")
+    text = root.find(".//{http://www.w3.org/2000/svg}text")
+
+    assert len(minified) < len(SVG)
+    assert b"<!--" not in minified
+    assert b"metadata" not in minified
+    assert b"DOCTYPE" not in minified
+    assert b"><" in minified and b">\n" not in minified
+    assert root.get("viewBox") == "0 0 460.8 345.6"
+    assert root.get("width") == "460.8pt"
+    assert path is not None and text is not None
+    assert path.get("d") == "M73.83 307.58L414.63 307.58L414.63 0z"
+    assert path.get("style") == "stroke-width: 0.8"
+    assert text.get("x") == "12.35"
+    assert text.get("y") == "0"
+    assert text.text == "FIT 1.23456"
+
+
+def test_minify_svg_keeps_transforms() -> None:
+    """Test that scale factors and matrices are not rounded like coordinates."""
+    body = (
+        b'<svg xmlns="http://www.w3.org/2000/svg">'
+        b'<g transform="translate(56.86 314.18) scale(0.015625 -0.015625)">'
+        b'<path d="M 2034.123 4250.5 z" transform="matrix(0.105 0 0 0.105 1.5 2)"/>'
+        b"</g></svg>"
+    )
+
+    minified = svg.minify_svg(body, precision=2)
+
+    assert b'transform="translate(56.86 314.18) scale(0.015625 -0.015625)"' in minified
+    assert b'transform="matrix(0.105 0 0 0.105 1.5 2)"' in minified
+    assert b'd="M2034.12 4250.5z"' in minified
@@ -1,7 +1,12 @@
 """Unit tests for the surfaces controller."""
+import dataclasses
+import json
+import pathlib
+
 import numpy as np
+import pytest
 
-from src.core import data_fetcher
+from src.core import data_fetcher, storage, types
 from src.routers.features import utils as features_utils
 
 
@@ -37,3 +42,132 @@ def test_compute_similarity() -> None:
     assert similarity.shape == (10242,)
     assert similarity.dtype == np.dtype("float64")
     assert np.allclose(similarity, np.arctanh(0.9999))
+
+
+def test_roi_table_round_trip(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that a written ROI table is read back from the data directory."""
+    monkeypatch.setattr(
+        data_fetcher, "get_data_storage", lambda: storage.LocalStorage(tmp_path)
+    )
+    roi_table = types.RoiTable(
+        indptr=np.array([0, 2, 3]),
+        indices=np.array([0, 1, 1], dtype=np.int32),
+        weights=np.array([1.0, 0.5, 1.0]),
+        roi_size=5,
+        weighting="gaussian",
+    )
+    filename = data_fetcher.get_roi_table_filename("human", "left", 5, "gaussian")
+
+    missing = data_fetcher.get_roi_table_data("human", "left", 5, "gaussian")
+    data_fetcher.write_roi_table(roi_table, tmp_path / filename)
+    actual = data_fetcher.get_roi_table_data("human", "left", 5, "gaussian")
+
+    assert missing is None
+    assert actual is not None
+    assert np.array_equal(actual.indices, roi_table.indices)
+    assert np.array_equal(actual.get(0)[1], [1.0, 0.5])
+    assert (actual.roi_size, actual.weighting) == (5, "gaussian")
+
+
+PARCEL_MAPPINGS = [
+    types.VertexToParcelMapping(3, "cuneus", 7, "V1"),
+    types.VertexToParcelMapping(5, "insula", 7, "V1"),
+    types.VertexToParcelMapping(3, "cuneus", 9, "V2"),
+]
+PARCEL_RECORDS = [dataclasses.asdict(mapping) for mapping in PARCEL_MAPPINGS]
+
+
+def test_parcel_table_round_trip(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that parcel tables are built from JSON and read back from h5."""
+    monkeypatch.setattr(
+        data_fetcher, "get_blob_storage", lambda: storage.LocalStorage(tmp_path)
+    )
+    (tmp_path / "svgs").mkdir()
+    (tmp_path / "svgs" / "human_to_monkey_mapping.json").write_text(
+        json.dumps(PARCEL_RECORDS)
+    )
+
+    from_json = data_fetcher.get_parcel_table_data("human")
+    data_fetcher.write_parcel_table(
+        from_json, tmp_path / data_fetcher.get_parcel_table_filename("human")
+    )
+    (tmp_path / "svgs" / "human_to_monkey_mapping.json").unlink()
+    from_h5 = data_fetcher.get_parcel_table_data("human")
+
+    for table in (from_json, from_h5):
+        assert len(table) == 3
+        assert [table[vertex] for vertex in range(3)] == PARCEL_MAPPINGS
+        assert table.region_names["Markov"] == {"V1", "V2"}
+        assert table.vertices("Aparc", "cuneus").tolist() == [0, 2]
+        assert table.vertices("Markov", "V2").tolist() == [2]
+
+
+class FakeDownloader:
+    """Stand-in for azure.storage.blob.StorageStreamDownloader."""
+
+    def __init__(self, contents: bytes) -> None:
+        self.contents = contents
+
+    def readall(self) -> bytes:
+        """Returns the blob contents."""
+        return self.contents
+
+
+class FakeBlobClient:
+    """Stand-in for azure.storage.blob.BlobClient."""
+
+    def __init__(self, contents: bytes, calls: list) -> None:
+        self.contents = contents
+        self.calls = calls
+
+    def download_blob(self, max_concurrency: int = 1) -> FakeDownloader:
+        """Records the download and returns the blob contents."""
+        self.calls.append(max_concurrency)
+        return FakeDownloader(self.contents)
+
+
+class FakeBlobServiceClient:
+    """Stand-in for azure.storage.blob.BlobServiceClient."""
+
+    instances: list = []
+
+    def __init__(self, **kwargs: object) -> None:
+        self.kwargs = kwargs
+        self.calls: list = []
+        FakeBlobServiceClient.instances.append(self)
+
+    def get_container_client(self, name: str) -> "FakeBlobServiceClient":
+        """Returns itself as the container."""
+        return self
+
+    def get_blob_client(self, blob_filename: str) -> FakeBlobClient:
+        """Returns a blob whose contents are its filename."""
+        return FakeBlobClient(blob_filename.encode(), self.calls)
+
+
+def test_blob_container_is_reused(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that one container client serves all downloads, in parallel chunks,
+    and that repeated downloads are served from the disk cache."""
+    monkeypatch.setattr(data_fetcher.blob, "BlobServiceClient", FakeBlobServiceClient)
+    monkeypatch.setattr(data_fetcher, "AZURE_MAX_CONCURRENCY", 3)
+    monkeypatch.setattr(data_fetcher, "CACHE_DIR", tmp_path)
+    data_fetcher.get_blob_container.cache_clear()
+    data_fetcher.get_blob_storage.cache_clear()
+    FakeBlobServiceClient.instances = []
+
+    first = data_fetcher.download_blob_to_bytes("a.h5")
+    second = data_fetcher.download_blob_to_bytes("b.h5")
+    repeated = data_fetcher.download_blob_to_bytes("a.h5")
+    data_fetcher.get_blob_container.cache_clear()
+    data_fetcher.get_blob_storage.cache_clear()
+
+    assert (first, second, repeated) == (b"a.h5", b"b.h5", b"a.h5")
+    assert len(FakeBlobServiceClient.instances) == 1
+    assert FakeBlobServiceClient.instances[0].calls == [3, 3]
+    assert "transport" in FakeBlobServiceClient.instances[0].kwargs
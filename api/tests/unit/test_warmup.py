@@ -0,0 +1,77 @@
+"""Unit tests for the startup warm-up."""
+from src.core import warmup
+
+
+def test_warmup_becomes_ready() -> None:
+    """Test that the warm-up is ready after all tasks succeed."""
+    state = warmup.Warmup()
+    calls = []
+
+    thread = state.start({"a": lambda: calls.append("a"), "b": lambda: 1}, 2)
+    assert thread is not None
+    thread.join()
+
+    assert state.ready
+    assert calls == ["a"]
+    assert state.start({}, 1) is None
+
+
+def test_warmup_reports_failures() -> None:
+    """Test that failed tasks keep the warm-up from becoming ready."""
+    state = warmup.Warmup()
+
+    def fail() -> None:
+        raise OSError("unreachable")
+
+    thread = state.start({"ok": lambda: None, "broken": fail}, 2)
+    assert thread is not None
+    thread.join()
+    report = state.report()
+
+    assert not state.ready
+    assert report["status"] == warmup.FAILED
+    assert list(report["errors"]) == ["broken"]
+
+
+def test_warmup_retries_failed_tasks() -> None:
+    """Test that a task that fails once is retried and the warm-up succeeds."""
+    state = warmup.Warmup()
+    attempts = []
+
+    def flaky() -> None:
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise OSError("transient")
+
+    thread = state.start({"flaky": flaky}, 1, retries=2, retry_delay=0)
+    assert thread is not None
+    thread.join()
+
+    assert state.ready
+    assert len(attempts) == 2
+    assert state.report()["errors"] == {}
+
+
+def test_warmup_restart_reruns_failed_tasks() -> None:
+    """Test that starting a failed warm-up again reruns only the failed tasks."""
+    state = warmup.Warmup()
+    calls = []
+    failures = [OSError("transient")]
+
+    def flaky() -> None:
+        calls.append("flaky")
+        if failures:
+            raise failures.pop()
+
+    tasks = {"ok": lambda: calls.append("ok"), "flaky": flaky}
+    first = state.start(tasks, 2)
+    assert first is not None
+    first.join()
+    failed = state.status
+    second = state.start(tasks, 2)
+    assert second is not None
+    second.join()
+
+    assert failed == warmup.FAILED
+    assert state.ready
+    assert sorted(calls) == ["flaky", "flaky", "ok"]
@@ -1,3 +1,4 @@
+import { BINARY_MEDIA_TYPE, decodeArrays } from "$lib/binary";
 import { similarity } from "$lib/store";
 import type { ApiSurface, CrossSpeciesSimilarityResponse } from "$lib/types";
 
@@ -56,17 +57,25 @@ export async function getNeuroQuery(
 }
 
 /**
- * Fetches the surface data for all surfaces.
+ * Fetches the surface data for all surfaces as flat typed arrays.
  * @param species The species to fetch surfaces for.
  * @param side The side to fetch surfaces for.
- * @returns A Promise that resolves to an ApiSurfaceResponse object.
+ * @returns A Promise that resolves to an ApiSurface object.
  */
 export async function getSurfaces(
   species: string,
   side: string,
 ): Promise<ApiSurface> {
   const url = `${Endpoints.getHemispheres}?species=${species}&side=${side}`;
-  return await fetch(url).then(async (response) => await response.json());
+  const buffer = await fetch(url, {
+    headers: { Accept: BINARY_MEDIA_TYPE },
+  }).then(async (response) => await response.arrayBuffer());
+  const { metadata, arrays } = decodeArrays(buffer);
+  return {
+    name: metadata.name as string,
+    vertices: arrays.vertices as Float32Array,
+    faces: arrays.faces as Uint32Array,
+  };
 }
 
 /**
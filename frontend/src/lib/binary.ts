@@ -0,0 +1,84 @@
+/**
+ * Decoder for the API's binary array format. See api/src/core/binary.py for
+ * the layout of the payload.
+ */
+
+export const BINARY_MEDIA_TYPE = "application/octet-stream";
+
+export type TypedArray =
+  | Float32Array
+  | Float64Array
+  | Int32Array
+  | Uint32Array
+  | Uint8Array;
+
+interface ArrayDescription {
+  name: string;
+  dtype: string;
+  shape: number[];
+  offset: number;
+}
+
+interface Header {
+  metadata: Record<string, unknown>;
+  arrays: ArrayDescription[];
+}
+
+export interface BinaryPayload {
+  metadata: Record<string, unknown>;
+  arrays: Record<string, TypedArray>;
+}
+
+const MAGIC = "CSMB";
+
+function viewArray(
+  buffer: ArrayBuffer,
+  dtype: string,
+  byteOffset: number,
+  length: number,
+): TypedArray {
+  switch (dtype) {
+    case "<f4":
+      return new Float32Array(buffer, byteOffset, length);
+    case "<f8":
+      return new Float64Array(buffer, byteOffset, length);
+    case "<i4":
+      return new Int32Array(buffer, byteOffset, length);
+    case "<u4":
+      return new Uint32Array(buffer, byteOffset, length);
+    case "|u1":
+      return new Uint8Array(buffer, byteOffset, length);
+    default:
+      throw new Error(`Unsupported dtype: ${dtype}`);
+  }
+}
+
+/**
+ * Decodes a binary payload into flat typed arrays without copying.
+ * @param buffer The response body.
+ * @returns The metadata and the arrays keyed by name.
+ */
+export function decodeArrays(buffer: ArrayBuffer): BinaryPayload {
+  const view = new DataView(buffer);
+  const magic = new TextDecoder().decode(new Uint8Array(buffer, 0, 4));
+  if (magic !== MAGIC) {
+    throw new Error("Not a binary array payload.");
+  }
+  const headerLength = view.getUint32(4, true);
+  const dataStart = 8 + headerLength;
+  const header: Header = JSON.parse(
+    new TextDecoder().decode(new Uint8Array(buffer, 8, headerLength)),
+  );
+
+  const arrays: Record<string, TypedArray> = {};
+  for (const description of header.arrays) {
+    const length = description.shape.reduce((a, b) => a * b, 1);
+    arrays[description.name] = viewArray(
+      buffer,
+      description.dtype,
+      dataStart + description.offset,
+      length,
+    );
+  }
+  return { metadata: header.metadata, arrays };
+}
@@ -9,10 +9,7 @@ import {
 import type { SurfaceData } from "./types";
 
 function apiSurface2ViewerSurface(apiSurface: ApiSurface): SurfaceMesh {
-  return new SurfaceMesh(
-    new Float32Array(apiSurface.vertices.flat()),
-    new Uint32Array(apiSurface.faces.flat()),
-  );
+  return new SurfaceMesh(apiSurface.vertices, apiSurface.faces);
 }
 
 export async function getData(): Promise<SurfaceData> {
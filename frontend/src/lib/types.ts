@@ -8,8 +8,8 @@ export interface CrossSpeciesSimilarityResponse {
 
 export interface ApiSurface {
   name: string;
-  vertices: number[][];
-  faces: number[][];
+  vertices: Float32Array;
+  faces: Uint32Array;
 }
 
 export interface ApiSurfaceResponse {